@@ -3,11 +3,27 @@
 
 import os
 import sys
+import io
+import copy
+import gzip
 import json
 import re
+import hashlib
+import heapq
+import mmap
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 import xml.etree.ElementTree as ET
 from functools import reduce
 
+from coverxygen.options import Options
+
+try:
+  from lxml import etree as LET
+except ImportError:
+  LET = None
+
 #------------------------------------------------------------------------------
 
 __author__       = "Xavier MARCELET <xavier@marcelet.com>"
@@ -29,7 +45,10 @@ __classifiers__  = [
 #------------------------------------------------------------------------------
 
 class Coverxygen(object):
-  def __init__(self, p_root, p_output, p_scope, p_kind, p_format, p_rootDir, p_prefix=None, p_verbose=False, p_excludes=[], p_includes=[], p_excludesymbols=[]):
+  def __init__(self, p_root, p_output, p_scope, p_kind, p_format, p_rootDir, p_prefix=None, p_verbose=False, p_excludes=[], p_includes=[], p_excludesymbols=[], p_options=None):
+    l_options = p_options if p_options is not None else Options()
+    if l_options.m_roots:
+      p_root, p_rootDir = l_options.m_roots[0]
     self.m_root     = p_root
     self.m_output   = p_output
     self.m_scope    = p_scope
@@ -41,6 +60,33 @@ class Coverxygen(object):
     self.m_excludes = p_excludes
     self.m_includes = p_includes
     self.m_excludesymbols = p_excludesymbols
+    self.m_filters  = FilterPlan(self.m_prefix, p_includes, p_excludes, p_excludesymbols)
+    self.m_jobs     = l_options.m_jobs if l_options.m_jobs and l_options.m_jobs > 0 else multiprocessing.cpu_count()
+    self.m_engine   = l_options.m_engine
+    self.m_backend  = self.get_xml_backend(l_options.m_xmlBackend)
+    self.m_dedup    = l_options.m_dedup
+    self.m_skipped  = 0
+    self.m_outOfScope = 0
+    self.m_scanFallbacks = 0
+    self.m_scanPaths = {}
+    self.m_cache    = None
+    if l_options.m_cacheDir is not None:
+      self.m_cache = ResultCache(l_options.m_cacheDir, self.get_config_key(), l_options.m_cacheSize)
+    self.m_profiler = PhaseProfiler(l_options.m_profileTop) if l_options.m_profile else None
+    self.m_baseline = l_options.m_baseline
+    self.m_changedFileList = l_options.m_changedFiles
+    self.m_changedFiles = None
+    if l_options.m_changedFiles is not None:
+      self.m_changedFiles = frozenset(Coverxygen.get_absolute_path(c_file, self.m_rootDir) for c_file in l_options.m_changedFiles)
+    self.m_reverseIndex = l_options.m_reverseIndex
+    self.m_outputs  = list(l_options.m_outputs) if l_options.m_outputs is not None else [(p_format, p_output)]
+    self.m_roots    = list(l_options.m_roots) if l_options.m_roots is not None else [(p_root, p_rootDir)]
+    self.m_perRoot  = l_options.m_perRoot
+    self.m_compact  = l_options.m_compact
+    self.m_shard    = l_options.m_shard
+    self.m_rootSummaries = []
+    self.m_source   = None
+    self.m_listings = {}
 
   @staticmethod
   def error(p_format, *p_args):
@@ -50,6 +96,15 @@ class Coverxygen(object):
       l_msg = "invalid message format '%s' with args '%s'" % (p_format, str(p_args))
     raise RuntimeError(l_msg)
 
+  def get_config_key(self):
+    """
+      Hash of every setting that changes the symbols extracted from a compound
+      file, used to scope cache entries.
+    """
+    l_config = [__version__, self.m_scope, self.m_kind, self.m_prefix, self.m_rootDir,
+                self.m_excludes, self.m_includes, self.m_excludesymbols, self.m_dedup]
+    return hashlib.sha256(json.dumps(l_config).encode("utf-8")).hexdigest()
+
   def verbose(self, p_fmt, *p_args):
     if self.m_verbose:
       l_msg = p_fmt % p_args
@@ -62,44 +117,139 @@ class Coverxygen(object):
       Coverxygen.error("could not find root index.xml file %s", l_index)
     return l_index
 
+  def get_xml_source(self):
+    """
+      Directory or archive given as xml root, archives are loaded on first use
+    """
+    if self.m_source is None:
+      self.m_source = XmlArchive.load(self.m_root) if XmlArchive.is_archive(self.m_root) else XmlDirectory(self.m_root, self.m_listings)
+    return self.m_source
+
+  @staticmethod
+  def read_file_list(p_path):
+    """
+      Reads one path per line, as printed by git diff --name-only, "-" reads
+      standard input
+    """
+    try:
+      if p_path == "-":
+        l_lines = sys.stdin.read().splitlines()
+      else:
+        with open(p_path, "r", encoding="utf-8") as l_file:
+          l_lines = l_file.read().splitlines()
+    except OSError as l_error:
+      Coverxygen.error("unable to read file list %s : %s", p_path, str(l_error))
+    return [c_line.strip() for c_line in l_lines if c_line.strip()]
+
+  def get_reverse_index_path(self):
+    if self.m_reverseIndex is not None:
+      return self.m_reverseIndex
+    if self.m_root == "-":
+      self.error("a reverse index path is required to select changed files of an xml archive read on standard input")
+    return os.path.normpath(os.path.abspath(self.m_root)) + ".coverxygen.sqlite"
+
+  def select_changed_compounds(self, p_compounds):
+    """
+      Refids of the compound files whose locations reference one of the
+      changed source files, the persistent reverse index is first brought up
+      to date with the compounds listed in index.xml.
+    """
+    l_index = ReverseIndex(self.get_reverse_index_path(), self.m_rootDir)
+    try:
+      l_index.update(self.get_xml_source(), [c_compound[0] for c_compound in p_compounds])
+      l_refids = l_index.select(self.m_changedFiles)
+    finally:
+      l_index.close()
+    self.verbose("reverse index : %d compound files updated, %d selected by %d changed files",
+                 l_index.m_updated, len(l_refids), len(self.m_changedFiles))
+    return l_refids
+
   @staticmethod
-  def get_file_path_from_root(p_root, p_name):
-    l_fileName = "%s.xml" % p_name
-    l_filePath = os.path.join(p_root, l_fileName)
-    if not os.path.exists(l_filePath):
-      Coverxygen.error("could not find indexed file %s", l_filePath)
-    return l_filePath
+  def get_xml_backend(p_name):
+    if p_name == "auto":
+      return "lxml" if LET is not None else "etree"
+    if not p_name in ["etree", "lxml"]:
+      Coverxygen.error("invalid requested xml backend '%s'", p_name)
+    if p_name == "lxml" and LET is None:
+      Coverxygen.error("xml backend 'lxml' requested but lxml module is not installed")
+    return p_name
 
   @staticmethod
-  def get_xmldoc_from_file(p_file):
+  def get_lxml_parser():
+    global _g_lxmlParser # pylint: disable=global-statement
+    if _g_lxmlParser is None:
+      _g_lxmlParser = LET.XMLParser(huge_tree=True, remove_comments=True, remove_pis=True)
+    return _g_lxmlParser
+
+  @staticmethod
+  def get_lxml_xpaths():
+    """
+      Compiled (compounddef, memberdef) lxml xpaths, built on first use
+    """
+    global _g_lxmlXPaths # pylint: disable=global-statement
+    if _g_lxmlXPaths is None:
+      _g_lxmlXPaths = (LET.XPath("/*/compounddef"), LET.XPath(".//memberdef"))
+    return _g_lxmlXPaths
+
+  @staticmethod
+  def iter_memberdefs(p_compound):
+    return p_compound.iter("memberdef")
+
+  @staticmethod
+  def node_to_string(p_node):
+    if LET is not None and LET.iselement(p_node):
+      return LET.tostring(p_node)
+    return ET.tostring(p_node)
+
+  @staticmethod
+  def get_xmldoc_from_file(p_file, p_source=None, p_backend="etree"):
     try:
-      l_doc = ET.parse(p_file)
+      if p_backend == "lxml":
+        l_doc = LET.parse(p_source if p_source is not None else p_file, Coverxygen.get_lxml_parser())
+      else:
+        l_doc = ET.parse(p_source if p_source is not None else p_file)
     except BaseException as l_error:
       Coverxygen.error("error while parsing xml file %s : %s", p_file, str(l_error))
     return l_doc
- 
-  @staticmethod
-  def find_compounddef(p_node, parent_map, compounddefs):
-    l_cur = p_node
-    while l_cur is not None:
-      if l_cur.tag == "compounddef":
-        return l_cur # Found the compounddef 
-      
-      if l_cur.tag == "innerclass":
-        # Found an innerclass → jump to its referenced compounddef
-        l_refid = l_cur.get("refid")
-        if l_refid in compounddefs:
-          return compounddefs[l_refid]
-      
-      l_cur = parent_map.get(l_cur)
-    return None
 
   @staticmethod
-  def extract_name(p_node):
+  def iter_xmlevents_from_file(p_file, p_events, p_source=None, p_backend="etree"):
+    l_source = p_source if p_source is not None else p_file
+    try:
+      if p_backend == "lxml":
+        l_events = LET.iterparse(l_source, events=p_events, huge_tree=True, remove_comments=True, remove_pis=True)
+      else:
+        l_events = ET.iterparse(l_source, p_events)
+      for c_item in l_events:
+        yield c_item
+    except Exception as l_error: # pylint: disable=broad-except
+      Coverxygen.error("error while parsing xml file %s : %s", p_file, str(l_error))
+
+  # direct children read by the extract_* methods
+  SYMBOL_CHILDREN = frozenset(["definition", "name", "qualifiedname", "compoundname", "argsstring", "type", "initializer", "location",
+                               "briefdescription", "detaileddescription", "inbodydescription"])
+
+  @staticmethod
+  def get_children(p_node):
+    """
+      First direct child of p_node for each tag of SYMBOL_CHILDREN, gathered
+      in a single pass and shared by the extract_* methods of a member instead
+      of a find() scan per field
+    """
+    l_children = {}
+    for c_child in p_node:
+      l_tag = c_child.tag
+      if l_tag in Coverxygen.SYMBOL_CHILDREN and not l_tag in l_children:
+        l_children[l_tag] = c_child
+    return l_children
+
+  @staticmethod
+  def extract_name(p_node, p_children=None):
+    l_children = Coverxygen.get_children(p_node) if p_children is None else p_children
     l_id       = p_node.get("id")
-    l_def      = p_node.find("./definition")
-    l_nam      = p_node.find("./name")
-    l_compName = p_node.find("./compoundname")
+    l_def      = l_children.get("definition")
+    l_nam      = l_children.get("name")
+    l_compName = l_children.get("compoundname")
     if l_def is not None:
       return l_def.text
     if l_nam is not None:
@@ -108,52 +258,60 @@ class Coverxygen(object):
       return l_compName.text
     if l_id is not None :
       return l_id
-    Coverxygen.error("unable to deduce name from node %s", ET.tostring(p_node))
+    Coverxygen.error("unable to deduce name from node %s", Coverxygen.node_to_string(p_node))
     return None
 
   @staticmethod
-  def extract_function_sig(p_node):
-    l_def        = p_node.find("./definition")  
-    l_argsstring = p_node.find("./argsstring")
+  def extract_function_sig(p_node, p_children=None):
+    l_children   = Coverxygen.get_children(p_node) if p_children is None else p_children
+    l_def        = l_children.get("definition")
+    l_argsstring = l_children.get("argsstring")
     if l_def is not None and l_argsstring is not None:
       return l_def.text + l_argsstring.text
     return ""  # empty string if not a function
-  
-  @staticmethod
-  def extract_enum_qualified_name(p_node, p_root):
-    """
-      Extracts the qualified name of an enum, including its parent class/namespace if applicable.
-      Since Doxygen does not provide a direct way to get the qualified name of an enum, we need to 
-      look at its parent nodes to determine if it is nested inside a class or namespace. 
-      If the enum is not nested, we simply return its name.
-    """
-    l_name      = p_node.find("./name") 
-    if p_root is None:
-      return l_name.text
-
-    # Build a parent map: child -> parent
-    l_parent_map = {child: parent for parent in p_root.iter() for child in parent}
-    # build map of compounddefs by ID
-    l_compounddefs = {}
-    for comp in p_root.findall(".//compounddef"):
-      l_cid = comp.get("id")
-      if l_cid: 
-        l_compounddefs[l_cid] = comp
-    
-    l_compounddef = Coverxygen.find_compounddef(p_node, l_parent_map, l_compounddefs)
-    if p_node.get("kind") == "enum" and l_name is not None and l_compounddef is not None:
-      return l_compounddef.findtext("compoundname") + "::" + l_name.text
-    
-    return ""  # empty string if not an enum
-  
-  @staticmethod
-  def extract_kind(p_node):
-    l_kind = p_node.get("kind") 
+
+  @staticmethod
+  def extract_qualified_name(p_node, p_scopeName, p_children=None):
+    """
+      Doxygen does not provide the qualified name of all members (enums for
+      instance, or any member before doxygen 1.9), it is then built from the
+      name of the enclosing scope given by the traversal context, see
+      get_scope_name.
+    """
+    l_children = Coverxygen.get_children(p_node) if p_children is None else p_children
+    l_compName = l_children.get("compoundname")
+    if l_compName is not None:
+      return (l_compName.text or "").strip()
+    l_qualifiedName = l_children.get("qualifiedname")
+    if l_qualifiedName is not None and l_qualifiedName.text:
+      return l_qualifiedName.text.strip()
+    l_nameNode = l_children.get("name")
+    if l_nameNode is None:
+      return ""
+    l_name = l_nameNode.text or ""
+    if not p_scopeName:
+      return l_name
+    return p_scopeName + "::" + l_name
+
+  # compound kinds which are a C++ scope of their members, file, group, page or
+  # dir compounds only repeat members of other scopes
+  SCOPE_KINDS = frozenset(["class", "struct", "union", "interface", "namespace"])
+
+  @staticmethod
+  def get_scope_name(p_kind, p_compoundName):
+    if p_kind in Coverxygen.SCOPE_KINDS:
+      return (p_compoundName or "").strip()
+    return ""
+
+  @staticmethod
+  def extract_kind(p_node, p_children=None):
+    l_kind = p_node.get("kind")
 
     if l_kind == 'friend':
-      l_isDefinition = (p_node.get('inline') == 'yes' or p_node.find('initializer') is not None)
+      l_children     = Coverxygen.get_children(p_node) if p_children is None else p_children
+      l_isDefinition = (p_node.get('inline') == 'yes' or l_children.get('initializer') is not None)
       if l_isDefinition:
-        l_friendTypeNode = p_node.find('type')
+        l_friendTypeNode = l_children.get('type')
         if l_friendTypeNode is not None:
           l_friendType = l_friendTypeNode.text
           if l_friendType == 'friend class':
@@ -168,26 +326,27 @@ class Coverxygen(object):
     return l_kind
 
   @staticmethod
-  def extract_documented(p_node):
+  def extract_documented(p_node, p_children=None):
+    l_children = Coverxygen.get_children(p_node) if p_children is None else p_children
     for c_key in ["briefdescription", "detaileddescription", "inbodydescription"]:
-      l_node = p_node.find("./%s" % c_key)
-      if l_node is not None:
-        l_content = "".join(l_node.itertext()).strip()
-        if l_content:
-          return True
+      l_node = l_children.get(c_key)
+      # stops at the first non blank text node instead of joining the whole description
+      if l_node is not None and any(c_text.strip() for c_text in l_node.itertext()):
+        return True
     return False
 
   @staticmethod
-  def extract_location(p_node, p_file, p_rootDir):
+  def extract_location(p_node, p_file, p_rootDir, p_children=None):
+    l_children = Coverxygen.get_children(p_node) if p_children is None else p_children
     l_file = p_file
     l_line = 1
-    l_loc  = p_node.find('./location')
+    l_loc  = l_children.get('location')
     if l_loc is not None:
       l_file = l_loc.get("file")
       l_line = l_loc.get("line", 1)
       if (l_line is None) or (l_file is None):
         Coverxygen.error("unable to extract location from file %s, node : %s",
-                         p_file, ET.tostring(p_node))
+                         p_file, Coverxygen.node_to_string(p_node))
       l_line = int(l_line)
       l_file = Coverxygen.get_absolute_path(l_file, p_rootDir)
     else:
@@ -209,30 +368,34 @@ class Coverxygen(object):
     return False
 
   def matches_include(self, p_file):
-    return Coverxygen.matches_regex_list(p_file, self.m_includes)
+    return FilterPlan.matches(self.m_filters.m_includes, p_file)
 
   def matches_exclude(self, p_file):
-    return Coverxygen.matches_regex_list(p_file, self.m_excludes)
-    
-  def matches_excludesymbol(self, p_node):
-    if (p_node.get("kind") in  ["function", "class", "struct", "namespace", "enum", "typedef", "variable"]):
-      if p_node.get("kind") == "function":
-        l_fulldefstring = Coverxygen.extract_function_sig(p_node)
-      elif p_node.get("kind") == "enum":
-        l_fulldefstring = Coverxygen.extract_enum_qualified_name(p_node, self.m_root)
-      else:
-        l_fulldefstring = Coverxygen.extract_name(p_node)
-        
-      self.verbose("Analyzing symbol: %s", l_fulldefstring )
-      l_match = Coverxygen.matches_regex_list(l_fulldefstring, self.m_excludesymbols) 
-      if l_match:
-        self.verbose("--- Excluding %s: %s", p_node.get("kind"), l_fulldefstring)
-        return True
+    return FilterPlan.matches(self.m_filters.m_excludes, p_file)
+
+  def matches_excludesymbol(self, p_node, p_scopeName=None, p_children=None):
+    l_kind = p_node.get("kind")
+    if l_kind in ["function", "signal", "slot"]:
+      l_fulldefstring = Coverxygen.extract_function_sig(p_node, p_children)
+    elif l_kind in ["class", "struct", "namespace", "typedef", "variable"]:
+      l_fulldefstring = Coverxygen.extract_name(p_node, p_children)
+    else:
+      l_fulldefstring = Coverxygen.extract_qualified_name(p_node, p_scopeName, p_children)
+
+    self.verbose("Analyzing symbol: %s", l_fulldefstring )
+    l_match = FilterPlan.matches(self.m_filters.m_excludesymbols, l_fulldefstring)
+    if l_match:
+      self.verbose("--- Excluding %s: %s", l_kind, l_fulldefstring)
+      return True
     return False
 
-  def should_filter_out(self, p_node, p_file, p_line):
+  def should_filter_out(self, p_node, p_file, p_line, p_scopeName=None, p_kind=None, p_children=None):
+    """
+      p_kind and p_children : kind and children of p_node when already
+      extracted by the caller
+    """
     l_scope  = p_node.get('prot')
-    l_kind   = self.extract_kind(p_node)
+    l_kind   = self.extract_kind(p_node, p_children) if p_kind is None else p_kind
 
     if l_scope is None:
       l_scope = "public"
@@ -240,31 +403,34 @@ class Coverxygen(object):
     if (not l_scope in self.m_scope) or (not l_kind in self.m_kind):
       return True
 
-    if not self.matches_include(p_file):
-      if not p_file.startswith(self.m_prefix):
-        return True
-      if self.matches_exclude(p_file):
-        return True
-        
-    if self.matches_excludesymbol(p_node):
-        return True
+    if self.m_filters.is_file_filtered_out(p_file):
+      return True
+
+    if self.m_filters.m_excludesymbols and self.matches_excludesymbol(p_node, p_scopeName, p_children):
+      return True
 
     self.verbose("found symbol of type %s at %s:%d", l_kind, p_file, p_line)
     return False
 
+  def should_filter_out_fields(self, p_scope, p_kind, p_file, p_line):
+    """
+      Counterpart of should_filter_out for the scan engine which has no xml
+      node, excluded symbols are not handled by this engine.
+    """
+    if (not (p_scope or "public") in self.m_scope) or (not p_kind in self.m_kind):
+      return True
+    if self.m_filters.is_file_filtered_out(p_file):
+      return True
+    self.verbose("found symbol of type %s at %s:%d", p_kind, p_file, p_line)
+    return False
+
   def process_enumValue(self, p_node, p_enum):
-    l_name         = self.extract_name(p_node)
-    l_isDocumented = self.extract_documented(p_node)
-    l_enumValue = {
-      "symbol"    : l_name,
-      "documented": l_isDocumented,
-      "kind"      : "enumvalue",
-      # enum values do not have location information, so we use the location
-      # of the surrounding enum
-      "line"      : p_enum["line"],
-      "file"      : p_enum["file"]
-    }
-    return l_enumValue
+    l_children     = self.get_children(p_node)
+    l_name         = self.extract_name(p_node, l_children)
+    l_isDocumented = self.extract_documented(p_node, l_children)
+    # enum values do not have location information, so we use the location
+    # of the surrounding enum
+    return Symbol(l_name, l_isDocumented, "enumvalue", p_enum.m_line, p_enum.m_file)
 
   def process_enum(self, p_node, p_enum):
     if not 'enumvalue' in self.m_kind:
@@ -275,37 +441,430 @@ class Coverxygen(object):
       l_enumValues.append(self.process_enumValue(c_enumValueNode, p_enum))
     return l_enumValues
 
-  def process_symbol(self, p_node, p_filePath):
-    l_name         = self.extract_name(p_node)
-    l_kind         = self.extract_kind(p_node)
-    l_isDocumented = self.extract_documented(p_node)
-    l_file, l_line = self.extract_location(p_node, p_filePath, self.m_rootDir)
-    if self.should_filter_out(p_node, l_file, l_line):
+  def process_symbol(self, p_node, p_filePath, p_scopeName=None):
+    l_children     = self.get_children(p_node)
+    l_name         = self.extract_name(p_node, l_children)
+    l_kind         = self.extract_kind(p_node, l_children)
+    l_isDocumented = self.extract_documented(p_node, l_children)
+    l_file, l_line = self.extract_location(p_node, p_filePath, self.m_rootDir, l_children)
+    if self.m_profiler is None:
+      l_filtered = self.should_filter_out(p_node, l_file, l_line, p_scopeName, l_kind, l_children)
+    else:
+      l_start    = time.perf_counter()
+      l_filtered = self.should_filter_out(p_node, l_file, l_line, p_scopeName, l_kind, l_children)
+      self.m_profiler.add("filter", time.perf_counter() - l_start)
+    if l_filtered:
       return []
-    l_symbol = {
-      "symbol"     : l_name,
-      "documented" : l_isDocumented,
-      "kind"       : l_kind,
-      "line"       : l_line,
-      "file"       : l_file
-    }
+    l_symbol  = Symbol(l_name, l_isDocumented, l_kind, l_line, l_file)
     l_symbols = [l_symbol]
     if l_kind == 'enum':
       l_symbols.extend(self.process_enum(p_node, l_symbol))
     return l_symbols
 
-  def process_file(self, p_filePath):
+  def process_file(self, p_filePath, p_source=None, p_skipIds=frozenset()):
     self.verbose("processing file : %s", p_filePath)
+    if self.m_profiler is None:
+      return self.extract_file_symbols(p_filePath, p_source, p_skipIds)
+    l_mark    = self.m_profiler.start_file()
+    l_symbols = self.extract_file_symbols(p_filePath, p_source, p_skipIds)
+    self.m_profiler.end_file(l_mark, p_filePath, self.get_xml_source().get_size(p_filePath), len(l_symbols))
+    return l_symbols
+
+  def extract_file_symbols(self, p_filePath, p_source=None, p_skipIds=frozenset()):
+    if self.m_engine == "stream":
+      return list(self.iter_file_symbols_streaming(p_filePath, p_source, p_skipIds))
+    if self.m_engine == "scan":
+      l_symbols = self.scan_file_symbols(p_filePath, p_source, p_skipIds)
+      if l_symbols is not None:
+        return l_symbols
+      self.verbose("scan engine falls back on tree engine for file %s", p_filePath)
+      self.m_scanFallbacks += 1
+    elif self.m_engine != "tree":
+      self.error("invalid requested extraction engine '%s'", self.m_engine)
+    l_symbols   = []
+    if self.m_profiler is None:
+      l_xmlDoc  = self.get_xmldoc_from_file(p_filePath, p_source, self.m_backend)
+    else:
+      l_start   = time.perf_counter()
+      l_xmlDoc  = self.get_xmldoc_from_file(p_filePath, p_source, self.m_backend)
+      self.m_profiler.add("parse", time.perf_counter() - l_start)
+    if self.m_backend == "lxml":
+      l_compoundsXPath, l_members = Coverxygen.get_lxml_xpaths()
+      l_compounds = l_compoundsXPath(l_xmlDoc)
+    else:
+      l_compounds = l_xmlDoc.findall("./compounddef")
+      l_members   = Coverxygen.iter_memberdefs
+    for c_compound in l_compounds:
+      l_scopeName = self.get_scope_name(c_compound.get("kind"), c_compound.findtext("./compoundname", ""))
+      for c_def in l_members(c_compound):
+        if c_def.get("id") in p_skipIds:
+          continue
+        l_symbols.extend(self.process_symbol(c_def, p_filePath, l_scopeName))
+    for c_compound in l_compounds:
+      l_symbols.extend(self.process_symbol(c_compound, p_filePath))
+    return l_symbols
+
+  # compounddef children read by process_symbol, all other children are dropped
+  # as soon as they are parsed
+  STREAM_COMPOUND_FIELDS = frozenset([
+    "compoundname", "definition", "name", "argsstring", "type", "initializer",
+    "briefdescription", "detaileddescription", "inbodydescription", "location"
+  ])
+
+  def iter_file_symbols_streaming(self, p_filePath, p_source=None, p_skipIds=frozenset()):
+    """
+      Incremental counterpart of the tree engine: symbols of each memberdef are
+      yielded as soon as the element is closed, then the element is detached
+      from the tree. Peak memory is bounded by the largest member instead of the
+      whole file. Compound symbols are yielded last to keep the tree engine order.
+    """
+    l_stack     = []
+    l_compounds = []
+    l_scopeName = ""
+    l_events    = self.iter_xmlevents_from_file(p_filePath, ("start", "end"), p_source, self.m_backend)
+    if self.m_profiler is not None:
+      l_events = self.m_profiler.iter_timed("parse", l_events)
+    for c_event, c_node in l_events:
+      if c_event == "start":
+        l_stack.append(c_node)
+        continue
+      l_stack.pop()
+      if len(l_stack) < 2:
+        if len(l_stack) == 1 and c_node.tag == "compounddef":
+          l_compounds.extend(self.process_symbol(c_node, p_filePath))
+          l_stack[-1].remove(c_node)
+        continue
+      if c_node.tag == "memberdef" and l_stack[1].tag == "compounddef":
+        if not c_node.get("id") in p_skipIds:
+          for c_symbol in self.process_symbol(c_node, p_filePath, l_scopeName):
+            yield c_symbol
+        l_stack[-1].remove(c_node)
+        c_node.clear()
+      elif len(l_stack) == 2 and c_node.tag == "compoundname":
+        l_scopeName = self.get_scope_name(l_stack[1].get("kind"), c_node.text)
+      elif len(l_stack) == 2 and c_node.tag not in self.STREAM_COMPOUND_FIELDS:
+        l_stack[-1].remove(c_node)
+        c_node.clear()
+    for c_symbol in l_compounds:
+      yield c_symbol
+
+  # constructs the scan engine does not interpret like the xml parser : comments,
+  # cdata, dtd, processing instructions, character or custom entities and
+  # carriage returns (normalized by the parser)
+  SCAN_UNSUPPORTED_REGEX = re.compile(rb'<!--|<!\[CDATA\[|<!DOCTYPE|<!ENTITY|<\?(?!xml\s)|&(?!(?:amp|lt|gt|quot|apos);)|\r')
+  SCAN_ENCODING_REGEX    = re.compile(rb'^\s*<\?xml[^>]*\bencoding\s*=\s*["\'](?!utf-8["\'])', re.I)
+  SCAN_NESTED_REGEX      = re.compile(rb'<(templateparamlist|param|listofallmembers)\b[^>]*(?<!/)>.*?</\1>', re.S)
+  # direct children read by the tree engine, descriptions are matched as a whole
+  # so that their content is never mistaken for a child
+  SCAN_CHILD_REGEX       = re.compile(rb'<(briefdescription|detaileddescription|inbodydescription|definition|name|compoundname)'
+                                      rb'\b[^>]*?(?:/>|>(.*?)</\1>)|<location\b([^>]*)>', re.S)
+  SCAN_DESCRIPTIONS      = frozenset([b"briefdescription", b"detaileddescription", b"inbodydescription"])
+  SCAN_ATTRIBUTE_REGEX   = re.compile(rb'(?<![\w:.-])(kind|id|prot|inline|file|line)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+  SCAN_TAG_REGEX         = re.compile(rb'<[^>]*>')
+  SCAN_DEFINITION_REGEX  = re.compile(rb'<(?:compounddef|memberdef)\b')
+  SCAN_TYPE_REGEX        = re.compile(rb'<type\b[^>]*?(?:/>|>(.*?)</type>)', re.S)
+  SCAN_INITIALIZER_REGEX = re.compile(rb'<initializer\b')
+
+  XML_REFERENCE_REGEX = re.compile(r"&(#[0-9]+|#x[0-9a-fA-F]+|amp|lt|gt|quot|apos);")
+  XML_ENTITIES        = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+
+  @staticmethod
+  def replace_xml_reference(p_match):
+    l_name = p_match.group(1)
+    if l_name.startswith("#x"):
+      return chr(int(l_name[2:], 16))
+    if l_name.startswith("#"):
+      return chr(int(l_name[1:]))
+    return Coverxygen.XML_ENTITIES[l_name]
+
+  @staticmethod
+  def decode_xml_text(p_data):
+    """
+      Text of raw xml bytes with entity and character references replaced as
+      the xml parser does, shared by every byte level scan so that they agree
+      with the parser and with each other, eg. on location paths. Raises
+      ValueError on invalid utf-8 or character references.
+    """
+    l_text = p_data.decode("utf-8")
+    if "&" in l_text:
+      return Coverxygen.XML_REFERENCE_REGEX.sub(Coverxygen.replace_xml_reference, l_text)
+    return l_text
+
+  @staticmethod
+  def scan_attributes(p_data):
+    l_attrs = {}
+    for c_name, c_double, c_single in Coverxygen.SCAN_ATTRIBUTE_REGEX.findall(p_data):
+      l_value = Coverxygen.decode_xml_text(c_double or c_single)
+      if "\n" in l_value or "\t" in l_value:
+        l_value = l_value.replace("\n", " ").replace("\t", " ")
+      l_attrs[c_name.decode("utf-8")] = l_value
+    return l_attrs
+
+  @staticmethod
+  def scan_has_text(p_content):
+    """
+      Whether the element content has text, named entities are never blank
+    """
+    l_text = Coverxygen.SCAN_TAG_REGEX.sub(b"", p_content).strip()
+    if not l_text or l_text.isascii():
+      return bool(l_text)
+    return bool(l_text.decode("utf-8").strip())
+
+  @staticmethod
+  def scan_element(p_attrs, p_body):
+    """
+      Reads from the raw bytes of a memberdef, compounddef or enumvalue body
+      what the tree engine reads from direct children : name, documentation
+      and location. Nested elements able to hold the same children must have
+      been removed from p_body, p_attrs are the parsed element attributes.
+      Raises ValueError when the element is not understood.
+    """
+    l_documented = False
+    l_location   = None
+    l_fields     = {}
+    for c_tag, c_content, c_location in Coverxygen.SCAN_CHILD_REGEX.findall(p_body):
+      if not c_tag:
+        if l_location is not None:
+          raise ValueError("duplicated location")
+        l_location = Coverxygen.scan_attributes(c_location)
+      elif c_tag in l_fields:
+        raise ValueError("duplicated %s" % c_tag.decode("utf-8"))
+      elif c_tag in Coverxygen.SCAN_DESCRIPTIONS:
+        l_fields[c_tag] = None
+        if not l_documented and c_content:
+          l_documented = Coverxygen.scan_has_text(c_content)
+      elif b"<" in c_content:
+        raise ValueError("unexpected %s content" % c_tag.decode("utf-8"))
+      else:
+        l_fields[c_tag] = Coverxygen.decode_xml_text(c_content) if c_content else None
+    if b"compoundname" in l_fields and (b"name" in l_fields or b"definition" in l_fields):
+      raise ValueError("unexpected compound children")
+    l_name = p_attrs.get("id")
+    for c_tag in [b"compoundname", b"name", b"definition"]:
+      if c_tag in l_fields:
+        l_name = l_fields[c_tag]
+    if l_name is None and not (b"compoundname" in l_fields or b"name" in l_fields or b"definition" in l_fields):
+      raise ValueError("no name")
+    return l_name, l_documented, l_location
+
+  @staticmethod
+  def scan_friend_kind(p_attrs, p_body):
+    """
+      Byte level counterpart of extract_kind for friend members
+    """
+    if p_attrs.get("inline") != "yes" and not Coverxygen.SCAN_INITIALIZER_REGEX.search(p_body):
+      return "friend"
+    l_types = Coverxygen.SCAN_TYPE_REGEX.findall(p_body)
+    if len(l_types) > 1:
+      raise ValueError("duplicated type")
+    if not l_types:
+      return "friend"
+    return {
+      "friend class"  : "class",
+      "friend struct" : "struct",
+      "friend union"  : "union"
+    }.get(Coverxygen.decode_xml_text(l_types[0].split(b"<")[0]), "function")
+
+  def scan_symbols(self, p_attrs, p_body, p_filePath, p_enumValues=()):
+    l_name, l_documented, l_location = self.scan_element(p_attrs, p_body)
+    l_kind = p_attrs.get("kind")
+    if l_kind == "friend":
+      l_kind = self.scan_friend_kind(p_attrs, p_body)
+    if l_location is not None:
+      if l_location.get("file") is None:
+        raise ValueError("location without file")
+      l_line = int(l_location.get("line", 1))
+      l_file = self.m_scanPaths.get(l_location["file"])
+      if l_file is None:
+        l_file = self.m_scanPaths.setdefault(l_location["file"], Coverxygen.get_absolute_path(l_location["file"], self.m_rootDir))
+    else:
+      l_line = 1
+      l_file = os.path.abspath(p_filePath)
+    if self.should_filter_out_fields(p_attrs.get("prot"), l_kind, l_file, l_line):
+      return []
+    l_symbol  = Symbol(l_name, l_documented, l_kind, l_line, l_file)
+    l_symbols = [l_symbol]
+    if l_kind == "enum" and "enumvalue" in self.m_kind:
+      for c_attrs, c_body in p_enumValues:
+        l_valueName, l_valueDocumented, _ = self.scan_element(self.scan_attributes(c_attrs), c_body)
+        l_symbols.append(Symbol(l_valueName, l_valueDocumented, "enumvalue", l_line, l_file))
+    return l_symbols
+
+  def scan_file_symbols(self, p_filePath, p_source=None, p_skipIds=frozenset()):
+    """
+      Experimental engine : symbols are read from the raw compound bytes with
+      regular expressions, without building an xml tree. Returns None when the
+      file contains a construct the scanner does not understand, the caller
+      then falls back on the tree engine. Symbols excluded by name are only
+      handled by the tree engine. Malformed xml is only detected through the
+      balance of opening and closing tags, mismatched tag names go unnoticed.
+    """
+    if self.m_filters.m_excludesymbols:
+      return None
+    try:
+      if p_source is not None:
+        return self.scan_data_symbols(p_filePath, p_source.getvalue(), p_skipIds)
+      with open(p_filePath, "rb") as l_file:
+        with mmap.mmap(l_file.fileno(), 0, access=mmap.ACCESS_READ) as l_map:
+          return self.scan_data_symbols(p_filePath, l_map, p_skipIds)
+    except (OSError, ValueError):
+      return None
+
+  @staticmethod
+  def scan_split(p_data, p_tag, p_start=0, p_end=None):
+    """
+      Splits p_data between p_start and p_end into the (attributes, body) of
+      its p_tag elements and the remaining bytes. Raises ValueError on self
+      closing, nested or unterminated elements.
+    """
+    l_open     = b"<" + p_tag
+    l_close    = b"</" + p_tag + b">"
+    l_end      = len(p_data) if p_end is None else p_end
+    l_elements = []
+    l_residual = []
+    l_last     = p_start
+    l_pos      = p_data.find(l_open, p_start, l_end)
+    while l_pos != -1:
+      if not p_data[l_pos + len(l_open):l_pos + len(l_open) + 1] in (b" ", b"\t", b"\n", b">", b"/"):
+        # longer tag name sharing the prefix
+        l_pos = p_data.find(l_open, l_pos + 1, l_end)
+        continue
+      l_head = p_data.find(b">", l_pos, l_end)
+      l_stop = p_data.find(l_close, l_head, l_end)
+      if l_head == -1 or l_stop == -1 or p_data[l_head - 1] == ord("/") or p_data.find(l_open, l_head, l_stop) != -1:
+        raise ValueError("unexpected %s element" % p_tag.decode("utf-8"))
+      l_elements.append((p_data[l_pos + len(l_open):l_head], p_data[l_head + 1:l_stop]))
+      l_residual.append(p_data[l_last:l_pos])
+      l_last = l_stop + len(l_close)
+      l_pos  = p_data.find(l_open, l_last, l_end)
+    l_residual.append(p_data[l_last:l_end])
+    return l_elements, b"".join(l_residual)
+
+  @staticmethod
+  def scan_is_balanced(p_data):
+    """
+      Cheap well-formedness check : as many closing tags as non empty opening tags
+    """
+    l_opening = p_data.count(b"<") - p_data.count(b"<?") - p_data.count(b"/>")
+    return l_opening == 2 * p_data.count(b"</")
+
+  def scan_data_symbols(self, p_filePath, p_data, p_skipIds):
+    if Coverxygen.SCAN_UNSUPPORTED_REGEX.search(p_data) or Coverxygen.SCAN_ENCODING_REGEX.match(p_data):
+      return None
     l_symbols   = []
-    l_xmlDoc    = self.get_xmldoc_from_file(p_filePath)
-    l_xmlNodes  = l_xmlDoc.findall("./compounddef//memberdef")
-    l_xmlNodes += l_xmlDoc.findall("./compounddef")
-    for c_def in l_xmlNodes:
-      l_symbols.extend(self.process_symbol(c_def, p_filePath))
+    l_compounds = []
+    l_count     = 0
+    l_elements, l_residual = self.scan_split(p_data, b"compounddef")
+    if not l_elements or not self.scan_is_balanced(l_residual):
+      return None
+    for c_attrs, c_body in l_elements:
+      if not self.scan_is_balanced(c_body):
+        return None
+      l_members, l_body = self.scan_split(c_body, b"memberdef")
+      l_count += 1 + len(l_members)
+      for c_memberAttrs, c_memberBody in l_members:
+        l_attrs = self.scan_attributes(c_memberAttrs)
+        if l_attrs.get("id") in p_skipIds:
+          continue
+        l_values = ()
+        if b"<enumvalue" in c_memberBody:
+          l_values, c_memberBody = self.scan_split(c_memberBody, b"enumvalue")
+        if b"param" in c_memberBody:
+          c_memberBody = Coverxygen.SCAN_NESTED_REGEX.sub(b"", c_memberBody)
+        l_symbols.extend(self.scan_symbols(l_attrs, c_memberBody, p_filePath, l_values))
+      if b"param" in l_body or b"<listofallmembers" in l_body:
+        l_body = Coverxygen.SCAN_NESTED_REGEX.sub(b"", l_body)
+      l_compounds.append((self.scan_attributes(c_attrs), l_body))
+    # definitions the split did not see would be missed
+    if l_count != len(Coverxygen.SCAN_DEFINITION_REGEX.findall(p_data)):
+      return None
+    for c_attrs, c_body in l_compounds:
+      l_symbols.extend(self.scan_symbols(c_attrs, c_body, p_filePath))
     return l_symbols
 
+  LOCATION_REGEX   = re.compile(rb'<location\s[^>]*?\bfile="([^"]*)"')
+  DEFINITION_REGEX = re.compile(rb'<(?:memberdef|compounddef)[\s>]')
+
+  def is_out_of_scope(self, p_filePath, p_data=None):
+    """
+      Cheap pre-scan of the raw compound bytes, without xml parsing. Returns True
+      when every memberdef and compounddef has a location whose file is filtered
+      out by path. Doxygen writes the compound location after all its members,
+      so the whole file is scanned. Any construct that could make the raw scan
+      disagree with the parser makes it return False, leaving the decision to
+      the full parse.
+    """
+    if p_data is None:
+      try:
+        with open(p_filePath, "rb") as l_file:
+          with mmap.mmap(l_file.fileno(), 0, access=mmap.ACCESS_READ) as l_map:
+            return self.is_out_of_scope(p_filePath, l_map)
+      except (OSError, ValueError):
+        return False
+    if p_data.find(b"<!--") != -1 or p_data.find(b"<![CDATA[") != -1:
+      return False
+    l_locations = Coverxygen.LOCATION_REGEX.findall(p_data)
+    if not l_locations or len(l_locations) < len(Coverxygen.DEFINITION_REGEX.findall(p_data)):
+      return False
+    for c_location in set(l_locations):
+      try:
+        l_location = Coverxygen.decode_xml_text(c_location)
+      except ValueError:
+        return False
+      l_file = Coverxygen.get_absolute_path(l_location, self.m_rootDir)
+      if not self.m_filters.is_file_filtered_out(l_file):
+        return False
+    self.verbose("skipping file %s : out of scope", p_filePath)
+    self.m_outOfScope += 1
+    return True
+
+  def process_compound(self, p_filePath, p_skipIds=frozenset()):
+    l_prescan = self.m_filters.has_path_filters()
+    l_source  = self.get_xml_source()
+    if self.m_cache is None and not l_source.m_inMemory:
+      if l_prescan and self.is_out_of_scope(p_filePath):
+        return []
+      return self.process_file(p_filePath, None, p_skipIds)
+    l_data = l_source.read(p_filePath)
+    if l_prescan and self.is_out_of_scope(p_filePath, l_data):
+      return []
+    if self.m_cache is None:
+      return self.process_file(p_filePath, io.BytesIO(l_data), p_skipIds)
+    l_key  = self.m_cache.get_key(l_data, p_filePath, sorted(p_skipIds))
+    l_rows = self.m_cache.load(l_key)
+    if l_rows is not None:
+      return [Coverxygen.symbol_from_row(c_row) for c_row in l_rows]
+    l_symbols = self.process_file(p_filePath, io.BytesIO(l_data), p_skipIds)
+    self.m_cache.store(l_key, [Coverxygen.symbol_to_row(c_symbol) for c_symbol in l_symbols])
+    return l_symbols
+
+  def get_counters(self):
+    """
+      Statistics updated while processing compound files, worker processes
+      send back their increments along with the extracted symbols.
+    """
+    l_counters = { "outOfScope" : self.m_outOfScope, "scanFallbacks" : self.m_scanFallbacks }
+    if self.m_cache is not None:
+      l_counters["hits"]   = self.m_cache.m_hits
+      l_counters["misses"] = self.m_cache.m_misses
+    return l_counters
+
+  def add_counters(self, p_counters):
+    self.m_outOfScope += p_counters["outOfScope"]
+    self.m_scanFallbacks += p_counters["scanFallbacks"]
+    if self.m_cache is not None:
+      self.m_cache.m_hits   += p_counters["hits"]
+      self.m_cache.m_misses += p_counters["misses"]
+
   def process_index(self, p_xmlDoc):
-    l_symbols = []
+    return list(self.iter_index(p_xmlDoc))
+
+  def plan_index(self, p_xmlDoc):
+    """
+      Reads compound entries of index.xml as (refid, kind, members) tuples,
+      members being the list of (refid, kind) of the member elements.
+    """
+    l_compounds = []
     for c_entry in p_xmlDoc.findall('compound'):
       l_kind  = c_entry.get("kind")
       l_refid = c_entry.get("refid")
@@ -315,9 +874,343 @@ class Coverxygen(object):
         self.error("missing refid attribute on compound element : %s", str(c_entry))
       if l_kind == "dir":
         continue
-      l_filePath = self.get_file_path_from_root(self.m_root, l_refid)
-      l_symbols.extend(self.process_file(l_filePath))
-    return l_symbols
+      l_members = [(c_member.get("refid"), c_member.get("kind")) for c_member in c_entry.findall("member")]
+      l_compounds.append((l_refid, l_kind, l_members))
+    return l_compounds
+
+  def get_skipped_members(self, p_compounds):
+    """
+      Doxygen writes the same memberdef in each compound listing it (class,
+      file, namespace, group). Returns for each compound the set of member ids
+      whose retained occurrence, according to m_dedup, belongs to another
+      compound.
+    """
+    if self.m_dedup == "none":
+      return [frozenset()] * len(p_compounds)
+    if not self.m_dedup in ["first", "last"]:
+      self.error("invalid requested deduplication policy '%s'", self.m_dedup)
+    l_owners = {}
+    for c_index, c_compound in enumerate(p_compounds):
+      for c_memberId, _ in c_compound[2]:
+        if self.m_dedup == "last" or not c_memberId in l_owners:
+          l_owners[c_memberId] = c_index
+    l_skips = []
+    for c_index, c_compound in enumerate(p_compounds):
+      l_skips.append(frozenset(c_memberId for c_memberId, _ in c_compound[2]
+                               if l_owners[c_memberId] != c_index))
+    return l_skips
+
+  # kinds a friend member may be reported as, see extract_kind
+  FRIEND_KINDS = ["friend", "class", "struct", "union", "function"]
+
+  def can_yield_symbols(self, p_compound):
+    """
+      Tells from the kinds listed in index.xml whether the compound file may
+      contain a symbol of a requested kind. Enum values are only reported
+      along with their enum, which is listed as a member on its own.
+    """
+    l_refid, l_kind, l_members = p_compound
+    if l_kind in self.m_kind:
+      return True
+    for _, c_memberKind in l_members:
+      if c_memberKind == "friend":
+        if any(c_kind in self.m_kind for c_kind in Coverxygen.FRIEND_KINDS):
+          return True
+      elif c_memberKind != "enumvalue" and c_memberKind in self.m_kind:
+        return True
+    self.verbose("skipping compound %s : no symbol of requested kinds", l_refid)
+    return False
+
+  def plan_items(self, p_xmlDoc):
+    """
+      Compound files to process as (file path, member ids to skip) tuples
+    """
+    l_source    = self.get_xml_source()
+    l_listing   = l_source.get_listing()
+    l_compounds = self.plan_index(p_xmlDoc)
+    l_skips     = self.get_skipped_members(l_compounds)
+    l_changed   = None
+    if self.m_changedFiles is not None:
+      l_changed = self.select_changed_compounds(l_compounds)
+    l_items     = []
+    l_missing   = []
+    for c_compound, c_skipIds in zip(l_compounds, l_skips):
+      if not self.can_yield_symbols(c_compound):
+        continue
+      # a missing file can not be told apart from a changed one by the reverse index
+      if not "%s.xml" % c_compound[0] in l_listing:
+        l_missing.append("%s.xml" % c_compound[0])
+        continue
+      if l_changed is not None and not c_compound[0] in l_changed:
+        continue
+      l_items.append((l_source.get_file_path(c_compound[0]), c_skipIds))
+    self.check_listing(p_xmlDoc, l_listing, l_missing)
+    if self.m_shard is not None:
+      l_items = self.select_shard(l_items)
+    self.m_skipped = len(l_compounds) - len(l_items)
+    self.verbose("skipped %d of %d compound files", self.m_skipped, len(l_compounds))
+    return l_items
+
+  # xml files doxygen writes besides compound files
+  XML_EXTRA_FILES = frozenset(["index.xml", "Doxyfile.xml"])
+
+  @staticmethod
+  def format_names(p_names, p_max=10):
+    l_names = sorted(p_names)
+    if len(l_names) > p_max:
+      return "%s, ... (%d more)" % (", ".join(l_names[:p_max]), len(l_names) - p_max)
+    return ", ".join(l_names)
+
+  def check_listing(self, p_xmlDoc, p_listing, p_missing):
+    """
+      Reports at once every compound file to process missing from the xml
+      root, along with the xml files index.xml does not reference which
+      usually denote a stale doxygen output
+    """
+    l_indexed = set("%s.xml" % c_entry.get("refid") for c_entry in p_xmlDoc.findall("compound"))
+    l_orphans = set(p_listing) - l_indexed - Coverxygen.XML_EXTRA_FILES
+    l_message = ""
+    if l_orphans:
+      l_message = "%d xml files of %s are not referenced by index.xml : %s" % (
+        len(l_orphans), self.m_root, self.format_names(l_orphans))
+    if p_missing:
+      self.error("could not find %d indexed files in %s : %s%s", len(p_missing), self.m_root,
+                 self.format_names(p_missing), "\n" + l_message if l_message else "")
+    if l_message:
+      self.verbose("%s", l_message)
+
+  def select_shard(self, p_items):
+    """
+      Items of shard i out of N, m_shard being the (i, N) tuple with i starting
+      at 1. Compound files are assigned from the largest to the smallest to
+      the least loaded shard, ties being broken by file name so that every
+      machine computes the same assignment from the same xml files.
+    """
+    l_index, l_count = self.m_shard
+    if l_count < 1 or not 1 <= l_index <= l_count:
+      self.error("invalid shard %d/%d", l_index, l_count)
+    l_source = self.get_xml_source()
+    l_sizes  = [l_source.get_size(c_filePath) for c_filePath, _ in p_items]
+    l_order  = sorted(range(len(p_items)), key=lambda p_pos: (-l_sizes[p_pos], os.path.basename(p_items[p_pos][0])))
+    l_loads  = [(0, c_shard) for c_shard in range(l_count)]
+    l_kept   = set()
+    for c_pos in l_order:
+      l_load, l_shard = heapq.heappop(l_loads)
+      if l_shard == l_index - 1:
+        l_kept.add(c_pos)
+      heapq.heappush(l_loads, (l_load + l_sizes[c_pos], l_shard))
+    self.verbose("shard %d/%d : %d of %d compound files", l_index, l_count, len(l_kept), len(p_items))
+    return [c_item for c_pos, c_item in enumerate(p_items) if c_pos in l_kept]
+
+  def select_symbols(self, p_symbols):
+    # selected compounds may also document other files, eg. namespaces
+    if self.m_changedFiles is None:
+      return p_symbols
+    return (c_symbol for c_symbol in p_symbols if c_symbol["file"] in self.m_changedFiles)
+
+  def iter_index(self, p_xmlDoc):
+    for _, c_symbols in self.iter_compounds(p_xmlDoc):
+      for c_symbol in c_symbols:
+        yield c_symbol
+
+  def iter_compounds(self, p_xmlDoc):
+    """
+      Yields (compound file path, symbols) for each processed compound file
+    """
+    l_items = self.plan_items(p_xmlDoc)
+    if self.m_jobs > 1 and len(l_items) > 1:
+      l_compounds = self.iter_files_parallel(l_items)
+    else:
+      l_compounds = ((c_filePath, self.process_compound(c_filePath, c_skipIds)) for c_filePath, c_skipIds in l_items)
+    for c_filePath, c_symbols in l_compounds:
+      yield c_filePath, self.select_symbols(c_symbols)
+    self.end_compounds()
+
+  def end_compounds(self):
+    if self.m_outOfScope:
+      self.verbose("skipped %d compound files out of scope", self.m_outOfScope)
+    if self.m_scanFallbacks:
+      self.verbose("%d compound files parsed by tree engine instead of scan engine", self.m_scanFallbacks)
+    if self.m_cache is not None:
+      self.m_cache.trim()
+
+  def iter_root(self):
+    # index.xml is only parsed once the first symbol is requested
+    l_source    = self.get_xml_source()
+    l_indexPath = l_source.get_index_path()
+    try:
+      l_xmlDoc = self.get_xmldoc_from_file(l_indexPath, l_source.open(l_indexPath), self.m_backend)
+      for c_symbol in self.iter_index(l_xmlDoc):
+        yield c_symbol
+    finally:
+      l_source.close()
+
+  def create_root(self, p_root, p_rootDir):
+    """
+      Copy of this instance bound to another xml root and root source
+      directory, sharing filters, options and profiler
+    """
+    l_obj = copy.copy(self)
+    l_obj.m_roots   = [(p_root, p_rootDir)]
+    l_obj.m_root    = p_root
+    l_obj.m_rootDir = os.path.abspath(p_rootDir) if p_rootDir is not None else ""
+    l_obj.m_source  = None
+    l_obj.m_skipped = 0
+    l_obj.m_outOfScope = 0
+    l_obj.m_scanFallbacks = 0
+    l_obj.m_scanPaths = {}
+    if self.m_changedFileList is not None:
+      l_obj.m_changedFiles = frozenset(Coverxygen.get_absolute_path(c_file, l_obj.m_rootDir)
+                                       for c_file in self.m_changedFileList)
+    if self.m_cache is not None:
+      l_obj.m_cache = ResultCache(self.m_cache.m_dir, l_obj.get_config_key(), self.m_cache.m_maxSize)
+    return l_obj
+
+  def iter_root_symbols(self, p_roots):
+    """
+      Yields the list of symbols of each root. When several jobs are requested,
+      the compound files of every root are planned here and processed by a
+      single pool, so that a large root is spread over all workers.
+    """
+    if self.m_jobs <= 1:
+      for c_root in p_roots:
+        l_symbols = list(c_root.iter_root())
+        self.add_counters(c_root.get_counters())
+        yield l_symbols
+      return
+    l_items = []
+    for c_index, c_root in enumerate(p_roots):
+      # standard input of worker processes is /dev/null, archives are read
+      # here and sent along with their root
+      l_source    = c_root.get_xml_source()
+      l_indexPath = l_source.get_index_path()
+      l_xmlDoc    = c_root.get_xmldoc_from_file(l_indexPath, l_source.open(l_indexPath), c_root.m_backend)
+      l_items.extend((c_index, c_filePath, c_skipIds) for c_filePath, c_skipIds in c_root.plan_items(l_xmlDoc))
+    l_index   = 0
+    l_symbols = []
+    for c_index, _, c_symbols in self.iter_roots_parallel(p_roots, l_items):
+      # items are ordered by root, a root is complete once the next one starts
+      while l_index < c_index:
+        yield self.end_root_symbols(p_roots[l_index], l_symbols)
+        l_index  += 1
+        l_symbols = []
+      l_symbols.extend(p_roots[c_index].select_symbols(c_symbols))
+    for c_root in p_roots[l_index:]:
+      yield self.end_root_symbols(c_root, l_symbols)
+      l_symbols = []
+
+  def end_root_symbols(self, p_root, p_symbols):
+    p_root.end_compounds()
+    p_root.get_xml_source().close()
+    self.add_counters(p_root.get_counters())
+    return p_symbols
+
+  def iter_roots(self):
+    """
+      Symbols of every xml root merged in a single set. A symbol already
+      reported by a previous root, eg. from a header shared by several
+      components, is identified by its (file, line, kind, symbol) key and
+      skipped. Duplicates within a root are left to the dedup policy.
+    """
+    if self.m_reverseIndex is not None:
+      self.error("a reverse index path can not be shared by several xml roots")
+    l_roots = [self.create_root(c_root, c_rootDir) for c_root, c_rootDir in self.m_roots]
+    l_seen  = set()
+    self.m_rootSummaries = []
+    for (c_root, _), c_symbols in zip(self.m_roots, self.iter_root_symbols(l_roots)):
+      l_counts = SymbolAggregate(p_keepSymbols=False, p_keepLines=False)
+      l_keys   = set()
+      for c_symbol in c_symbols:
+        l_counts.add(c_symbol)
+        l_key = (c_symbol["file"], c_symbol["line"], c_symbol["kind"], c_symbol["symbol"])
+        if l_key in l_seen:
+          continue
+        l_keys.add(l_key)
+        yield c_symbol
+      l_seen.update(l_keys)
+      self.m_rootSummaries.append((c_root, l_counts.get_summary()))
+    self.verbose("merged %d xml roots", len(l_roots))
+
+  def iter_symbols(self):
+    """
+      Lazily yields the Symbol records of every configured xml root, compound
+      files are only parsed as the iterator is consumed so that a caller may
+      stop early. Neither p_output nor p_format are used.
+    """
+    if len(self.m_roots) > 1:
+      return self.iter_roots()
+    return self.iter_root()
+
+  def report(self, p_keepSymbols=True):
+    """
+      Report over iter_symbols, see Report
+    """
+    return Report(self.iter_symbols(), p_keepSymbols)
+
+  @staticmethod
+  def split_in_chunks(p_files, p_chunkCount, p_sizes=None):
+    """
+      Splits the ordered list of compound files into contiguous chunks of roughly
+      equal XML byte size. A file larger than the target size gets a chunk of its
+      own so that a single huge compound does not hold back a batch of small ones.
+    """
+    l_sizes  = p_sizes if p_sizes is not None else [os.path.getsize(c_file) for c_file in p_files]
+    l_target = max(1, sum(l_sizes) // max(1, p_chunkCount))
+    l_chunks = []
+    l_chunk  = []
+    l_size   = 0
+    for c_file, c_size in zip(p_files, l_sizes):
+      if l_chunk and c_size >= l_target:
+        l_chunks.append(l_chunk)
+        l_chunk = []
+        l_size  = 0
+      l_chunk.append(c_file)
+      l_size += c_size
+      if l_size >= l_target:
+        l_chunks.append(l_chunk)
+        l_chunk = []
+        l_size  = 0
+    if l_chunk:
+      l_chunks.append(l_chunk)
+    return l_chunks
+
+  def process_files_parallel(self, p_items):
+    return [c_symbol for _, c_symbols in self.iter_files_parallel(p_items) for c_symbol in c_symbols]
+
+  def iter_files_parallel(self, p_items):
+    """
+      p_items : list of (compound file path, member ids to skip)
+      Yields (compound file path, symbols) in p_items order
+    """
+    for _, c_filePath, c_symbols in self.iter_roots_parallel([self], [(0,) + c_item for c_item in p_items]):
+      yield c_filePath, c_symbols
+
+  def iter_roots_parallel(self, p_roots, p_items):
+    """
+      p_roots : instances bound to each xml root, see create_root
+      p_items : list of (index in p_roots, compound file path, member ids to skip)
+      Yields (index in p_roots, compound file path, symbols) in p_items order,
+      counters of each root are updated with the increments of the workers
+    """
+    l_sizes  = [p_roots[c_index].get_xml_source().get_size(c_filePath) for c_index, c_filePath, _ in p_items]
+    l_chunks = self.split_in_chunks(p_items, self.m_jobs * 4, l_sizes)
+    with multiprocessing.Pool(self.m_jobs, _worker_init, (p_roots,)) as l_pool:
+      # imap preserves chunk order, results are therefore identical to the serial path
+      for c_results, c_counters, c_profile in l_pool.imap(_worker_process_chunk, l_chunks):
+        for c_index, c_delta in c_counters.items():
+          p_roots[c_index].add_counters(c_delta)
+        if c_profile is not None:
+          self.m_profiler.merge(c_profile)
+        for c_index, c_filePath, c_rows in c_results:
+          yield c_index, c_filePath, [Coverxygen.symbol_from_row(c_row) for c_row in c_rows]
+
+  @staticmethod
+  def symbol_to_row(p_symbol):
+    return tuple(p_symbol[c_key] for c_key in Symbol.KEYS)
+
+  @staticmethod
+  def symbol_from_row(p_row):
+    return Symbol(*p_row)
 
   @staticmethod
   def group_symbols_by_file(p_symbols):
@@ -331,32 +1224,321 @@ class Coverxygen(object):
       l_results[l_file].append(c_symbol)
     return l_results
 
+  SUMMARY_FORMATS = ["summary", "json-summary", "markdown-summary"]
+  FILE_FORMATS    = ["json-v3", "json-v2", "json-v1"]
+  DIFF_FORMATS    = ["json-diff"]
+  FORMATS         = SUMMARY_FORMATS + FILE_FORMATS + ["lcov"] + DIFF_FORMATS + ["partial"]
+
+  def get_formats(self):
+    return [c_format for c_format, _ in self.m_outputs]
+
+  def create_aggregate(self):
+    """
+      Single aggregate feeding every requested output, it keeps what the most
+      demanding of the formats needs.
+    """
+    l_formats = self.get_formats()
+    l_paths   = [c_output for _, c_output in self.m_outputs]
+    for c_format in l_formats:
+      if not c_format in Coverxygen.FORMATS:
+        self.error("invalid requested output format '%s'", c_format)
+    if "partial" in l_formats:
+      self.error("partial format is only written alone by a processing run")
+    for c_output in l_paths:
+      if l_paths.count(c_output) > 1:
+        self.error("output %s is requested by several formats", c_output)
+    l_keepSymbols = any(c_format in Coverxygen.FILE_FORMATS for c_format in l_formats)
+    l_keepLines   = "lcov" in l_formats
+    l_diffs       = [c_format for c_format in l_formats if c_format in Coverxygen.DIFF_FORMATS]
+    if l_diffs:
+      if self.m_baseline is None:
+        self.error("output format '%s' requires a baseline report", l_diffs[0])
+      return BaselineDiff(BaselineDiff.load(self.m_baseline), l_keepSymbols, l_keepLines)
+    if self.m_baseline is not None:
+      self.error("baseline report is only used by json-diff output format")
+    return SymbolAggregate(p_keepSymbols=l_keepSymbols, p_keepLines=l_keepLines)
+
   def output_results(self, p_symbols):
-    l_outStream = self.output_get_stream(self.m_output)
-    if self.m_format == "summary":
-      self.output_print_summary(l_outStream, p_symbols)
-    elif self.m_format == "json-summary":
-      self.output_print_json_summary(l_outStream, p_symbols)
-    elif self.m_format == "markdown-summary":
-      self.output_print_markdown_summary(l_outStream, p_symbols)
+    l_aggregate = self.create_aggregate()
+    for c_symbol in p_symbols:
+      l_aggregate.add(c_symbol)
+    self.output_aggregate(l_aggregate)
+
+  def output_aggregate(self, p_aggregate):
+    """
+      Writes every requested output. The summary is computed once and shared,
+      writers only read the aggregate and run in separate threads when there
+      are several of them, standard output is written last from this thread.
+    """
+    l_summary = p_aggregate.get_summary()
+    l_outputs = [c_output for c_output in self.m_outputs if c_output[1] != "-"]
+    l_stdout  = [c_output for c_output in self.m_outputs if c_output[1] == "-"]
+    if len(l_outputs) > 1:
+      with ThreadPoolExecutor(len(l_outputs)) as l_executor:
+        l_futures = [l_executor.submit(self.write_output, c_format, c_output, p_aggregate, l_summary)
+                     for c_format, c_output in l_outputs]
+        for c_future in l_futures:
+          c_future.result()
     else:
-      l_symbolsByFile = Coverxygen.group_symbols_by_file(p_symbols)
-      if self.m_format == "json-v3":
-        self.output_print_json_v3(l_outStream, p_symbols, l_symbolsByFile)
-      elif self.m_format == "json-v2":
-        self.output_print_json_v2(l_outStream, l_symbolsByFile)
-      elif self.m_format == "json-v1":
-        self.output_print_json_v1(l_outStream, l_symbolsByFile)
-      elif self.m_format == "lcov":
-        self.output_print_lcov(l_outStream, l_symbolsByFile)
-      else:
-        self.error("invalid requested output format '%s'", self.m_format)
+      l_stdout = l_outputs + l_stdout
+    for c_format, c_output in l_stdout:
+      self.write_output(c_format, c_output, p_aggregate, l_summary)
+
+  def get_root_summaries(self):
+    """
+      (xml root, summary) of each root when a per root breakdown is requested,
+      symbols shared with other roots are counted in each of them
+    """
+    return self.m_rootSummaries if self.m_perRoot else []
+
+  def write_output(self, p_format, p_output, p_aggregate, p_summary):
+    l_outStream = self.output_get_stream(p_output)
+    try:
+      if p_format == "summary":
+        self.print_summary(l_outStream, p_summary)
+        for c_root, c_summary in self.get_root_summaries():
+          l_outStream.write("\n%s :\n" % c_root)
+          self.print_summary(l_outStream, c_summary)
+      elif p_format == "json-summary":
+        l_roots = self.get_root_summaries()
+        self.print_json_summary(l_outStream, dict(p_summary, roots=dict(l_roots)) if l_roots else p_summary, self.m_compact)
+      elif p_format == "markdown-summary":
+        self.print_markdown_summary(l_outStream, p_summary)
+        for c_root, c_summary in self.get_root_summaries():
+          l_outStream.write("\n### %s\n\n" % c_root)
+          self.print_markdown_summary(l_outStream, c_summary)
+      elif p_format == "json-v3":
+        self.print_json_v3(l_outStream, p_summary, p_aggregate.m_files, self.m_compact)
+      elif p_format == "json-v2":
+        self.output_print_json_v2(l_outStream, p_aggregate.m_files, self.m_compact)
+      elif p_format == "json-v1":
+        self.output_print_json_v1(l_outStream, p_aggregate.m_files, self.m_compact)
+      elif p_format == "lcov":
+        self.print_lcov_lines(l_outStream, p_aggregate.m_lines)
+      elif p_format == "json-diff":
+        self.print_json_diff(l_outStream, p_aggregate.get_diff(), self.m_compact)
+    finally:
+      self.output_close_stream(l_outStream)
 
   def process(self):
-    l_indexPath = self.get_index_path_from_root(self.m_root)
-    l_xmlDoc    = self.get_xmldoc_from_file(l_indexPath)
-    l_symbols   = self.process_index(l_xmlDoc)
-    self.output_results(l_symbols)
+    """
+      Symbols are fed to the output aggregate as they are extracted, which
+      only retains what the requested format needs : per kind counters for
+      summaries, per file line status for lcov and symbol records for json.
+    """
+    try:
+      if "partial" in self.get_formats():
+        return self.write_partial()
+      if self.m_profiler is not None:
+        return self.process_profiled()
+      l_aggregate = self.create_aggregate()
+      for c_symbol in self.iter_symbols():
+        l_aggregate.add(c_symbol)
+      self.output_aggregate(l_aggregate)
+    finally:
+      if self.m_source is not None:
+        self.m_source.close()
+
+  def watch(self, p_interval=1.0, p_cycles=None):
+    """
+      Polls the xml directory every p_interval seconds and writes the output
+      again whenever compound files changed, until interrupted or p_cycles
+      polls. Errors, eg. while doxygen is rewriting files, are reported and
+      the faulty files are processed again on the next poll.
+    """
+    if len(self.m_roots) > 1:
+      self.error("watch mode supports a single xml directory")
+    if XmlArchive.is_archive(self.m_root):
+      self.error("watch mode requires an xml directory")
+    # validates format and baseline before the first poll
+    self.create_aggregate()
+    l_session = WatchSession(self)
+    l_cycle   = 0
+    while p_cycles is None or l_cycle < p_cycles:
+      if l_cycle:
+        time.sleep(p_interval)
+      l_cycle += 1
+      l_start = time.perf_counter()
+      try:
+        l_updated = l_session.refresh()
+        if not l_updated:
+          continue
+        l_session.output()
+      except RuntimeError as l_error:
+        sys.stderr.write("error: %s\n" % str(l_error))
+        continue
+      l_total = l_session.m_counts.get_summary()["total"]
+      sys.stderr.write("%d compound files updated in %.3fs, coverage %.1f%% (%d/%d)\n" % (
+        l_updated, time.perf_counter() - l_start, l_total["coverage_rate"] * 100,
+        l_total["documented_symbol_count"], l_total["symbol_count"]))
+
+  PARTIAL_VERSION = 1
+
+  def get_partial_config(self):
+    """
+      Hash of the settings partial results must share to be merged. The
+      prefix and root directory are part of it since they shape the source
+      file paths merge groups the rows by.
+    """
+    l_config = [__version__, Coverxygen.PARTIAL_VERSION, sorted(self.m_scope), sorted(self.m_kind),
+                self.m_excludes, self.m_includes, self.m_excludesymbols, self.m_dedup,
+                self.m_prefix, self.m_rootDir]
+    return hashlib.sha256(json.dumps(l_config).encode("utf-8")).hexdigest()
+
+  def write_partial(self):
+    """
+      Writes the intermediate result of a shard read by merge : a header line
+      then one json line per source file, sorted by path, holding the
+      [compound refid, line, kind, symbol, documented] rows of its symbols.
+      Rows keep the compound they come from, so that merging only drops the
+      occurrences given by several partials and not a member documented in
+      several compounds.
+    """
+    if len(self.m_outputs) > 1:
+      self.error("partial format can not be combined with other formats")
+    if len(self.m_roots) > 1:
+      self.error("partial format supports a single xml root")
+    if self.m_baseline is not None:
+      self.error("baseline report is only used by json-diff output format")
+    l_source    = self.get_xml_source()
+    l_indexPath = l_source.get_index_path()
+    l_xmlDoc    = self.get_xmldoc_from_file(l_indexPath, l_source.open(l_indexPath), self.m_backend)
+    l_files     = {}
+    for c_filePath, c_symbols in self.iter_compounds(l_xmlDoc):
+      l_refid = os.path.splitext(os.path.basename(c_filePath))[0]
+      for c_symbol in c_symbols:
+        l_files.setdefault(c_symbol["file"], []).append(
+          [l_refid, c_symbol["line"], c_symbol["kind"], c_symbol["symbol"], c_symbol["documented"]])
+    l_header = {
+      "format"  : "coverxygen-partial",
+      "version" : Coverxygen.PARTIAL_VERSION,
+      "shard"   : list(self.m_shard or (1, 1)),
+      "config"  : self.get_partial_config()
+    }
+    l_stream = self.output_get_stream(self.m_outputs[0][1])
+    try:
+      l_writer = JsonWriter(l_stream, True)
+      l_stream.write(l_writer.encode(l_header) + "\n")
+      for c_file in sorted(l_files):
+        l_stream.write(l_writer.encode([c_file, l_files[c_file]]) + "\n")
+    finally:
+      self.output_close_stream(l_stream)
+
+  @staticmethod
+  def iter_partial(p_path):
+    """
+      Yields the json values of a partial result line by line
+    """
+    try:
+      if p_path.endswith(".gz"):
+        l_file = gzip.open(p_path, "rt", encoding="utf-8")
+      else:
+        l_file = open(p_path, "r", encoding="utf-8")
+      with l_file:
+        for c_number, c_line in enumerate(l_file, 1):
+          try:
+            l_value = json.loads(c_line)
+          except ValueError:
+            Coverxygen.error("invalid partial result %s at line %d", p_path, c_number)
+          yield l_value
+    except (OSError, EOFError) as l_error:
+      Coverxygen.error("unable to read partial result %s : %s", p_path, str(l_error))
+
+  def open_partials(self, p_paths):
+    """
+      Checks the header of every partial result, returns their line iterators.
+      A shard given more than once is only read from its first file.
+    """
+    l_streams = []
+    l_configs = set()
+    l_shards  = {}
+    for c_path in p_paths:
+      l_stream = self.iter_partial(c_path)
+      l_header = next(l_stream, None)
+      if not isinstance(l_header, dict) or l_header.get("format") != "coverxygen-partial":
+        self.error("%s is not a coverxygen partial result", c_path)
+      if l_header.get("version") != Coverxygen.PARTIAL_VERSION:
+        self.error("unsupported partial result version in %s", c_path)
+      l_config = l_header.get("config")
+      if not isinstance(l_config, str):
+        self.error("invalid settings in partial result %s", c_path)
+      l_shard = l_header.get("shard")
+      if not isinstance(l_shard, list) or len(l_shard) != 2 \
+         or not all(isinstance(c_value, int) and not isinstance(c_value, bool) for c_value in l_shard) \
+         or not 1 <= l_shard[0] <= l_shard[1]:
+        self.error("invalid shard in partial result %s", c_path)
+      l_configs.add(l_config)
+      l_index, l_count = l_shard
+      l_indexes = l_shards.setdefault(l_count, set())
+      if l_index in l_indexes:
+        self.verbose("skipping %s : shard %d/%d already given", c_path, l_index, l_count)
+        continue
+      l_indexes.add(l_index)
+      l_streams.append(l_stream)
+    if len(l_configs) > 1:
+      self.error("partial results were produced with different settings")
+    if len(l_shards) > 1:
+      self.error("partial results were produced with different shard counts")
+    for c_count, c_indexes in l_shards.items():
+      l_missing = sorted(set(range(1, c_count + 1)) - c_indexes)
+      if l_missing:
+        self.error("missing partial results of shards %s out of %d", ", ".join(str(c_index) for c_index in l_missing), c_count)
+    return l_streams
+
+  def merge_partials(self, p_paths):
+    """
+      Yields the symbols of the given partial results. Partials are sorted by
+      source file and read line by line in a k-way merge, so that a single
+      source file of each partial is in memory at once. An occurrence given by
+      several partials, identified by its (compound, line, kind, symbol) key,
+      is only reported by the first of them.
+    """
+    l_streams = self.open_partials(p_paths)
+    l_entries = [((c_entry[0], c_index, c_entry[1]) for c_entry in c_stream) for c_index, c_stream in enumerate(l_streams)]
+    l_file    = None
+    l_owners  = {}
+    for c_file, c_index, c_rows in heapq.merge(*l_entries, key=lambda p_entry: p_entry[0]):
+      if c_file != l_file:
+        l_file   = c_file
+        l_owners = {}
+      for c_refid, c_line, c_kind, c_symbol, c_documented in c_rows:
+        l_key = (c_refid, c_line, c_kind, c_symbol)
+        if l_owners.setdefault(l_key, c_index) != c_index:
+          continue
+        yield Symbol(c_symbol, c_documented, c_kind, c_line, c_file)
+
+  def merge(self, p_paths):
+    l_aggregate = self.create_aggregate()
+    for c_symbol in self.merge_partials(p_paths):
+      l_aggregate.add(c_symbol)
+    self.output_aggregate(l_aggregate)
+
+  def process_profiled(self):
+    """
+      Instrumented counterpart of process, kept apart so that the default
+      path does not pay for the timers.
+    """
+    l_profiler  = self.m_profiler
+    l_profiler.start(self.m_jobs)
+    l_aggregate = self.create_aggregate()
+    if len(self.m_roots) > 1:
+      l_symbols = self.iter_roots()
+    else:
+      l_source    = self.get_xml_source()
+      l_indexPath = l_source.get_index_path()
+      l_start     = time.perf_counter()
+      l_xmlDoc    = self.get_xmldoc_from_file(l_indexPath, l_source.open(l_indexPath), self.m_backend)
+      l_profiler.add("parse", time.perf_counter() - l_start)
+      l_symbols   = self.iter_index(l_xmlDoc)
+    for c_symbol in l_symbols:
+      l_start = time.perf_counter()
+      l_aggregate.add(c_symbol)
+      l_profiler.add("group", time.perf_counter() - l_start)
+      l_profiler.m_symbols += 1
+    l_start = time.perf_counter()
+    self.output_aggregate(l_aggregate)
+    l_profiler.add("serialize", time.perf_counter() - l_start)
+    l_profiler.stop()
 
   @staticmethod
   def count_symbols_by_kind(p_symbols):
@@ -408,46 +1590,80 @@ class Coverxygen(object):
     if p_output == "-":
       return sys.stdout
     try:
-      l_file = open(p_output, "w")
+      if p_output.endswith(".gz"):
+        l_file = gzip.open(p_output, "wt", encoding="utf-8")
+      else:
+        l_file = open(p_output, "w", encoding="utf-8")
     except BaseException as l_error:
       Coverxygen.error("unable to write file %s : %s", p_output, str(l_error))
     return l_file
 
+  @staticmethod
+  def output_close_stream(p_stream):
+    if p_stream is sys.stdout:
+      p_stream.flush()
+    else:
+      p_stream.close()
+
   @staticmethod
   def output_print_json_summary(p_stream, p_symbols):
-    l_summary = Coverxygen.create_summary(p_symbols)
-    p_stream.write(json.dumps(l_summary, indent=2))
+    Coverxygen.print_json_summary(p_stream, Coverxygen.create_summary(p_symbols))
+
+  @staticmethod
+  def print_json_summary(p_stream, p_summary, p_compact=False):
+    JsonWriter(p_stream, p_compact).write(p_summary)
 
   @staticmethod
   def output_print_json_v3(p_stream, p_symbols, p_symbolsByFile):
-    l_data = Coverxygen.create_summary(p_symbols)
-    l_data["files"] = p_symbolsByFile
-    p_stream.write(json.dumps(l_data, indent=2))
+    Coverxygen.print_json_v3(p_stream, Coverxygen.create_summary(p_symbols), p_symbolsByFile)
 
   @staticmethod
-  def output_print_json_v2(p_stream, p_symbolsByFile):
-    p_stream.write(json.dumps(p_symbolsByFile, indent=2))
+  def print_json_v3(p_stream, p_summary, p_symbolsByFile, p_compact=False):
+    l_writer = JsonWriter(p_stream, p_compact)
+    l_writer.open("{")
+    for c_key, c_value in p_summary.items():
+      l_writer.write(c_value, c_key)
+    l_writer.open("{", "files")
+    for c_file, c_symbols in p_symbolsByFile.items():
+      l_writer.write(c_symbols, c_file)
+    l_writer.close()
+    l_writer.close()
+
+  @staticmethod
+  def print_json_diff(p_stream, p_diff, p_compact=False):
+    JsonWriter(p_stream, p_compact).write(p_diff)
+
+  @staticmethod
+  def output_print_json_v2(p_stream, p_symbolsByFile, p_compact=False):
+    l_writer = JsonWriter(p_stream, p_compact)
+    l_writer.open("{")
+    for c_file, c_symbols in p_symbolsByFile.items():
+      l_writer.write(c_symbols, c_file)
+    l_writer.close()
 
   @staticmethod
-  def output_print_json_v1(p_stream, p_symbolsByFile):
-    l_res = []
+  def output_print_json_v1(p_stream, p_symbolsByFile, p_compact=False):
+    l_writer = JsonWriter(p_stream, p_compact)
+    l_writer.open("[")
     for c_file, c_symbols in p_symbolsByFile.items():
-      l_res.append({ c_file : c_symbols })
-    p_stream.write(json.dumps(l_res, indent=2))
+      l_writer.write({ c_file : c_symbols })
+    l_writer.close()
 
   @staticmethod
   def output_print_lcov(p_stream, p_results):
+    l_linesByFile = {}
     for c_file, c_data in p_results.items():
-      p_stream.write("SF:%s\n" % c_file)
-      l_lines = {}
+      l_lines = l_linesByFile.setdefault(c_file, {})
       for c_item in c_data:
-        l_line = c_item["line"]
-        if not c_item["documented"]:
-          l_lines[l_line] = 0
-        elif not l_line in l_lines:
-          l_lines[l_line] = 1
-      for c_line in l_lines:
-        p_stream.write("DA:%d,%d\n" % (c_line, l_lines[c_line]))
+        SymbolAggregate.add_line(l_lines, c_item)
+    Coverxygen.print_lcov_lines(p_stream, l_linesByFile)
+
+  @staticmethod
+  def print_lcov_lines(p_stream, p_linesByFile):
+    for c_file, c_lines in p_linesByFile.items():
+      p_stream.write("SF:%s\n" % c_file)
+      for c_line in c_lines:
+        p_stream.write("DA:%d,%d\n" % (c_line, c_lines[c_line]))
       p_stream.write("end_of_record\n")
 
   @staticmethod
@@ -501,9 +1717,12 @@ class Coverxygen(object):
 
   @staticmethod
   def output_print_summary(p_stream, p_symbols):
-    l_summary = Coverxygen.create_summary(p_symbols)
-    l_symbolKindCountsList = Coverxygen.symbol_kind_counts_dict_to_list(l_summary["kinds"])
-    l_totalCounts = l_summary["total"]
+    Coverxygen.print_summary(p_stream, Coverxygen.create_summary(p_symbols))
+
+  @staticmethod
+  def print_summary(p_stream, p_summary):
+    l_symbolKindCountsList = Coverxygen.symbol_kind_counts_dict_to_list(p_summary["kinds"])
+    l_totalCounts = p_summary["total"]
     l_firstColumnWidth = Coverxygen.determine_first_column_width(l_symbolKindCountsList)
     for c_symbolKindCount in l_symbolKindCountsList:
       Coverxygen.print_summary_line(p_stream, c_symbolKindCount["kind"], l_firstColumnWidth, c_symbolKindCount["documented_symbol_count"], c_symbolKindCount["symbol_count"])
@@ -512,7 +1731,10 @@ class Coverxygen(object):
 
   @staticmethod
   def output_print_markdown_summary(stream, symbols):
-    summary = Coverxygen.create_summary(symbols)
+    Coverxygen.print_markdown_summary(stream, Coverxygen.create_summary(symbols))
+
+  @staticmethod
+  def print_markdown_summary(stream, summary):
     symbol_kind_counts_list = Coverxygen.symbol_kind_counts_dict_to_list(summary["kinds"])
     symbol_kind_counts_list.append({
         "kind": "Total",
@@ -531,6 +1753,273 @@ class Coverxygen(object):
     for symbol_kind_count in symbol_kind_counts_list:
       stream.write(f'| {symbol_kind_count["kind"].ljust(first_column_width)} | {symbol_kind_count["value_string"].ljust(second_column_width)} |\n')
 
+#------------------------------------------------------------------------------
+
+class Symbol(object):
+  """
+    Compact record of an extracted symbol. Slots avoid a per-symbol dictionary
+    and the file path and kind strings are interned, so that all symbols of a
+    source file share a single path string. Records still support item access
+    with the json keys, and are turned into dictionaries by to_dict at the json
+    output boundary.
+
+    On a synthetic corpus of 200k function symbols, the retained size of the
+    extracted symbol list drops from 81 MB with dictionaries to 34 MB.
+  """
+  __slots__ = ("m_symbol", "m_documented", "m_kind", "m_line", "m_file")
+  KEYS      = ("symbol", "documented", "kind", "line", "file")
+
+  def __init__(self, p_symbol, p_documented, p_kind, p_line, p_file):
+    self.m_symbol     = p_symbol
+    self.m_documented = p_documented
+    self.m_kind       = sys.intern(p_kind)
+    self.m_line       = p_line
+    self.m_file       = sys.intern(p_file)
+
+  def __getitem__(self, p_key):
+    try:
+      return getattr(self, "m_" + p_key)
+    except AttributeError:
+      raise KeyError(p_key) from None
+
+  def to_row(self):
+    return (self.m_symbol, self.m_documented, self.m_kind, self.m_line, self.m_file)
+
+  def to_dict(self):
+    return dict(zip(Symbol.KEYS, self.to_row()))
+
+  def __eq__(self, p_other):
+    if isinstance(p_other, Symbol):
+      return self.to_row() == p_other.to_row()
+    return NotImplemented
+
+  def __hash__(self):
+    return hash(self.to_row())
+
+  def __repr__(self):
+    return repr(self.to_dict())
+
+#------------------------------------------------------------------------------
+
+class SymbolAggregate(object):
+  """
+    Incremental consumer of extracted symbols. Per kind counters are always
+    maintained, symbol records grouped by file (json formats) and per file line
+    status (lcov) are only kept when requested.
+  """
+  def __init__(self, p_keepSymbols=True, p_keepLines=True):
+    self.m_counts = {}
+    self.m_files  = {} if p_keepSymbols else None
+    self.m_lines  = {} if p_keepLines else None
+
+  @staticmethod
+  def add_line(p_lines, p_symbol):
+    # a single undocumented symbol marks the whole line as undocumented
+    l_line = p_symbol["line"]
+    if not p_symbol["documented"]:
+      p_lines[l_line] = 0
+    elif not l_line in p_lines:
+      p_lines[l_line] = 1
+
+  def add(self, p_symbol):
+    l_counts = self.m_counts.get(p_symbol["kind"])
+    if l_counts is None:
+      l_counts = self.m_counts[p_symbol["kind"]] = {
+        "documented_symbol_count": 0,
+        "symbol_count"           : 0
+      }
+    if p_symbol["documented"]:
+      l_counts["documented_symbol_count"] += 1
+    l_counts["symbol_count"] += 1
+    if self.m_files is not None:
+      self.m_files.setdefault(p_symbol["file"], []).append(p_symbol)
+    if self.m_lines is not None:
+      SymbolAggregate.add_line(self.m_lines.setdefault(p_symbol["file"], {}), p_symbol)
+
+  def remove(self, p_symbol):
+    """
+      Counterpart of add for per kind counters only, symbol records and line
+      status can not be taken back and are rebuilt instead
+    """
+    l_counts = self.m_counts[p_symbol["kind"]]
+    if p_symbol["documented"]:
+      l_counts["documented_symbol_count"] -= 1
+    l_counts["symbol_count"] -= 1
+    if not l_counts["symbol_count"]:
+      del self.m_counts[p_symbol["kind"]]
+
+  def get_summary(self):
+    l_counts = {c_kind : dict(c_counts) for c_kind, c_counts in self.m_counts.items()}
+    return {
+      "total": Coverxygen.calculate_totals(l_counts),
+      "kinds": Coverxygen.calculate_kind_coverage(l_counts)
+    }
+
+#------------------------------------------------------------------------------
+
+class Report(object):
+  """
+    In-process view of a set of symbols, eg. Coverxygen.report(). Symbols are
+    only consumed when a view is first requested, each view is then computed
+    once. Without p_keepSymbols only per kind counters are retained and
+    get_summary is the only available view.
+  """
+  def __init__(self, p_symbols, p_keepSymbols=True):
+    self.m_symbols   = p_symbols
+    self.m_aggregate = None
+    self.m_byKind    = None
+    self.m_keepSymbols = p_keepSymbols
+
+  def get_aggregate(self):
+    if self.m_aggregate is None:
+      l_aggregate = SymbolAggregate(p_keepSymbols=self.m_keepSymbols, p_keepLines=False)
+      for c_symbol in self.m_symbols:
+        l_aggregate.add(c_symbol)
+      self.m_symbols   = None
+      self.m_aggregate = l_aggregate
+    return self.m_aggregate
+
+  def get_symbols_aggregate(self):
+    if not self.m_keepSymbols:
+      Coverxygen.error("symbol records are not kept by this report")
+    return self.get_aggregate()
+
+  def get_summary(self):
+    """
+      Same dictionary as the json-summary format
+    """
+    return self.get_aggregate().get_summary()
+
+  def get_symbols_by_file(self):
+    """
+      Dictionary of source file path to its list of Symbol records
+    """
+    return self.get_symbols_aggregate().m_files
+
+  def get_symbols_by_kind(self):
+    """
+      Dictionary of symbol kind to its list of Symbol records
+    """
+    if self.m_byKind is None:
+      l_byKind = {}
+      for c_symbols in self.get_symbols_by_file().values():
+        for c_symbol in c_symbols:
+          l_byKind.setdefault(c_symbol["kind"], []).append(c_symbol)
+      self.m_byKind = l_byKind
+    return self.m_byKind
+
+  def __iter__(self):
+    for c_symbols in self.get_symbols_by_file().values():
+      for c_symbol in c_symbols:
+        yield c_symbol
+
+#------------------------------------------------------------------------------
+
+class FilterPlan(object):
+  """
+    Compiled form of the --include, --exclude, --prefix and --excludesymbols
+    filters. Each pattern list is merged into a single alternation and the
+    verdict on a source file path is computed once and memoized, since all
+    symbols of a compound usually share the same file.
+  """
+  def __init__(self, p_prefix, p_includes, p_excludes, p_excludesymbols):
+    self.m_prefix         = p_prefix
+    self.m_includes       = FilterPlan.compile_regex_list(p_includes)
+    self.m_excludes       = FilterPlan.compile_regex_list(p_excludes)
+    self.m_excludesymbols = FilterPlan.compile_regex_list(p_excludesymbols)
+    self.m_verdicts       = {}
+
+  @staticmethod
+  def compile_regex_list(p_regExList):
+    try:
+      l_regExList = [re.compile(c_regEx) for c_regEx in p_regExList]
+    except re.error as l_error:
+      Coverxygen.error("invalid regular expression : %s", str(l_error))
+    if len(l_regExList) < 2:
+      return l_regExList
+    # group numbers shift and group names collide once merged, keep back-references,
+    # conditional group references and named groups as separate patterns
+    if any(re.search(r"\\[1-9]|\(\?P[=<]|\(\?\(", c_regEx.pattern) for c_regEx in l_regExList):
+      return l_regExList
+    # inline global flags, eg. (?i), would apply to every merged pattern before
+    # python 3.11 instead of raising, they are reflected in the compiled flags
+    l_defaultFlags = re.compile("").flags
+    if any(c_regEx.flags != l_defaultFlags for c_regEx in l_regExList):
+      return l_regExList
+    try:
+      return [re.compile("|".join("(?:%s)" % c_regEx.pattern for c_regEx in l_regExList))]
+    except re.error:
+      return l_regExList
+
+  @staticmethod
+  def matches(p_regExList, p_string):
+    for c_regEx in p_regExList:
+      if c_regEx.match(p_string):
+        return True
+    return False
+
+  def has_path_filters(self):
+    # include patterns only re-admit files rejected by the prefix or excludes
+    return bool(self.m_prefix) or bool(self.m_excludes)
+
+  def is_file_filtered_out(self, p_file):
+    l_verdict = self.m_verdicts.get(p_file)
+    if l_verdict is None:
+      l_verdict = False
+      if not FilterPlan.matches(self.m_includes, p_file):
+        if not p_file.startswith(self.m_prefix):
+          l_verdict = True
+        elif FilterPlan.matches(self.m_excludes, p_file):
+          l_verdict = True
+      self.m_verdicts[p_file] = l_verdict
+    return l_verdict
+
+#------------------------------------------------------------------------------
+
+# helper classes live in their own modules, which import Coverxygen and the
+# symbol classes above, they are therefore imported last
+from coverxygen.cache import ResultCache
+from coverxygen.diff import BaselineDiff
+from coverxygen.jsonwriter import JsonWriter
+from coverxygen.profiler import PhaseProfiler
+from coverxygen.reverseindex import ReverseIndex
+from coverxygen.sources import XmlDirectory, XmlArchive
+from coverxygen.watch import WatchSession
+
+#------------------------------------------------------------------------------
+
+_g_workers    = None
+_g_lxmlParser = None
+_g_lxmlXPaths = None
+
+def _worker_init(p_objs):
+  global _g_workers # pylint: disable=global-statement
+  _g_workers = p_objs
+  for c_obj in _g_workers:
+    if c_obj.m_source is not None:
+      # forked workers would otherwise share the archive file offset
+      c_obj.m_source.close()
+  # roots share the profiler of the parent instance
+  if _g_workers[0].m_profiler is not None:
+    # drop timings recorded by the parent before the pool was started
+    _g_workers[0].m_profiler.reset()
+
+def _worker_process_chunk(p_items):
+  l_results  = []
+  l_counters = {}
+  for c_index, c_filePath, c_skipIds in p_items:
+    l_worker = _g_workers[c_index]
+    l_before = l_worker.get_counters()
+    l_results.append((c_index, c_filePath, [Coverxygen.symbol_to_row(c_symbol)
+                                            for c_symbol in l_worker.process_compound(c_filePath, c_skipIds)]))
+    l_delta = l_counters.setdefault(c_index, dict.fromkeys(l_before, 0))
+    for c_key, c_value in l_worker.get_counters().items():
+      l_delta[c_key] += c_value - l_before[c_key]
+  l_profile = None
+  if _g_workers[0].m_profiler is not None:
+    l_profile = _g_workers[0].m_profiler.pop_state()
+  return l_results, l_counters, l_profile
+
 # Local Variables:
 # ispell-local-dictionary: "en"
 # End:
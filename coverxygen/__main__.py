@@ -3,6 +3,7 @@
 
 from __future__ import print_function
 
+import re
 import sys
 import argparse
 from argparse import RawTextHelpFormatter
@@ -11,7 +12,70 @@ import coverxygen
 
 #------------------------------------------------------------------------------
 
+def get_outputs(p_formats, p_output):
+  l_formatMapping = {
+    "json"       : "json-v2",
+    "json-legacy": "json-v1"
+  }
+  l_outputs = []
+  for c_format in p_formats or ["lcov"]:
+    l_format, l_separator, l_output = c_format.partition(":")
+    if not l_separator:
+      l_output = p_output
+    if not l_output:
+      sys.stderr.write("error: --output is required by format %s\n" % l_format)
+      sys.exit(1)
+    l_outputs.append((l_formatMapping.get(l_format, l_format), l_output))
+  return l_outputs
+
+def merge_main(p_args):
+  l_parser = argparse.ArgumentParser(formatter_class=RawTextHelpFormatter, prog="coverxygen merge",
+                                     description="combine partial results written by --format partial")
+  l_parser.add_argument("--verbose",
+                        action="store_true",
+                        help ="enabled verbose output",
+                        default=False)
+  l_parser.add_argument("--format",
+                        action="append",
+                        help="output file format, FORMAT:PATH writes this format to PATH instead\n"
+                        "of --output ; see coverxygen --help for available formats, this option\n"
+                        "can be given multiple times",
+                        default=None)
+  l_parser.add_argument("--output",
+                        action="store",
+                        help ="destination output file (- for stdout), gzip compressed when\n"
+                        "ending with .gz ; optional when every --format gives its own PATH",
+                        default=None)
+  l_parser.add_argument("--baseline",
+                        action="store",
+                        help="json-v3 or json-v2 report of a previous run compared with by the\n"
+                        "json-diff format",
+                        default=None)
+  l_parser.add_argument("--compact",
+                        action="store_true",
+                        help="write json formats without indentation",
+                        default=False)
+  l_parser.add_argument("partials",
+                        nargs="+",
+                        help="partial result files, .gz files are decompressed")
+  l_result  = l_parser.parse_args(p_args)
+  l_outputs = get_outputs(l_result.format, l_result.output)
+  l_options = coverxygen.Options(p_baseline=l_result.baseline,
+                                 p_outputs=l_outputs,
+                                 p_compact=l_result.compact)
+  l_obj = coverxygen.Coverxygen(None, l_outputs[0][1], [], [], l_outputs[0][0], None,
+                                p_verbose=l_result.verbose,
+                                p_options=l_options)
+  try:
+    l_obj.merge(l_result.partials)
+  except RuntimeError as l_error:
+    sys.stderr.write("error: %s\n" % str(l_error))
+    sys.exit(1)
+
 def main():
+  if sys.argv[1:2] == ["merge"]:
+    merge_main(sys.argv[2:])
+    return
   l_parser = argparse.ArgumentParser(formatter_class=RawTextHelpFormatter, prog="coverxygen", add_help=False)
   l_requiredArgs = l_parser.add_argument_group("required arguments")
   l_optionalArgs = l_parser.add_argument_group("optional arguments")
@@ -32,8 +96,10 @@ def main():
                               help="(deprecated) same as --format json-legacy",
                               default=None)
   l_optionalArgs.add_argument("--format",
-                              action="store",
-                              help="output file format :\n"
+                              action="append",
+                              help="output file format, FORMAT:PATH writes this format to PATH instead\n"
+                              "of --output ; this option can be given multiple times to write several\n"
+                              "formats from a single parse :\n"
                               "lcov             : lcov compatible format (default)\n"
                               "json-v3          : json format which includes summary information\n"
                               "json-v2          : simpler json format\n"
@@ -42,8 +108,12 @@ def main():
                               "json-legacy      : (deprecated) same as json-v1\n"
                               "json-summary     : summary in json format\n"
                               "markdown-summary : summary in markdown table format\n"
-                              "summary          : textual summary table format\n",
-                              default="lcov")
+                              "summary          : textual summary table format\n"
+                              "json-diff        : symbols whose documentation changed since the\n"
+                              "                   --baseline report along with coverage deltas\n"
+                              "partial          : intermediate result of a --shard, combined by\n"
+                              "                   coverxygen merge\n",
+                              default=None)
   l_optionalArgs.add_argument("--prefix",
                               action="store",
                               help ="keep only file matching given path prefix",
@@ -97,19 +167,130 @@ def main():
                               " - page      : documentation pages\n"
                               " - all       : all above\n",
                               default="all")
+  l_optionalArgs.add_argument("--jobs",
+                              action="store",
+                              type=int,
+                              help="number of worker processes used to parse compound files\n"
+                              "(0 : one per available CPU)",
+                              default=1)
+  l_optionalArgs.add_argument("--engine",
+                              action="store",
+                              choices=["tree", "stream", "scan"],
+                              help="compound file extraction engine :\n"
+                              "tree   : load each compound file as a whole (default)\n"
+                              "stream : incremental parsing, memory is bounded by the largest\n"
+                              "         member instead of the largest compound file\n"
+                              "scan   : experimental, reads symbols from the raw bytes without xml\n"
+                              "         parsing, falls back on tree for unsupported constructs\n",
+                              default="tree")
+  l_optionalArgs.add_argument("--xml-backend",
+                              action="store",
+                              choices=["auto", "lxml", "etree"],
+                              help="xml parser :\n"
+                              "auto  : lxml when installed, etree otherwise (default)\n"
+                              "lxml  : lxml module\n"
+                              "etree : python standard xml.etree module\n",
+                              default="auto")
+  l_optionalArgs.add_argument("--dedup",
+                              action="store",
+                              choices=["none", "first", "last"],
+                              help="members appearing in several compounds (class, file, namespace, group) :\n"
+                              "none  : count each occurrence (default)\n"
+                              "first : keep the occurrence of the first compound listed in index.xml\n"
+                              "last  : keep the occurrence of the last compound listed in index.xml\n",
+                              default="none")
+  l_optionalArgs.add_argument("--cache-dir",
+                              action="store",
+                              help="directory of a persistent cache of extracted symbols, compound files\n"
+                              "whose content did not change since a previous run are not parsed again",
+                              default=None)
+  l_optionalArgs.add_argument("--cache-size",
+                              action="store",
+                              type=int,
+                              help="maximum size of the cache directory in MiB, least recently used\n"
+                              "entries are evicted first (default: 512)",
+                              default=512)
+  l_optionalArgs.add_argument("--cache-stats",
+                              action="store_true",
+                              help="print cache hits and misses on standard error",
+                              default=False)
+  l_optionalArgs.add_argument("--profile",
+                              action="store_true",
+                              help="print time spent in parsing, extraction, filtering, grouping and\n"
+                              "serialization along with the slowest compound files on standard error",
+                              default=False)
+  l_optionalArgs.add_argument("--profile-json",
+                              action="store",
+                              help="also write the --profile report to this file as json (implies --profile)",
+                              default=None)
+  l_optionalArgs.add_argument("--profile-top",
+                              action="store",
+                              type=int,
+                              help="number of slowest compound files reported by --profile (default: 10)",
+                              default=10)
+  l_optionalArgs.add_argument("--baseline",
+                              action="store",
+                              help="json-v3 or json-v2 report of a previous run compared with by the\n"
+                              "json-diff format",
+                              default=None)
+  l_optionalArgs.add_argument("--changed-files",
+                              action="store",
+                              help="file listing changed source files, one per line, relative to --src-dir\n"
+                              "or absolute (- for standard input, eg. git diff --name-only output) ;\n"
+                              "only compound files documenting them are parsed and only their symbols\n"
+                              "are reported",
+                              default=None)
+  l_optionalArgs.add_argument("--reverse-index",
+                              action="store",
+                              help="sqlite database mapping source files to compound files used by\n"
+                              "--changed-files, updated incrementally (default: <XML_DIR>.coverxygen.sqlite)",
+                              default=None)
+  l_optionalArgs.add_argument("--watch",
+                              action="store_true",
+                              help="keep running, write the output again whenever compound files change ;\n"
+                              "only changed compound files are processed again",
+                              default=False)
+  l_optionalArgs.add_argument("--watch-interval",
+                              action="store",
+                              type=float,
+                              help="seconds between two polls of the xml directory by --watch (default: 1)",
+                              default=1.0)
 
-  l_requiredArgs.add_argument("--xml-dir",
+  l_optionalArgs.add_argument("--compact",
+                              action="store_true",
+                              help="write json formats without indentation",
+                              default=False)
+  l_optionalArgs.add_argument("--shard",
                               action="store",
-                              help ="path to generated doxygen XML directory",
+                              help="I/N : only process the I-th of N shards of the compound files, shards\n"
+                              "are balanced by file size and identical on every machine",
+                              default=None)
+  l_optionalArgs.add_argument("--per-root",
+                              action="store_true",
+                              help="with several --xml-dir, also write the summary of each root in\n"
+                              "summary formats",
+                              default=False)
+
+  l_requiredArgs.add_argument("--xml-dir",
+                              action="append",
+                              help ="path to generated doxygen XML directory, or to an archive of it\n"
+                              "(.tar, .tar.gz, .tar.bz2, .tar.xz, .tar.zst, .zip, - for a tar stream\n"
+                              "on stdin), .xml.gz members are decompressed ; zip members are read on\n"
+                              "demand, as are uncompressed tar members, other tar streams are held\n"
+                              "in memory in full ; this option can be given multiple times to merge\n"
+                              "the symbols of several roots, a symbol found in several roots is\n"
+                              "counted once",
                               required=True)
   l_requiredArgs.add_argument("--output",
                               action="store",
-                              help ="destination output file (- for stdout)",
-                              required=True)
+                              help ="destination output file (- for stdout), gzip compressed when\n"
+                              "ending with .gz ; optional when every --format gives its own PATH",
+                              required=False)
   l_requiredArgs.add_argument("--src-dir",
-                              action="store",
+                              action="append",
                               help ="root source directory used to match prefix for "
-                              "relative path generated files",
+                              "relative path generated files ;\n"
+                              "given once for all --xml-dir or once per --xml-dir, in the same order",
                               required=True)
 
   l_result = l_parser.parse_args()
@@ -119,12 +300,7 @@ def main():
   if l_result.kind == "all":
     l_result.kind = "enum,enumvalue,friend,typedef,variable,function,signal,slot,class,struct,union,define,file,namespace,page"
 
-  l_formatMapping = {
-    "json"       : "json-v2",
-    "json-legacy": "json-v1"
-  }
-  if l_result.format in l_formatMapping:
-    l_result.format = l_formatMapping[l_result.format]
+  l_outputs = get_outputs(l_result.format, l_result.output)
 
   l_result.scope = l_result.scope.split(",")
   l_result.kind  = l_result.kind.split(",")
@@ -133,21 +309,74 @@ def main():
     sys.stderr.write("error: couldn't parse parameters\n")
     sys.exit(1)
 
-  l_format = l_result.format
   if l_result.json:
-    l_format = "json-legacy"
-  l_obj = coverxygen.Coverxygen(l_result.xml_dir,
-                                l_result.output,
+    l_outputs = [("json-legacy", l_result.output)]
+  l_srcDirs = l_result.src_dir
+  if len(l_srcDirs) == 1:
+    l_srcDirs = l_srcDirs * len(l_result.xml_dir)
+  if len(l_srcDirs) != len(l_result.xml_dir):
+    sys.stderr.write("error: --src-dir must be given once or once per --xml-dir\n")
+    sys.exit(1)
+  l_roots = list(zip(l_result.xml_dir, l_srcDirs))
+  l_shard = None
+  if l_result.shard is not None:
+    l_match = re.match(r"^(\d+)/(\d+)$", l_result.shard)
+    if not l_match:
+      sys.stderr.write("error: invalid --shard %s, I/N expected\n" % l_result.shard)
+      sys.exit(1)
+    l_shard = (int(l_match.group(1)), int(l_match.group(2)))
+  l_changedFiles = None
+  if l_result.changed_files is not None:
+    if l_result.changed_files == "-" and "-" in l_result.xml_dir:
+      sys.stderr.write("error: --changed-files and --xml-dir can not both read standard input\n")
+      sys.exit(1)
+    try:
+      l_changedFiles = coverxygen.Coverxygen.read_file_list(l_result.changed_files)
+    except RuntimeError as l_error:
+      sys.stderr.write("error: %s\n" % str(l_error))
+      sys.exit(1)
+  l_options = coverxygen.Options(p_jobs=l_result.jobs,
+                                 p_engine=l_result.engine,
+                                 p_xmlBackend=l_result.xml_backend,
+                                 p_dedup=l_result.dedup,
+                                 p_shard=l_shard,
+                                 p_roots=l_roots,
+                                 p_changedFiles=l_changedFiles,
+                                 p_reverseIndex=l_result.reverse_index,
+                                 p_cacheDir=l_result.cache_dir,
+                                 p_cacheSize=l_result.cache_size * 1024 * 1024,
+                                 p_outputs=l_outputs,
+                                 p_perRoot=l_result.per_root,
+                                 p_compact=l_result.compact,
+                                 p_baseline=l_result.baseline,
+                                 p_profile=l_result.profile or l_result.profile_json is not None,
+                                 p_profileTop=l_result.profile_top)
+  l_obj = coverxygen.Coverxygen(l_roots[0][0],
+                                l_outputs[0][1],
                                 l_result.scope,
                                 l_result.kind,
-                                l_format,
-                                l_result.src_dir,
+                                l_outputs[0][0],
+                                l_roots[0][1],
                                 l_result.prefix,
                                 l_result.verbose,
                                 l_result.exclude,
-                                l_result.include)
+                                l_result.include,
+                                l_result.excludesymbols,
+                                l_options)
   try:
+    if l_result.watch:
+      try:
+        l_obj.watch(l_result.watch_interval)
+      except KeyboardInterrupt:
+        pass
+      return
     l_obj.process()
+    if l_result.cache_stats and l_obj.m_cache is not None:
+      sys.stderr.write("%s\n" % l_obj.m_cache.get_stats())
+    if l_obj.m_profiler is not None:
+      l_obj.m_profiler.print_report(sys.stderr)
+      if l_result.profile_json is not None:
+        l_obj.m_profiler.write_json(l_result.profile_json)
   except RuntimeError as l_error:
     sys.stderr.write("error: %s\n" % str(l_error))
     sys.exit(1)
@@ -0,0 +1,92 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+import os
+import json
+import hashlib
+import tempfile
+
+from coverxygen import Coverxygen
+
+#------------------------------------------------------------------------------
+
+class ResultCache(object):
+  """
+    Persistent cache of the symbols extracted from each compound file. Entries
+    are keyed by the content hash of the compound file and by the hash of the
+    filter configuration, so that regenerated but unchanged files are not parsed
+    again. The cache directory is kept under p_maxSize bytes by evicting least
+    recently used entries, hits refresh the entry modification time.
+  """
+  def __init__(self, p_dir, p_configKey, p_maxSize):
+    self.m_dir       = p_dir
+    self.m_configKey = p_configKey
+    self.m_maxSize   = p_maxSize
+    self.m_hits      = 0
+    self.m_misses    = 0
+    self.m_evicted   = 0
+    try:
+      os.makedirs(p_dir, exist_ok=True)
+    except OSError as l_error:
+      Coverxygen.error("unable to create cache directory %s : %s", p_dir, str(l_error))
+
+  def get_key(self, p_data, p_filePath, p_skipIds=()):
+    l_hash = hashlib.sha256(p_data)
+    # symbols without location fall back on the compound file path
+    l_hash.update(os.path.abspath(p_filePath).encode("utf-8"))
+    for c_id in p_skipIds:
+      l_hash.update(c_id.encode("utf-8"))
+    l_hash.update(self.m_configKey.encode("utf-8"))
+    return l_hash.hexdigest()
+
+  def get_entry_path(self, p_key):
+    return os.path.join(self.m_dir, "%s.json" % p_key)
+
+  def load(self, p_key):
+    l_path = self.get_entry_path(p_key)
+    try:
+      with open(l_path, "r", encoding="utf-8") as l_file:
+        l_rows = json.load(l_file)
+      os.utime(l_path)
+    except (OSError, ValueError):
+      self.m_misses += 1
+      return None
+    self.m_hits += 1
+    return l_rows
+
+  def store(self, p_key, p_rows):
+    try:
+      l_fd, l_tmpPath = tempfile.mkstemp(dir=self.m_dir, suffix=".tmp")
+      with os.fdopen(l_fd, "w") as l_file:
+        json.dump(p_rows, l_file, separators=(",", ":"))
+      os.replace(l_tmpPath, self.get_entry_path(p_key))
+    except OSError as l_error:
+      Coverxygen.error("unable to write cache entry in %s : %s", self.m_dir, str(l_error))
+
+  def trim(self):
+    l_entries = []
+    l_total   = 0
+    for c_entry in os.scandir(self.m_dir):
+      if not c_entry.name.endswith(".json"):
+        continue
+      l_stat = c_entry.stat()
+      l_entries.append((l_stat.st_mtime_ns, c_entry.path, l_stat.st_size))
+      l_total += l_stat.st_size
+    l_entries.sort()
+    for _, c_path, c_size in l_entries:
+      if l_total <= self.m_maxSize:
+        break
+      try:
+        os.unlink(c_path)
+      except OSError:
+        continue
+      l_total -= c_size
+      self.m_evicted += 1
+    return l_total
+
+  def get_stats(self):
+    return "cache : %d hits, %d misses, %d evicted" % (self.m_hits, self.m_misses, self.m_evicted)
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
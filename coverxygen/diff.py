@@ -0,0 +1,122 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+import json
+
+from coverxygen import Coverxygen, Symbol, SymbolAggregate
+
+#------------------------------------------------------------------------------
+
+class BaselineDiff(SymbolAggregate):
+  """
+    Output aggregate of the json-diff format. The baseline report is indexed by
+    (file, kind, symbol), each key holding the lines of its undocumented and
+    documented occurrences since overloads share the same symbol name. Current
+    symbols are indexed the same way as they are extracted, only keys whose
+    counts differ from the baseline are then examined.
+  """
+  def __init__(self, p_baseline, p_keepSymbols=False, p_keepLines=False):
+    super(BaselineDiff, self).__init__(p_keepSymbols, p_keepLines)
+    self.m_baseline = p_baseline
+    self.m_current  = {}
+
+  @staticmethod
+  def load(p_path):
+    """
+      Reads a json-v3 or json-v2 report into a dict of (file, kind, symbol) to
+      the (undocumented lines, documented lines) pair
+    """
+    try:
+      with open(p_path, "r", encoding="utf-8") as l_file:
+        l_doc = json.load(l_file)
+    except (OSError, ValueError) as l_error:
+      Coverxygen.error("unable to read baseline report %s : %s", p_path, str(l_error))
+    l_files = l_doc.get("files", l_doc) if isinstance(l_doc, dict) else None
+    l_index = {}
+    try:
+      for c_file, c_symbols in l_files.items():
+        for c_symbol in c_symbols:
+          l_key   = (c_file, c_symbol["kind"], c_symbol["symbol"])
+          l_entry = l_index.get(l_key)
+          if l_entry is None:
+            l_entry = l_index[l_key] = ([], [])
+          l_entry[1 if c_symbol["documented"] else 0].append(c_symbol["line"])
+    except (AttributeError, KeyError, TypeError):
+      Coverxygen.error("invalid baseline report %s : json-v3 or json-v2 format expected", p_path)
+    return l_index
+
+  def add(self, p_symbol):
+    super(BaselineDiff, self).add(p_symbol)
+    l_key   = (p_symbol["file"], p_symbol["kind"], p_symbol["symbol"])
+    l_entry = self.m_current.get(l_key)
+    if l_entry is None:
+      l_entry = self.m_current[l_key] = ([], [])
+    l_entry[1 if p_symbol["documented"] else 0].append(p_symbol)
+
+  @staticmethod
+  def resolve(p_key, p_baseline, p_current, p_changes):
+    """
+      Occurrences found in the same state in both reports are unchanged, the
+      remaining ones are paired as state changes, the rest appeared or
+      disappeared.
+    """
+    l_oldUndoc, l_oldDoc = p_baseline
+    l_newUndoc, l_newDoc = p_current
+    if len(l_oldUndoc) == len(l_newUndoc) and len(l_oldDoc) == len(l_newDoc):
+      return
+    l_lostUndoc = l_oldUndoc[len(l_newUndoc):]
+    l_lostDoc   = l_oldDoc[len(l_newDoc):]
+    l_gainUndoc = l_newUndoc[len(l_oldUndoc):]
+    l_gainDoc   = l_newDoc[len(l_oldDoc):]
+    l_documented   = min(len(l_lostUndoc), len(l_gainDoc))
+    l_undocumented = min(len(l_lostDoc), len(l_gainUndoc))
+    p_changes["documented"].extend(l_gainDoc[:l_documented])
+    p_changes["undocumented"].extend(l_gainUndoc[:l_undocumented])
+    p_changes["appeared"].extend(l_gainDoc[l_documented:] + l_gainUndoc[l_undocumented:])
+    l_file, l_kind, l_name = p_key
+    for c_lines, c_documented in [(l_lostUndoc[l_documented:], False), (l_lostDoc[l_undocumented:], True)]:
+      for c_line in c_lines:
+        p_changes["disappeared"].append(Symbol(l_name, c_documented, l_kind, c_line, l_file))
+
+  @staticmethod
+  def get_delta(p_old, p_new):
+    return {c_key : p_new[c_key] - p_old[c_key] for c_key in ["documented_symbol_count", "symbol_count", "coverage_rate"]}
+
+  def get_baseline_summary(self):
+    l_counts = {}
+    for (_, c_kind, _), (c_undoc, c_doc) in self.m_baseline.items():
+      l_kindCounts = l_counts.setdefault(c_kind, { "documented_symbol_count" : 0, "symbol_count" : 0 })
+      l_kindCounts["documented_symbol_count"] += len(c_doc)
+      l_kindCounts["symbol_count"]            += len(c_doc) + len(c_undoc)
+    return {
+      "total": Coverxygen.calculate_totals(l_counts),
+      "kinds": Coverxygen.calculate_kind_coverage(l_counts)
+    }
+
+  def get_diff(self):
+    l_changes = { "undocumented" : [], "documented" : [], "appeared" : [], "disappeared" : [] }
+    for c_key, c_entry in self.m_baseline.items():
+      self.resolve(c_key, c_entry, self.m_current.get(c_key, ([], [])), l_changes)
+    for c_key, c_entry in self.m_current.items():
+      if not c_key in self.m_baseline:
+        self.resolve(c_key, ([], []), c_entry, l_changes)
+    for c_symbols in l_changes.values():
+      c_symbols.sort(key=lambda p_symbol: (p_symbol["file"], p_symbol["line"], p_symbol["kind"], p_symbol["symbol"] or ""))
+    l_baseline = self.get_baseline_summary()
+    l_current  = self.get_summary()
+    l_empty    = { "documented_symbol_count" : 0, "symbol_count" : 0, "coverage_rate" : 0 }
+    l_kinds    = sorted(set(l_baseline["kinds"]) | set(l_current["kinds"]))
+    return {
+      "baseline" : l_baseline,
+      "current"  : l_current,
+      "delta"    : {
+        "total" : self.get_delta(l_baseline["total"], l_current["total"]),
+        "kinds" : {c_kind : self.get_delta(l_baseline["kinds"].get(c_kind, l_empty), l_current["kinds"].get(c_kind, l_empty))
+                   for c_kind in l_kinds}
+      },
+      "changes"  : l_changes
+    }
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
@@ -0,0 +1,76 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+import json
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+from coverxygen import Symbol
+
+#------------------------------------------------------------------------------
+
+class JsonWriter(object):
+  """
+    Incremental json serializer. Containers are opened and closed explicitly
+    and each value written in between is encoded and written on its own, so
+    that the output is streamed file by file instead of being built as a
+    single string. Values are encoded by orjson when installed, by the json
+    module otherwise. The indented layout is the one of json.dumps(indent=2),
+    only string escaping and float notation may differ with orjson.
+  """
+  CLOSERS = { "{" : "}", "[" : "]" }
+
+  def __init__(self, p_stream, p_compact=False):
+    self.m_stream  = p_stream
+    self.m_compact = p_compact
+    self.m_counts  = []
+    self.m_closers = []
+
+  def encode(self, p_value):
+    l_level = len(self.m_counts)
+    if orjson is not None:
+      l_option = 0 if self.m_compact else orjson.OPT_INDENT_2
+      l_data   = orjson.dumps(p_value, default=Symbol.to_dict, option=l_option).decode("utf-8")
+    elif self.m_compact:
+      l_data = json.dumps(p_value, default=Symbol.to_dict, separators=(",", ":"))
+    else:
+      l_data = json.dumps(p_value, default=Symbol.to_dict, indent=2)
+    if self.m_compact or not l_level:
+      return l_data
+    # encoded strings never hold a raw newline, only the layout does
+    return l_data.replace("\n", self.get_newline(l_level))
+
+  def get_newline(self, p_level):
+    return "" if self.m_compact else "\n" + "  " * p_level
+
+  def begin_item(self, p_key):
+    if not self.m_counts:
+      return
+    l_prefix = "," if self.m_counts[-1] else ""
+    self.m_counts[-1] += 1
+    self.m_stream.write(l_prefix + self.get_newline(len(self.m_counts)))
+    if p_key is not None:
+      self.m_stream.write(self.encode(p_key) + (":" if self.m_compact else ": "))
+
+  def open(self, p_opener, p_key=None):
+    self.begin_item(p_key)
+    self.m_stream.write(p_opener)
+    self.m_counts.append(0)
+    self.m_closers.append(JsonWriter.CLOSERS[p_opener])
+
+  def close(self):
+    l_count = self.m_counts.pop()
+    if l_count:
+      self.m_stream.write(self.get_newline(len(self.m_counts)))
+    self.m_stream.write(self.m_closers.pop())
+
+  def write(self, p_value, p_key=None):
+    self.begin_item(p_key)
+    self.m_stream.write(self.encode(p_value))
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
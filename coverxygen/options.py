@@ -0,0 +1,38 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+class Options(object):
+  """
+    Settings of a run besides the xml root, output, scopes, kinds and filters
+    given to Coverxygen, grouped so that new settings do not extend its
+    constructor.
+
+    engine : p_jobs, p_engine, p_xmlBackend, p_dedup, p_shard
+    input  : p_roots, p_changedFiles, p_reverseIndex
+    cache  : p_cacheDir, p_cacheSize
+    output : p_outputs, p_perRoot, p_compact, p_baseline, p_profile, p_profileTop
+  """
+  def __init__(self, *, p_jobs=1, p_engine="tree", p_xmlBackend="auto", p_dedup="none", p_shard=None,
+               p_roots=None, p_changedFiles=None, p_reverseIndex=None,
+               p_cacheDir=None, p_cacheSize=512 * 1024 * 1024,
+               p_outputs=None, p_perRoot=False, p_compact=False, p_baseline=None, p_profile=False, p_profileTop=10):
+    self.m_jobs         = p_jobs
+    self.m_engine       = p_engine
+    self.m_xmlBackend   = p_xmlBackend
+    self.m_dedup        = p_dedup
+    self.m_shard        = p_shard
+    self.m_roots        = p_roots
+    self.m_changedFiles = p_changedFiles
+    self.m_reverseIndex = p_reverseIndex
+    self.m_cacheDir     = p_cacheDir
+    self.m_cacheSize    = p_cacheSize
+    self.m_outputs      = p_outputs
+    self.m_perRoot      = p_perRoot
+    self.m_compact      = p_compact
+    self.m_baseline     = p_baseline
+    self.m_profile      = p_profile
+    self.m_profileTop   = p_profileTop
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
@@ -0,0 +1,138 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+import json
+import heapq
+import time
+
+from coverxygen import Coverxygen
+
+#------------------------------------------------------------------------------
+
+class PhaseProfiler(object):
+  """
+    Wall clock time spent in each processing phase, enabled by --profile.
+    Parse, extract and filter times are measured inside the compound files
+    processing and are cumulated over worker processes when running with
+    several jobs. Extract is the compound processing time not spent in the
+    parser or in filters.
+  """
+  PHASES = ["parse", "extract", "filter", "group", "serialize"]
+
+  def __init__(self, p_top=10):
+    self.m_top     = p_top
+    self.m_jobs    = 1
+    self.m_wall    = 0.0
+    self.m_start   = None
+    self.m_symbols = 0
+    self.reset()
+
+  def reset(self):
+    self.m_times = dict.fromkeys(PhaseProfiler.PHASES, 0.0)
+    self.m_bytes = 0
+    self.m_count = 0
+    self.m_files = []
+
+  def start(self, p_jobs=1):
+    self.m_jobs  = p_jobs
+    self.m_start = time.perf_counter()
+
+  def stop(self):
+    self.m_wall = time.perf_counter() - self.m_start
+
+  def add(self, p_phase, p_seconds):
+    self.m_times[p_phase] += p_seconds
+
+  def iter_timed(self, p_phase, p_iterable):
+    l_iter = iter(p_iterable)
+    while True:
+      l_start = time.perf_counter()
+      try:
+        l_item = next(l_iter)
+      except StopIteration:
+        self.add(p_phase, time.perf_counter() - l_start)
+        return
+      self.add(p_phase, time.perf_counter() - l_start)
+      yield l_item
+
+  def start_file(self):
+    return time.perf_counter(), self.m_times["parse"] + self.m_times["filter"]
+
+  def end_file(self, p_mark, p_filePath, p_size, p_symbolCount):
+    l_start, l_nested = p_mark
+    l_elapsed = time.perf_counter() - l_start
+    self.add("extract", l_elapsed - (self.m_times["parse"] + self.m_times["filter"] - l_nested))
+    self.m_bytes += p_size
+    self.m_count += 1
+    self.add_file((l_elapsed, p_filePath, p_size, p_symbolCount))
+
+  def add_file(self, p_entry):
+    """
+      p_entry : (seconds, path, size, symbol count), only the m_top slowest are kept
+    """
+    if len(self.m_files) < self.m_top:
+      heapq.heappush(self.m_files, tuple(p_entry))
+    elif self.m_top > 0:
+      heapq.heappushpop(self.m_files, tuple(p_entry))
+
+  def pop_state(self):
+    l_state = {
+      "times" : self.m_times,
+      "bytes" : self.m_bytes,
+      "count" : self.m_count,
+      "files" : self.m_files
+    }
+    self.reset()
+    return l_state
+
+  def merge(self, p_state):
+    for c_phase, c_seconds in p_state["times"].items():
+      self.add(c_phase, c_seconds)
+    self.m_bytes += p_state["bytes"]
+    self.m_count += p_state["count"]
+    for c_entry in p_state["files"]:
+      self.add_file(c_entry)
+
+  @staticmethod
+  def get_rate(p_value, p_seconds):
+    return 0 if p_seconds <= 0 else p_value / p_seconds
+
+  def get_report(self):
+    return {
+      "wall_seconds"       : self.m_wall,
+      "jobs"               : self.m_jobs,
+      "phases"             : dict(self.m_times),
+      "symbols"            : self.m_symbols,
+      "symbols_per_second" : self.get_rate(self.m_symbols, self.m_wall),
+      "parsed_files"       : self.m_count,
+      "parsed_bytes"       : self.m_bytes,
+      "bytes_per_second"   : self.get_rate(self.m_bytes, self.m_times["parse"]),
+      "slowest_files"      : [{ "file" : c_path, "size" : c_size, "seconds" : c_seconds, "symbols" : c_count }
+                              for c_seconds, c_path, c_size, c_count in sorted(self.m_files, reverse=True)]
+    }
+
+  def print_report(self, p_stream):
+    l_report = self.get_report()
+    p_stream.write("profile : %d symbols in %.3fs (%.0f symbols/s), %d files, %d bytes parsed (%.0f bytes/s)\n" % (
+      l_report["symbols"], l_report["wall_seconds"], l_report["symbols_per_second"],
+      l_report["parsed_files"], l_report["parsed_bytes"], l_report["bytes_per_second"]))
+    if self.m_jobs > 1:
+      p_stream.write("parse, extract and filter times are cumulated over %d jobs\n" % self.m_jobs)
+    for c_phase in PhaseProfiler.PHASES:
+      l_seconds = l_report["phases"][c_phase]
+      p_stream.write("  %-10s %10.3fs %6.1f%%\n" % (c_phase, l_seconds, 100 * self.get_rate(l_seconds, l_report["wall_seconds"])))
+    if l_report["slowest_files"]:
+      p_stream.write("slowest compound files :\n")
+    for c_entry in l_report["slowest_files"]:
+      p_stream.write("  %10.3fs %10d bytes %7d symbols  %s\n" % (c_entry["seconds"], c_entry["size"], c_entry["symbols"], c_entry["file"]))
+
+  def write_json(self, p_path):
+    try:
+      with open(p_path, "w", encoding="utf-8") as l_file:
+        json.dump(self.get_report(), l_file, indent=2)
+    except OSError as l_error:
+      Coverxygen.error("unable to write profile report %s : %s", p_path, str(l_error))
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
@@ -0,0 +1,99 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+import json
+import sqlite3
+
+from coverxygen import Coverxygen
+
+#------------------------------------------------------------------------------
+
+class ReverseIndex(object):
+  """
+    Persistent sqlite mapping of source files to the compound files holding
+    symbols located in them. A compound file is only read again when its
+    stamp changed since the previous update, locations are then found by a raw
+    scan of the bytes without xml parsing. Source paths are stored absolute,
+    the whole index is dropped when the root source directory changes.
+  """
+  VERSION      = 1
+  SELECT_BATCH = 500
+
+  def __init__(self, p_path, p_rootDir):
+    self.m_path    = p_path
+    self.m_rootDir = p_rootDir
+    self.m_updated = 0
+    self.m_removed = 0
+    try:
+      self.m_db = sqlite3.connect(p_path)
+      self.m_db.executescript("""
+        CREATE TABLE IF NOT EXISTS config (value TEXT);
+        CREATE TABLE IF NOT EXISTS compounds (refid TEXT PRIMARY KEY, stamp TEXT);
+        CREATE TABLE IF NOT EXISTS sources (path TEXT, refid TEXT);
+        CREATE INDEX IF NOT EXISTS sources_path ON sources (path);
+        CREATE INDEX IF NOT EXISTS sources_refid ON sources (refid);
+      """)
+      l_config = json.dumps([ReverseIndex.VERSION, p_rootDir])
+      if self.m_db.execute("SELECT value FROM config").fetchall() != [(l_config,)]:
+        with self.m_db:
+          self.m_db.execute("DELETE FROM config")
+          self.m_db.execute("DELETE FROM compounds")
+          self.m_db.execute("DELETE FROM sources")
+          self.m_db.execute("INSERT INTO config VALUES (?)", (l_config,))
+    except sqlite3.Error as l_error:
+      Coverxygen.error("unable to open reverse index %s : %s", p_path, str(l_error))
+
+  def get_sources(self, p_data):
+    l_sources = set()
+    for c_file in set(Coverxygen.LOCATION_REGEX.findall(p_data)):
+      try:
+        l_file = Coverxygen.decode_xml_text(c_file)
+      except ValueError:
+        # the compound file can not be parsed either
+        continue
+      l_sources.add(Coverxygen.get_absolute_path(l_file, self.m_rootDir))
+    return l_sources
+
+  def update(self, p_source, p_refids):
+    try:
+      l_stamps  = dict(self.m_db.execute("SELECT refid, stamp FROM compounds"))
+      l_listing = p_source.get_listing()
+      with self.m_db:
+        for c_refid in p_refids:
+          # missing compound files are reported at once by Coverxygen.check_listing
+          if not "%s.xml" % c_refid in l_listing:
+            continue
+          l_path  = p_source.get_file_path(c_refid)
+          l_stamp = p_source.get_stamp(l_path)
+          if l_stamps.pop(c_refid, None) == l_stamp:
+            continue
+          l_sources = self.get_sources(p_source.read(l_path))
+          self.m_db.execute("DELETE FROM sources WHERE refid = ?", (c_refid,))
+          self.m_db.executemany("INSERT INTO sources VALUES (?, ?)", [(c_path, c_refid) for c_path in l_sources])
+          self.m_db.execute("INSERT OR REPLACE INTO compounds VALUES (?, ?)", (c_refid, l_stamp))
+          self.m_updated += 1
+        for c_refid in l_stamps:
+          self.m_db.execute("DELETE FROM sources WHERE refid = ?", (c_refid,))
+          self.m_db.execute("DELETE FROM compounds WHERE refid = ?", (c_refid,))
+          self.m_removed += 1
+    except sqlite3.Error as l_error:
+      Coverxygen.error("unable to update reverse index %s : %s", self.m_path, str(l_error))
+
+  def select(self, p_files):
+    l_files  = sorted(p_files)
+    l_refids = set()
+    try:
+      for c_start in range(0, len(l_files), ReverseIndex.SELECT_BATCH):
+        l_batch = l_files[c_start:c_start + ReverseIndex.SELECT_BATCH]
+        l_query = "SELECT DISTINCT refid FROM sources WHERE path IN (%s)" % ",".join("?" * len(l_batch))
+        l_refids.update(c_row[0] for c_row in self.m_db.execute(l_query, l_batch))
+    except sqlite3.Error as l_error:
+      Coverxygen.error("unable to query reverse index %s : %s", self.m_path, str(l_error))
+    return l_refids
+
+  def close(self):
+    self.m_db.close()
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
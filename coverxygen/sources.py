@@ -0,0 +1,280 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+import os
+import sys
+import io
+import gzip
+import hashlib
+import tarfile
+import zipfile
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+from coverxygen import Coverxygen
+
+#------------------------------------------------------------------------------
+
+class XmlDirectory(object):
+  """
+    Doxygen XML output directory, compound files are read from disk by path.
+  """
+  m_inMemory = False
+
+  def __init__(self, p_root, p_listings=None):
+    self.m_root     = p_root
+    self.m_listings = {} if p_listings is None else p_listings
+
+  def get_index_path(self):
+    return Coverxygen.get_index_path_from_root(self.m_root)
+
+  def get_listing(self):
+    """
+      Sizes of the xml files of the directory by name. The directory is listed
+      once by a single scandir instead of a stat per compound, the listing is
+      kept in p_listings, shared by the xml roots of a run and by watch mode
+      polls, and must not be modified.
+    """
+    l_key     = os.path.abspath(self.m_root)
+    l_listing = self.m_listings.get(l_key)
+    if l_listing is None:
+      try:
+        with os.scandir(self.m_root) as l_entries:
+          l_listing = {c_entry.name : c_entry.stat().st_size for c_entry in l_entries if c_entry.name.endswith(".xml")}
+      except OSError as l_error:
+        Coverxygen.error("unable to list xml directory %s : %s", self.m_root, str(l_error))
+      self.m_listings[l_key] = l_listing
+    return l_listing
+
+  def reset_listing(self):
+    """
+      Lists the directory again on next get_listing, eg. after doxygen wrote
+      a new index.xml
+    """
+    self.m_listings.pop(os.path.abspath(self.m_root), None)
+
+  def get_file_path(self, p_name):
+    l_filePath = os.path.join(self.m_root, "%s.xml" % p_name)
+    if not "%s.xml" % p_name in self.get_listing():
+      Coverxygen.error("could not find indexed file %s", l_filePath)
+    return l_filePath
+
+  def get_size(self, p_path):
+    l_dir, l_name = os.path.split(p_path)
+    if l_dir == self.m_root:
+      l_size = self.get_listing().get(l_name)
+      if l_size is not None:
+        return l_size
+    return os.path.getsize(p_path)
+
+  def get_stamp(self, p_path):
+    """
+      Changes whenever the content of p_path may have changed
+    """
+    try:
+      l_stat = os.stat(p_path)
+    except OSError as l_error:
+      Coverxygen.error("unable to read file %s : %s", p_path, str(l_error))
+    return "%d:%d" % (l_stat.st_mtime_ns, l_stat.st_size)
+
+  def open(self, p_path): # pylint: disable=unused-argument
+    """
+      Parser source for p_path, None to let the parser open the file itself
+    """
+    return None
+
+  def read(self, p_path):
+    try:
+      with open(p_path, "rb") as l_file:
+        return l_file.read()
+    except OSError as l_error:
+      Coverxygen.error("unable to read file %s : %s", p_path, str(l_error))
+
+  def close(self):
+    pass
+
+class XmlArchive(XmlDirectory):
+  """
+    Doxygen XML output directory packed in a tar (optionally gzip, bzip2, xz
+    or zstd compressed) or zip archive, "-" reads a tar stream on standard
+    input. Nothing is extracted to disk. Zip and uncompressed tar archives
+    are kept open and their members are read on demand. Standard input and
+    compressed tar archives can only be read forward, they are read in a
+    single sequential pass and their xml members are kept in memory, peak
+    memory is then the size of the xml tree. Members compressed
+    individually as .xml.gz are decompressed when read. The directory holding
+    index.xml in the archive is the xml root, compound files are addressed by
+    the archive path joined with their name relative to this root.
+  """
+  m_inMemory = True
+
+  ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+  def __init__(self, p_root, p_members, p_archive=None):
+    """
+      p_members : member name relative to the xml root to (content, zip or tar
+                  member info, gzip compressed flag)
+      p_archive : open ZipFile or TarFile members infos are read from
+    """
+    super(XmlArchive, self).__init__(p_root)
+    self.m_members = p_members
+    self.m_archive = p_archive
+
+  def __getstate__(self):
+    # worker processes open the archive again on first read
+    l_state = dict(self.__dict__)
+    l_state["m_archive"] = None
+    return l_state
+
+  def get_archive(self, p_info):
+    """
+      Archive p_info is read from, opened again after close
+    """
+    if self.m_archive is None:
+      if isinstance(p_info, zipfile.ZipInfo):
+        self.m_archive = zipfile.ZipFile(self.m_root)
+      else:
+        self.m_archive = tarfile.open(self.m_root, "r:")
+    return self.m_archive
+
+  @staticmethod
+  def is_archive(p_root):
+    return p_root == "-" or os.path.isfile(p_root)
+
+  @staticmethod
+  def load(p_root):
+    try:
+      if p_root == "-":
+        l_members = XmlArchive.read_tar_stream(sys.stdin.buffer)
+      elif zipfile.is_zipfile(p_root):
+        l_zip = zipfile.ZipFile(p_root)
+        try:
+          l_members = XmlArchive.get_xml_members(p_root, [(c_info.filename, c_info) for c_info in l_zip.infolist() if not c_info.is_dir()])
+        except RuntimeError:
+          l_zip.close()
+          raise
+        return XmlArchive(p_root, l_members, l_zip)
+      else:
+        l_tar = XmlArchive.open_tar(p_root)
+        if l_tar is not None:
+          try:
+            l_members = XmlArchive.get_xml_members(p_root, [(c_info.name, c_info) for c_info in l_tar if c_info.isfile()])
+          except RuntimeError:
+            l_tar.close()
+            raise
+          return XmlArchive(p_root, l_members, l_tar)
+        with open(p_root, "rb") as l_file:
+          l_members = XmlArchive.read_tar_stream(l_file)
+    except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as l_error:
+      Coverxygen.error("unable to read xml archive %s : %s", p_root, str(l_error))
+    return XmlArchive(p_root, XmlArchive.get_xml_members(p_root, l_members))
+
+  @staticmethod
+  def open_tar(p_path):
+    """
+      Uncompressed tar archive at p_path opened for random access, None when
+      it is compressed : seeking backward in a compressed stream restarts its
+      decompression, such archives are read as a stream instead.
+    """
+    try:
+      return tarfile.open(p_path, "r:")
+    except tarfile.ReadError:
+      return None
+
+  @staticmethod
+  def read_tar_stream(p_stream):
+    """
+      Yields (name, content) of the regular files of a tar stream, compression
+      is detected from the stream header.
+    """
+    l_stream = io.BufferedReader(p_stream) if not hasattr(p_stream, "peek") else p_stream
+    if l_stream.peek(4)[:4] == XmlArchive.ZSTD_MAGIC:
+      if zstandard is None:
+        Coverxygen.error("zstandard module is required to read zstd compressed archives")
+      l_stream = zstandard.ZstdDecompressor().stream_reader(l_stream)
+    l_members = []
+    with tarfile.open(fileobj=l_stream, mode="r|*") as l_tar:
+      for c_info in l_tar:
+        if c_info.isfile():
+          l_members.append((c_info.name, l_tar.extractfile(c_info).read()))
+    return l_members
+
+  @staticmethod
+  def get_xml_members(p_root, p_members):
+    l_members = {}
+    for c_name, c_value in p_members:
+      l_name = os.path.normpath(c_name).lstrip("/")
+      l_gzip = l_name.endswith(".xml.gz")
+      if l_gzip:
+        l_name = l_name[:-3]
+      if l_name.endswith(".xml"):
+        l_members[l_name] = (c_value, l_gzip)
+    l_indexes = [c_name for c_name in l_members if os.path.basename(c_name) == "index.xml"]
+    if not l_indexes:
+      Coverxygen.error("could not find root index.xml file in archive %s", p_root)
+    l_prefix = os.path.dirname(min(l_indexes, key=lambda p_name: (p_name.count("/"), p_name)))
+    if not l_prefix:
+      return l_members
+    return {os.path.relpath(c_name, l_prefix) : c_data for c_name, c_data in l_members.items()
+            if c_name.startswith(l_prefix + "/")}
+
+  def get_member_name(self, p_path):
+    return os.path.relpath(p_path, self.m_root) if p_path.startswith(self.m_root) else p_path
+
+  def get_index_path(self):
+    return os.path.join(self.m_root, "index.xml")
+
+  def get_listing(self):
+    return frozenset(c_name for c_name in self.m_members if not "/" in c_name)
+
+  def reset_listing(self):
+    pass
+
+  def get_file_path(self, p_name):
+    l_fileName = "%s.xml" % p_name
+    if not l_fileName in self.m_members:
+      Coverxygen.error("could not find indexed file %s in archive %s", l_fileName, self.m_root)
+    return os.path.join(self.m_root, l_fileName)
+
+  def get_size(self, p_path):
+    l_member = self.m_members.get(self.get_member_name(p_path))
+    if l_member is not None and not l_member[1]:
+      if isinstance(l_member[0], zipfile.ZipInfo):
+        return l_member[0].file_size
+      if isinstance(l_member[0], tarfile.TarInfo):
+        return l_member[0].size
+    return len(self.read(p_path))
+
+  def get_stamp(self, p_path):
+    return hashlib.sha1(self.read(p_path)).hexdigest()
+
+  def open(self, p_path):
+    return io.BytesIO(self.read(p_path))
+
+  def read(self, p_path):
+    l_member = self.m_members.get(self.get_member_name(p_path))
+    if l_member is None:
+      Coverxygen.error("could not find file %s in archive %s", p_path, self.m_root)
+    l_data, l_gzip = l_member
+    try:
+      if isinstance(l_data, zipfile.ZipInfo):
+        l_data = self.get_archive(l_data).read(l_data)
+      elif isinstance(l_data, tarfile.TarInfo):
+        l_data = self.get_archive(l_data).extractfile(l_data).read()
+      if l_gzip:
+        l_data = gzip.decompress(l_data)
+    except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as l_error:
+      Coverxygen.error("unable to read archive member %s of %s : %s", p_path, self.m_root, str(l_error))
+    return l_data
+
+  def close(self):
+    if self.m_archive is not None:
+      self.m_archive.close()
+      self.m_archive = None
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
@@ -0,0 +1,159 @@
+# -*- coding: utf-8
+#------------------------------------------------------------------#
+
+__author__    = "Xavier MARCELET <xavier@marcelet.com>"
+
+#------------------------------------------------------------------#
+
+import os
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+#------------------------------------------------------------------#
+
+class CorpusGenerator(object):
+  """
+    Writes a synthetic doxygen XML directory : an index.xml file and one
+    compound file per class and namespace.
+
+    Each class lives in a namespace of p_depth nesting levels and defines
+    p_members functions, variables and typedefs plus p_enums enums of
+    p_enumValues values. Every symbol is documented with probability
+    p_docRatio, the generator is deterministic for a given p_seed.
+  """
+  def __init__(self, p_compounds=100, p_members=50, p_enums=2, p_enumValues=5, p_depth=2, p_docRatio=0.5, p_seed=0):
+    self.m_compounds  = p_compounds
+    self.m_members    = p_members
+    self.m_enums      = p_enums
+    self.m_enumValues = p_enumValues
+    self.m_depth      = p_depth
+    self.m_docRatio   = p_docRatio
+    self.m_seed       = p_seed
+    self.m_random     = random.Random(p_seed)
+    self.m_index      = []
+
+  def get_params(self):
+    return {
+      "compounds"  : self.m_compounds,
+      "members"    : self.m_members,
+      "enums"      : self.m_enums,
+      "enumValues" : self.m_enumValues,
+      "depth"      : self.m_depth,
+      "docRatio"   : self.m_docRatio,
+      "seed"       : self.m_seed
+    }
+
+  def get_description(self):
+    if self.m_random.random() < self.m_docRatio:
+      return "<briefdescription>\n<para>Generated documentation. </para></briefdescription>\n" \
+        "<detaileddescription>\n</detaileddescription>\n"
+    return "<briefdescription>\n</briefdescription>\n<detaileddescription>\n</detaileddescription>\n"
+
+  @staticmethod
+  def get_location(p_file, p_line):
+    return "<location file=%s line=\"%d\" column=\"1\"/>\n" % (quoteattr(p_file), p_line)
+
+  def write_compound(self, p_dir, p_refid, p_kind, p_name, p_members, p_body):
+    """
+      p_members : list of (refid, kind, name) listed in index.xml
+    """
+    self.m_index.append((p_refid, p_kind, p_name, p_members))
+    with open(os.path.join(p_dir, "%s.xml" % p_refid), "w") as l_file:
+      l_file.write("<?xml version='1.0' encoding='UTF-8' standalone='no'?>\n")
+      l_file.write("<doxygen version=\"1.8.14\">\n")
+      l_file.write("<compounddef id=%s kind=%s language=\"C++\" prot=\"public\">\n" % (quoteattr(p_refid), quoteattr(p_kind)))
+      l_file.write("<compoundname>%s</compoundname>\n" % escape(p_name))
+      l_file.write(p_body)
+      l_file.write("</compounddef>\n</doxygen>\n")
+
+  def get_memberdef(self, p_refid, p_kind, p_name, p_scope, p_file, p_line, p_prot="public"):
+    l_type = "void" if p_kind == "function" else "int"
+    l_args = "<argsstring>(int p_value)</argsstring>\n" if p_kind == "function" else ""
+    return "<memberdef kind=%s id=%s prot=%s static=\"no\">\n<type>%s</type>\n" \
+      "<definition>%s %s::%s</definition>\n%s<name>%s</name>\n%s%s</memberdef>\n" % (
+        quoteattr(p_kind), quoteattr(p_refid), quoteattr(p_prot), l_type,
+        l_type, escape(p_scope), escape(p_name), l_args, escape(p_name),
+        self.get_description(), self.get_location(p_file, p_line))
+
+  def get_enumdef(self, p_refid, p_name, p_file, p_line, p_members):
+    l_values = []
+    for c_value in range(self.m_enumValues):
+      l_valueId = "%sa%d" % (p_refid, c_value)
+      l_values.append("<enumvalue id=%s prot=\"public\">\n<name>%s_value%d</name>\n%s</enumvalue>\n" % (
+        quoteattr(l_valueId), p_name, c_value, self.get_description()))
+      p_members.append((l_valueId, "enumvalue", "%s_value%d" % (p_name, c_value)))
+    return "<memberdef kind=\"enum\" id=%s prot=\"public\" static=\"no\">\n<type></type>\n<name>%s</name>\n%s%s%s</memberdef>\n" % (
+      quoteattr(p_refid), escape(p_name), "".join(l_values), self.get_description(), self.get_location(p_file, p_line))
+
+  def write_class(self, p_dir, p_index, p_scope, p_file):
+    l_refid   = "class_c%d" % p_index
+    l_name    = "%s::Class%d" % (p_scope, p_index)
+    l_members = []
+    l_body    = ["<sectiondef kind=\"public-func\">\n"]
+    l_line    = 10
+    for c_member in range(self.m_members):
+      l_kind     = ["function", "variable", "typedef"][c_member % 3]
+      l_prot     = ["public", "protected", "private"][c_member % 4 % 3]
+      l_memberId = "%s_1m%d" % (l_refid, c_member)
+      l_memberName = "%s%d" % (l_kind[0], c_member)
+      l_body.append(self.get_memberdef(l_memberId, l_kind, l_memberName, l_name, p_file, l_line, l_prot))
+      l_members.append((l_memberId, l_kind, l_memberName))
+      l_line += 3
+    for c_enum in range(self.m_enums):
+      l_enumId = "%s_1e%d" % (l_refid, c_enum)
+      l_members.append((l_enumId, "enum", "Enum%d" % c_enum))
+      l_body.append(self.get_enumdef(l_enumId, "Enum%d" % c_enum, p_file, l_line, l_members))
+      l_line += 3
+    l_body.append("</sectiondef>\n")
+    l_body.append(self.get_description())
+    l_body.append(self.get_location(p_file, 5))
+    self.write_compound(p_dir, l_refid, "class", l_name, l_members, "".join(l_body))
+    return l_refid
+
+  def write_namespace(self, p_dir, p_scope, p_file):
+    l_refid   = "namespace_%s" % p_scope.replace("::", "_1_1")
+    l_members = [("%s_1f" % l_refid, "function", "function")]
+    l_body    = "<sectiondef kind=\"func\">\n%s</sectiondef>\n%s%s" % (
+      self.get_memberdef(l_members[0][0], "function", "function", p_scope, p_file, 3),
+      self.get_description(), self.get_location(p_file, 1))
+    self.write_compound(p_dir, l_refid, "namespace", p_scope, l_members, l_body)
+
+  def write_index(self, p_dir):
+    with open(os.path.join(p_dir, "index.xml"), "w") as l_file:
+      l_file.write("<?xml version='1.0' encoding='UTF-8' standalone='no'?>\n")
+      l_file.write("<doxygenindex version=\"1.8.14\">\n")
+      for c_refid, c_kind, c_name, c_members in self.m_index:
+        l_file.write("  <compound refid=%s kind=%s><name>%s</name>\n" % (quoteattr(c_refid), quoteattr(c_kind), escape(c_name)))
+        for c_memberId, c_memberKind, c_memberName in c_members:
+          l_file.write("    <member refid=%s kind=%s><name>%s</name></member>\n" % (
+            quoteattr(c_memberId), quoteattr(c_memberKind), escape(c_memberName)))
+        l_file.write("  </compound>\n")
+      l_file.write("</doxygenindex>\n")
+
+  def generate(self, p_dir):
+    self.m_index  = []
+    self.m_random = random.Random(self.m_seed)
+    os.makedirs(p_dir, exist_ok=True)
+    l_scopes = set()
+    for c_index in range(self.m_compounds):
+      l_path  = ["ns%d" % ((c_index + c_level) % 3) for c_level in range(self.m_depth)] or ["global"]
+      l_scope = "::".join(l_path)
+      l_file  = "src/%s/Class%d.hh" % ("/".join(l_path), c_index)
+      self.write_class(p_dir, c_index, l_scope, l_file)
+      for c_level in range(1, len(l_path) + 1):
+        l_parent = "::".join(l_path[:c_level])
+        if not l_parent in l_scopes:
+          l_scopes.add(l_parent)
+          self.write_namespace(p_dir, l_parent, "src/%s/%s.hh" % ("/".join(l_path[:c_level]), l_path[c_level - 1]))
+    self.write_index(p_dir)
+    return p_dir
+
+  def get_symbol_count(self):
+    """
+      Number of symbols reported by coverxygen with all kinds and scopes
+    """
+    return len(self.m_index) + sum(len(c_entry[3]) for c_entry in self.m_index)
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
@@ -6,12 +6,23 @@ __author__    = "Xavier MARCELET <xavier@marcelet.com>"
 #------------------------------------------------------------------#
 
 import os
+import gzip
+import io
 import json
+import pickle
+import multiprocessing
+import shutil
+import tarfile
+import zipfile
 import tempfile
 import xml.etree.ElementTree as ET
 import unittest
+from unittest import mock
+from contextlib import redirect_stderr
 from io import StringIO
-from coverxygen import Coverxygen
+import coverxygen
+from coverxygen import Coverxygen, Options, FilterPlan, Symbol, SymbolAggregate, ReverseIndex, XmlDirectory, WatchSession, JsonWriter
+from coverxygen.test.corpus import CorpusGenerator
 
 #------------------------------------------------------------------#
 
@@ -19,7 +30,8 @@ class CoverxygenTest(unittest.TestCase):
   def __init__(self, *p_args, **p_kwds):
     super(CoverxygenTest, self).__init__(*p_args, **p_kwds)
     l_path = os.path.realpath(os.path.dirname(__file__))
-    self.m_dataRoot = os.path.join(l_path, "data")
+    self.m_dataRoot   = os.path.join(l_path, "data")
+    self.m_projectDir = None
 
   def get_data_path(self, p_file, p_assert=True):
     l_path = os.path.join(self.m_dataRoot, p_file)
@@ -27,6 +39,73 @@ class CoverxygenTest(unittest.TestCase):
       self.assertEqual(True, os.path.exists(l_path))
     return l_path
 
+  # compound files of the test project shared with the single file tests
+  PROJECT_FILES = {
+    "classxtd_1_1Application.xml" : "class.xml",
+    "class_my_enum_class.xml"     : "enum.xml",
+    "namespace_my_namespace.xml"  : "namespace.xml"
+  }
+
+  def get_project_path(self):
+    """
+      Test project assembled once per test in a temporary directory, from its
+      index.xml and the compound files of PROJECT_FILES
+    """
+    if self.m_projectDir is None:
+      l_tmpDir = tempfile.mkdtemp()
+      self.addCleanup(shutil.rmtree, l_tmpDir)
+      self.m_projectDir = os.path.join(l_tmpDir, "project")
+      os.mkdir(self.m_projectDir)
+      shutil.copy(self.get_data_path(os.path.join("project", "index.xml")), self.m_projectDir)
+      for c_name, c_file in CoverxygenTest.PROJECT_FILES.items():
+        shutil.copy(self.get_data_path(c_file), os.path.join(self.m_projectDir, c_name))
+    return self.m_projectDir
+
+  def make_project_copy(self):
+    """
+      Copy of the test project with an additional file compound which repeats
+      the memberdef of MyNamespace::myNamespaceFunc at a different line.
+    """
+    l_tmpDir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, l_tmpDir)
+    l_dir = os.path.join(l_tmpDir, "project")
+    shutil.copytree(self.get_project_path(), l_dir)
+    l_nsDoc  = ET.parse(os.path.join(l_dir, "namespace_my_namespace.xml"))
+    l_member = l_nsDoc.find(".//memberdef[@kind='function']")
+    l_member.find("location").set("line", "99")
+    l_fileDoc = ET.fromstring("""<doxygen><compounddef id="_my_namespace_8hh" kind="file">
+      <compoundname>MyNamespace.hh</compoundname><sectiondef kind="func"/>
+      <location file="src/MyNamespace.hh"/></compounddef></doxygen>""")
+    l_fileDoc.find(".//sectiondef").append(l_member)
+    ET.ElementTree(l_fileDoc).write(os.path.join(l_dir, "_my_namespace_8hh.xml"))
+    l_index = ET.parse(os.path.join(l_dir, "index.xml"))
+    l_entry = ET.SubElement(l_index.getroot(), "compound", refid="_my_namespace_8hh", kind="file")
+    ET.SubElement(l_entry, "member", refid=l_member.get("id"), kind="function")
+    l_index.write(os.path.join(l_dir, "index.xml"))
+    return l_dir
+
+  # Coverxygen keywords, the other ones given to create are Options ones
+  FILTER_KEYWORDS = ["p_prefix", "p_verbose", "p_excludes", "p_includes", "p_excludesymbols"]
+
+  @staticmethod
+  def create(p_root, p_output, p_scopes, p_kinds, p_format, p_rootDir, **p_kwds):
+    l_args = {c_key : p_kwds.pop(c_key) for c_key in CoverxygenTest.FILTER_KEYWORDS if c_key in p_kwds}
+    return Coverxygen(p_root, p_output, p_scopes, p_kinds, p_format, p_rootDir, p_options=Options(**p_kwds), **l_args)
+
+  def run_process(self, p_format, p_kinds=None, p_root=None, **p_kwds):
+    l_scopes = ["private", "protected", "public"]
+    l_kinds  = p_kinds or ["function", "class", "namespace", "variable", "typedef", "friend"]
+    l_root   = p_root or self.get_project_path()
+    l_dir    = tempfile.mkdtemp()
+    l_output = os.path.join(l_dir, "output")
+    try:
+      l_obj = self.create(l_root, l_output, l_scopes, l_kinds, p_format, "/opt", **p_kwds)
+      l_obj.process()
+      with open(l_output) as l_file:
+        return l_file.read()
+    finally:
+      shutil.rmtree(l_dir)
+
   def test_error(self):
     with self.assertRaisesRegex(RuntimeError, "message arg"):
       Coverxygen.error("message %s", "arg")
@@ -45,14 +124,16 @@ class CoverxygenTest(unittest.TestCase):
     os.unlink(l_path)
     os.removedirs(l_dir)
 
-  def test_get_file_path_from_root(self):
+  def test_get_file_path(self):
     with self.assertRaises(RuntimeError):
-      Coverxygen.get_file_path_from_root(".", "base")
+      XmlDirectory(".").get_file_path("base")
     l_dir = tempfile.mkdtemp()
     l_path = os.path.join(l_dir, "base.xml")
     l_file = open(l_path, "w")
+    l_file.write("<doxygen/>")
     l_file.close()
-    self.assertEqual(l_path, Coverxygen.get_file_path_from_root(l_dir, "base"))
+    self.assertEqual(l_path, XmlDirectory(l_dir).get_file_path("base"))
+    self.assertEqual(10, XmlDirectory(l_dir).get_size(l_path))
     os.unlink(l_path)
     os.removedirs(l_dir)
 
@@ -107,6 +188,16 @@ class CoverxygenTest(unittest.TestCase):
   <node5>
     <inbodydescription>content</inbodydescription>
   </node5>
+  <node6>
+    <briefdescription> <para> </para> </briefdescription>
+    <detaileddescription><para>  <ref> </ref> </para></detaileddescription>
+  </node6>
+  <node7>
+    <briefdescription> <para> <ref>content</ref> </para> </briefdescription>
+  </node7>
+  <node8>
+    <sectiondef><briefdescription>content</briefdescription></sectiondef>
+  </node8>
 </data>
     """
     l_doc = ET.fromstring(l_data)
@@ -115,6 +206,19 @@ class CoverxygenTest(unittest.TestCase):
     self.assertEqual(True,   Coverxygen.extract_documented(l_doc.find("./node3")))
     self.assertEqual(True,   Coverxygen.extract_documented(l_doc.find("./node4")))
     self.assertEqual(True,   Coverxygen.extract_documented(l_doc.find("./node5")))
+    self.assertEqual(False,  Coverxygen.extract_documented(l_doc.find("./node6")))
+    self.assertEqual(True,   Coverxygen.extract_documented(l_doc.find("./node7")))
+    # only direct children are descriptions of the node
+    self.assertEqual(False,  Coverxygen.extract_documented(l_doc.find("./node8")))
+
+  def test_get_children(self):
+    l_node = ET.fromstring("""<memberdef><name>first</name><location file="a.hh"/><name>second</name>
+      <sectiondef><definition>nested</definition></sectiondef><param/></memberdef>""")
+    l_children = Coverxygen.get_children(l_node)
+    self.assertEqual(["name", "location"], sorted(l_children, reverse=True))
+    self.assertEqual("first", l_children["name"].text)
+    self.assertEqual("first", Coverxygen.extract_name(l_node, l_children))
+    self.assertEqual("ns::first", Coverxygen.extract_qualified_name(l_node, "ns", l_children))
 
 
   def test_extract_location(self):
@@ -227,6 +331,33 @@ class CoverxygenTest(unittest.TestCase):
     self.assertFalse(l_obj.should_filter_out(l_dummyNode, os.path.abspath("/src/test/special.ctt"), 1))
     self.assertFalse(l_obj.should_filter_out(l_dummyNode, os.path.abspath("/other/special.ctt"), 1))
 
+  def test_filter_plan(self):
+    self.assertEqual(1, len(FilterPlan.compile_regex_list([".*a$", ".*b$"])))
+    self.assertEqual(2, len(FilterPlan.compile_regex_list([r"(a)\1", ".*b$"])))
+    self.assertEqual(2, len(FilterPlan.compile_regex_list([".*b$", r"(a)?(?(1)b|c)$"])))
+    self.assertEqual(2, len(FilterPlan.compile_regex_list([r"(?P<n>a)?(?(n)b|c)$", ".*d$"])))
+    self.assertEqual(2, len(FilterPlan.compile_regex_list([r"(?P<n>a)", r"(?P<n>b)"])))
+    l_regExList = FilterPlan.compile_regex_list([".*b$", r"(a)?(?(1)b|c)$"])
+    self.assertTrue(FilterPlan.matches(l_regExList, "ab"))
+    self.assertFalse(FilterPlan.matches(l_regExList, "ac"))
+    self.assertEqual(2, len(FilterPlan.compile_regex_list(["(?i).*a$", ".*b$"])))
+    self.assertEqual(2, len(FilterPlan.compile_regex_list([".*a$", "(?s).*b$"])))
+    self.assertEqual(1, len(FilterPlan.compile_regex_list(["(?i:.*a$)", ".*b$"])))
+    l_regExList = FilterPlan.compile_regex_list(["(?i).*a$", ".*b$"])
+    self.assertTrue(FilterPlan.matches(l_regExList, "xA"))
+    self.assertFalse(FilterPlan.matches(l_regExList, "xB"))
+    self.assertEqual([], FilterPlan.compile_regex_list([]))
+    with self.assertRaisesRegex(RuntimeError, "invalid regular expression"):
+      FilterPlan.compile_regex_list(["("])
+    l_plan = FilterPlan("/src", [".*special$"], [".*/test/.*", ".*\\.ctt$"], [])
+    self.assertTrue(FilterPlan.matches(l_plan.m_excludes, "/src/file.ctt"))
+    self.assertFalse(FilterPlan.matches(l_plan.m_excludes, "/src/file.cc"))
+    self.assertFalse(l_plan.is_file_filtered_out("/src/file.cc"))
+    self.assertTrue(l_plan.is_file_filtered_out("/src/test/file.cc"))
+    self.assertTrue(l_plan.is_file_filtered_out("/other/file.cc"))
+    self.assertFalse(l_plan.is_file_filtered_out("/other/special"))
+    self.assertEqual({"/src/file.cc": False, "/src/test/file.cc": True, "/other/file.cc": True, "/other/special": False}, l_plan.m_verdicts)
+
   def test_symbol_filter(self):
       l_classDoc = ET.parse(self.get_data_path("class.xml"))
       l_scopes   = ["private", "protected", "public"]
@@ -241,57 +372,72 @@ class CoverxygenTest(unittest.TestCase):
       l_nodeMemberArgEnum = l_classDoc.find("./compounddef//memberdef[@id='classxtd_1_1Application_1a672c075ed901e463609077d571a714c7']")  # argument enum type 
       l_nodeTypedef = l_classDoc.find("./compounddef//memberdef[@id='classxtd_1_1Application_1a907b6fe8247636495890e668530863d6']")  # typedef
 
+      l_scopeName = "xtd::Application"
+
       def should_filter_out_helper(nodes):
         for node in nodes:
-          self.assertTrue(l_obj.should_filter_out(node, os.path.abspath('/opt/src/Application.hh'), 1))
+          self.assertTrue(l_obj.should_filter_out(node, os.path.abspath('/opt/src/Application.hh'), 1, l_scopeName))
       def should_not_filter_out_helper(nodes):
         for node in nodes:
-          self.assertFalse(l_obj.should_filter_out(node, os.path.abspath('/opt/src/Application.hh'), 1))
+          self.assertFalse(l_obj.should_filter_out(node, os.path.abspath('/opt/src/Application.hh'), 1, l_scopeName))
 
       # no exclusions - symbol should not be filtered out
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt")
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt")
       should_not_filter_out_helper([l_nodeClass, l_nodeCtor, l_nodeExecuteFunc, l_nodeMemberIoServ, l_nodeMemberArgEnum, l_nodeTypedef])
 
       # exclude everything - all symbols should be filtered out
       l_excludesymbols = [r".+"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeClass, l_nodeCtor, l_nodeExecuteFunc, l_nodeMemberIoServ, l_nodeMemberArgEnum, l_nodeTypedef])
   
       # exclude entire class - all symbols should be filtered out
       l_excludesymbols = [r".*Application.*"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeClass, l_nodeCtor, l_nodeExecuteFunc, l_nodeMemberIoServ, l_nodeMemberArgEnum, l_nodeTypedef])
    
       # exclude ctor only
       l_excludesymbols = [r".*Application::Application\(.+\)"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeCtor])
       should_not_filter_out_helper([l_nodeClass, l_nodeExecuteFunc, l_nodeMemberIoServ, l_nodeMemberArgEnum, l_nodeTypedef])
 
       # exclude execute function only
       l_excludesymbols = [r".*Application::execute\(.+\)"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeExecuteFunc])
       should_not_filter_out_helper([l_nodeClass, l_nodeCtor, l_nodeMemberIoServ, l_nodeMemberArgEnum, l_nodeTypedef])
       
       # exclude ctor & execute function
       l_excludesymbols = [r".*Application::Application\(.+\)", r".*Application::execute\(.+\)"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeCtor, l_nodeExecuteFunc])
       should_not_filter_out_helper([l_nodeClass, l_nodeMemberIoServ, l_nodeMemberArgEnum, l_nodeTypedef])
       
       # exclude typename & member variable
       l_excludesymbols = [r".*Application::t_sig_handler.*", r".*Application::m_ioService"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeTypedef, l_nodeMemberIoServ])
       should_not_filter_out_helper([l_nodeClass, l_nodeCtor, l_nodeExecuteFunc, l_nodeMemberArgEnum])
      
       # exclude enum
       l_excludesymbols = [r".*Application::argument"]
-      l_obj = Coverxygen(l_classDoc, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
+      l_obj = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_verbose=l_verbose, p_excludesymbols=l_excludesymbols)
       should_filter_out_helper([l_nodeMemberArgEnum])
       should_not_filter_out_helper([l_nodeClass, l_nodeCtor, l_nodeExecuteFunc, l_nodeTypedef, l_nodeMemberIoServ])
 
+  def test_extract_qualified_name(self):
+    l_classDoc = ET.parse(self.get_data_path("class.xml"))
+    l_nodeClass = l_classDoc.find("./compounddef")
+    l_nodeEnum  = l_classDoc.find("./compounddef//memberdef[@id='classxtd_1_1Application_1a672c075ed901e463609077d571a714c7']")
+    self.assertEqual("xtd::Application", Coverxygen.extract_qualified_name(l_nodeClass, None))
+    self.assertEqual("argument", Coverxygen.extract_qualified_name(l_nodeEnum, None))
+    self.assertEqual("xtd::Application::argument", Coverxygen.extract_qualified_name(l_nodeEnum, "xtd::Application"))
+    self.assertEqual("", Coverxygen.extract_qualified_name(ET.fromstring("<node/>"), "xtd"))
+    l_node = ET.fromstring("<memberdef><name>f</name><qualifiedname>ns::f</qualifiedname></memberdef>")
+    self.assertEqual("ns::f", Coverxygen.extract_qualified_name(l_node, ""))
+    self.assertEqual("ns", Coverxygen.get_scope_name("namespace", " ns "))
+    self.assertEqual("", Coverxygen.get_scope_name("file", "ns.hh"))
+
   def test_process_symbol(self):
     l_classDoc = ET.parse(self.get_data_path("class.xml"))
     l_scopes   = ["private",  "protected", "public"]
@@ -301,19 +447,19 @@ class CoverxygenTest(unittest.TestCase):
     l_obj    = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt")
     l_data   = l_obj.process_symbol(l_node, "/opt/file.hh")
     l_expect = [{'documented': True, 'line': 102, 'kind': 'enum', 'symbol': 'argument', 'file': os.path.abspath('/opt/src/Application.hh')}]
-    self.assertEqual(l_expect, l_data)
+    self.assertEqual(l_expect, [c_symbol.to_dict() for c_symbol in l_data])
 
     l_node     = l_classDoc.find("./compounddef//memberdef[@id='classxtd_1_1Application_1a907b6fe8247636495890e668530863d6']")
     l_data     = l_obj.process_symbol(l_node, "/opt/file.hh")
     l_expect   = []
-    self.assertEqual(l_expect, l_data)
+    self.assertEqual(l_expect, [c_symbol.to_dict() for c_symbol in l_data])
 
     l_namesapceDoc = ET.parse(self.get_data_path("namespace.xml"))
     l_node         = l_namesapceDoc.find("./compounddef[@id='namespace_my_namespace']")
     l_obj          = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt")
     l_data         = l_obj.process_symbol(l_node, "/opt/file.hh")
     l_expect       = [{'documented': True, 'line': 5, 'kind': 'namespace', 'symbol': 'MyNamespace', 'file': os.path.abspath('/opt/src/MyNamespace.hh')}]
-    self.assertEqual(l_expect, l_data)
+    self.assertEqual(l_expect, [c_symbol.to_dict() for c_symbol in l_data])
 
     l_enumDoc = ET.parse(self.get_data_path("enum.xml"))
     l_node    = l_enumDoc.find("./compounddef//memberdef[@id='class_my_enum_class_1a4bffd5affc2abeba8ed3af3c2fd81ff4']")
@@ -322,9 +468,23 @@ class CoverxygenTest(unittest.TestCase):
     l_expect  = [{'documented': True, 'line': 466, 'kind': 'enum', 'symbol': 'MyEnum', 'file': os.path.abspath('/opt/MyEnumClass.hpp')},
                  {'documented': True, 'line': 466, 'kind': 'enumvalue', 'symbol': 'Enum_Value_1', 'file': os.path.abspath('/opt/MyEnumClass.hpp')},
                  {'documented': False, 'line': 466, 'kind': 'enumvalue', 'symbol': 'Enum_Value_2', 'file': os.path.abspath('/opt/MyEnumClass.hpp')}]
-    self.assertEqual(l_expect, l_data)
+    self.assertEqual(l_expect, [c_symbol.to_dict() for c_symbol in l_data])
 
 
+  def test_symbol(self):
+    l_file   = os.path.abspath("/opt/file.hh")
+    l_symbol = Symbol("name", True, "function", 12, "".join([l_file]))
+    l_dict   = {"symbol": "name", "documented": True, "kind": "function", "line": 12, "file": l_file}
+    self.assertEqual(l_dict, l_symbol.to_dict())
+    self.assertEqual(list(l_dict.keys()), list(l_symbol.to_dict().keys()))
+    self.assertNotEqual(l_symbol, l_dict)
+    self.assertEqual(l_symbol, Coverxygen.symbol_from_row(l_symbol.to_row()))
+    self.assertEqual(12, l_symbol["line"])
+    with self.assertRaises(KeyError):
+      l_symbol["unknown"] # pylint: disable=pointless-statement
+    self.assertIs(l_symbol.m_file, Symbol("other", False, "function", 1, "".join([l_file])).m_file)
+    self.assertEqual(json.dumps([l_dict]), json.dumps([l_symbol], default=Symbol.to_dict))
+
   def test_group_symbols_by_file(self):
     l_syms   = [{ "file" : "a", "key1" : 1 }]
     l_expect = { "a" : [ { "file" : "a", "key1" : 1 } ] }
@@ -500,3 +660,773 @@ class CoverxygenTest(unittest.TestCase):
     self.assertRegex(l_outputResult, r".*Enums\s*:\s+100\.0% \(2/2\).*")
     self.assertRegex(l_outputResult, r".*Enum Values\s*:\s+75\.0% \(3/4\).*")
     self.assertRegex(l_outputResult, r".*Total\s*:\s+83\.3% \(5/6\).*")
+
+  def test_split_in_chunks(self):
+    l_dir   = tempfile.mkdtemp()
+    l_files = []
+    for c_name, c_size in [("a", 10), ("b", 10), ("c", 100), ("d", 10), ("e", 10)]:
+      l_path = os.path.join(l_dir, c_name)
+      with open(l_path, "w") as l_file:
+        l_file.write("x" * c_size)
+      l_files.append(l_path)
+    l_chunks = Coverxygen.split_in_chunks(l_files, 4)
+    self.assertEqual(l_files, [x for c_chunk in l_chunks for x in c_chunk])
+    self.assertIn([l_files[2]], l_chunks)
+    self.assertEqual([l_files], Coverxygen.split_in_chunks(l_files, 1))
+    for c_file in l_files:
+      os.unlink(c_file)
+    os.removedirs(l_dir)
+
+  def test_process_parallel(self):
+    for c_format in ["lcov", "json-v3", "summary"]:
+      l_serial   = self.run_process(c_format)
+      l_parallel = self.run_process(c_format, p_jobs=2)
+      self.assertNotEqual("", l_serial)
+      self.assertEqual(l_serial, l_parallel)
+
+  def test_process_file_streaming(self):
+    l_scopes = ["private", "protected", "public"]
+    l_kinds  = ["enum", "enumvalue", "friend", "typedef", "variable", "function", "class", "namespace"]
+    l_tree   = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt")
+    l_stream = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_options=Options(p_engine="stream", p_xmlBackend="etree"))
+    for c_name in ["class.xml", "enum.xml", "namespace.xml"]:
+      l_path = self.get_data_path(c_name)
+      self.assertEqual(l_tree.process_file(l_path), l_stream.process_file(l_path))
+    with self.assertRaisesRegex(RuntimeError, "invalid.xml : mismatched tag: line 667, column 2"):
+      l_stream.process_file(self.get_data_path("invalid.xml"))
+    self.assertEqual(self.run_process("json-v2"), self.run_process("json-v2", p_engine="stream"))
+
+  def test_process_file_scan(self):
+    l_scopes = ["private", "protected", "public"]
+    l_kinds  = ["enum", "enumvalue", "friend", "typedef", "variable", "function", "class", "struct", "namespace"]
+    l_tree   = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt")
+    l_scan   = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_options=Options(p_engine="scan"))
+    for c_name in ["class.xml", "enum.xml", "namespace.xml"]:
+      l_path = self.get_data_path(c_name)
+      self.assertEqual(l_tree.process_file(l_path), l_scan.process_file(l_path), c_name)
+    self.assertEqual(0, l_scan.m_scanFallbacks)
+    with self.assertRaisesRegex(RuntimeError, "error while parsing xml file .*invalid.xml"):
+      l_scan.process_file(self.get_data_path("invalid.xml"))
+    self.assertEqual(1, l_scan.m_scanFallbacks)
+
+    # constructs left to the tree engine
+    with open(self.get_data_path("class.xml"), "rb") as l_file:
+      l_data = l_file.read()
+    l_path = self.get_data_path("class.xml")
+    for c_data in [l_data.replace(b"<briefdescription>", b"<briefdescription><!-- x -->", 1),
+                   l_data.replace(b"<briefdescription>", b"<briefdescription><![CDATA[ ]]>", 1),
+                   l_data.replace(b"<briefdescription>", b"<briefdescription>&#32;", 1),
+                   l_data.replace(b"<name>", b"<name><ref>x</ref>", 1),
+                   l_data.replace(b"</memberdef>", b"</memberdef><memberdef kind=\"function\" id=\"extra\"/>", 1)]:
+      l_fallbacks = l_scan.m_scanFallbacks
+      self.assertEqual(l_tree.process_file(l_path, io.BytesIO(c_data)), l_scan.process_file(l_path, io.BytesIO(c_data)))
+      self.assertEqual(l_fallbacks + 1, l_scan.m_scanFallbacks)
+    with self.assertRaisesRegex(ValueError, "unexpected memberdef element"):
+      Coverxygen.scan_split(b"<a><memberdef><memberdef></memberdef></memberdef></a>", b"memberdef")
+    l_elements, l_residual = Coverxygen.scan_split(b"<a><b x='1'>c</b><bb/></a>", b"b")
+    self.assertEqual([(b" x='1'", b"c")], l_elements)
+    self.assertEqual(b"<a><bb/></a>", l_residual)
+    l_excluding = Coverxygen(None, None, l_scopes, l_kinds, None, "/opt", "/opt", p_excludesymbols=["x"], p_options=Options(p_engine="scan"))
+    self.assertIsNone(l_excluding.scan_file_symbols(l_path))
+
+  def test_process_scan(self):
+    """
+      Differential test of the scan engine against the tree engine
+    """
+    l_allKinds = ["enum", "enumvalue", "friend", "typedef", "variable", "function", "signal", "slot",
+                  "class", "struct", "union", "define", "file", "namespace", "page"]
+    l_dir = tempfile.mkdtemp()
+    try:
+      CorpusGenerator(p_compounds=12, p_members=20, p_enums=2, p_enumValues=3, p_depth=3, p_docRatio=0.4, p_seed=5).generate(l_dir)
+      for c_root in [self.get_project_path(), self.make_project_copy(), l_dir]:
+        for c_kwds in [{}, {"p_dedup" : "first"}, {"p_prefix" : "/opt/src/ns0"}, {"p_jobs" : 2},
+                       {"p_cacheDir" : os.path.join(l_dir, "cache")}]:
+          for c_kinds in [l_allKinds, ["function", "enumvalue"]]:
+            self.assertEqual(self.run_process("json-v3", c_kinds, c_root, **c_kwds),
+                             self.run_process("json-v3", c_kinds, c_root, p_engine="scan", **c_kwds),
+                             "%s %s %s" % (c_root, c_kwds, c_kinds))
+    finally:
+      shutil.rmtree(l_dir)
+
+  def test_process_cache(self):
+    l_cacheDir = tempfile.mkdtemp()
+    l_expected = self.run_process("json-v2")
+    self.assertEqual(l_expected, self.run_process("json-v2", p_cacheDir=l_cacheDir))
+    self.assertEqual(3, len(os.listdir(l_cacheDir)))
+    self.assertEqual(l_expected, self.run_process("json-v2", p_cacheDir=l_cacheDir, p_jobs=2))
+    self.assertEqual(3, len(os.listdir(l_cacheDir)))
+
+    l_obj = Coverxygen(self.get_project_path(), None, ["public"], ["class"], None, "/opt", p_options=Options(p_cacheDir=l_cacheDir))
+    l_other = Coverxygen(None, None, ["public"], ["function"], None, "/opt")
+    self.assertNotEqual(l_obj.get_config_key(), l_other.get_config_key())
+    l_path = self.get_data_path("namespace.xml")
+    l_obj.process_compound(l_path)
+    l_obj.process_compound(l_path)
+    self.assertEqual((1, 1), (l_obj.m_cache.m_hits, l_obj.m_cache.m_misses))
+
+    l_obj.m_cache.m_maxSize = 0
+    l_obj.m_cache.trim()
+    self.assertEqual([], os.listdir(l_cacheDir))
+    self.assertEqual(4, l_obj.m_cache.m_evicted)
+    shutil.rmtree(l_cacheDir)
+
+  def test_process_excludesymbols(self):
+    l_kinds = ["enum", "enumvalue", "function", "class", "namespace"]
+    for c_engine in ["tree", "stream"]:
+      l_all      = json.loads(self.run_process("json-v2", l_kinds, p_engine=c_engine))
+      l_excluded = json.loads(self.run_process("json-v2", l_kinds, p_engine=c_engine,
+                                               p_excludesymbols=[r".*::argument$", r"MyNamespace::MyEnum$"]))
+      l_symbols  = [x["symbol"] for c_file in l_all.values() for x in c_file]
+      self.assertIn("argument", l_symbols)
+      self.assertEqual(2, l_symbols.count("MyEnum"))
+      l_symbols  = [x["symbol"] for c_file in l_excluded.values() for x in c_file]
+      self.assertNotIn("argument", l_symbols)
+      self.assertEqual(1, l_symbols.count("MyEnum"))
+
+    # file compounds repeat namespace members, they are not a scope of their own
+    l_root    = self.make_project_copy()
+    l_path    = os.path.join(l_root, "_my_namespace_8hh.xml")
+    l_fileDoc = ET.parse(l_path)
+    l_enum    = ET.parse(os.path.join(l_root, "namespace_my_namespace.xml")).find(".//memberdef[@kind='enum']")
+    # doxygen >= 1.9 gives the qualified name of repeated members
+    ET.SubElement(l_enum, "qualifiedname").text = "MyNamespace::MyEnum"
+    l_define  = ET.fromstring("""<memberdef kind="define" id="_my_namespace_8hh_1define" prot="public" static="no">
+      <name>MY_MACRO</name><briefdescription/><location file="src/MyNamespace.hh" line="3"/></memberdef>""")
+    l_fileDoc.find(".//sectiondef").extend([l_enum, l_define])
+    l_fileDoc.write(l_path)
+    for c_engine in ["tree", "stream"]:
+      l_all      = json.loads(self.run_process("json-v2", l_kinds + ["define"], l_root, p_engine=c_engine))
+      l_excluded = json.loads(self.run_process("json-v2", l_kinds + ["define"], l_root, p_engine=c_engine,
+                                               p_excludesymbols=[r"MyNamespace::MyEnum$", r"MY_MACRO$"]))
+      l_symbols  = [x["symbol"] for c_file in l_all.values() for x in c_file]
+      self.assertEqual(3, l_symbols.count("MyEnum"))
+      self.assertIn("MY_MACRO", l_symbols)
+      l_symbols  = [x["symbol"] for c_file in l_excluded.values() for x in c_file]
+      self.assertEqual(1, l_symbols.count("MyEnum"))
+      self.assertNotIn("MY_MACRO", l_symbols)
+
+  def test_symbol_aggregate(self):
+    l_symbols = [Symbol("a", True,  "enum",      10, "/f1"),
+                 Symbol("b", False, "enumvalue", 10, "/f1"),
+                 Symbol("c", True,  "function",  20, "/f2")]
+    l_aggregate = SymbolAggregate(p_keepSymbols=False, p_keepLines=False)
+    for c_symbol in l_symbols:
+      l_aggregate.add(c_symbol)
+    self.assertEqual(Coverxygen.create_summary(l_symbols), l_aggregate.get_summary())
+    self.assertIsNone(l_aggregate.m_files)
+    self.assertIsNone(l_aggregate.m_lines)
+    l_aggregate = SymbolAggregate()
+    for c_symbol in l_symbols:
+      l_aggregate.add(c_symbol)
+    self.assertEqual(Coverxygen.group_symbols_by_file(l_symbols), l_aggregate.m_files)
+    self.assertEqual({"/f1": {10: 0}, "/f2": {20: 1}}, l_aggregate.m_lines)
+
+  def test_process_gzip_output(self):
+    l_expected = self.run_process("lcov")
+    l_dir      = tempfile.mkdtemp()
+    l_output   = os.path.join(l_dir, "output.info.gz")
+    l_obj      = Coverxygen(self.get_project_path(), l_output, ["public", "protected", "private"],
+                            ["function", "class", "namespace", "variable", "typedef", "friend"], "lcov", "/opt")
+    l_obj.process()
+    with gzip.open(l_output, "rt") as l_file:
+      self.assertEqual(l_expected, l_file.read())
+    shutil.rmtree(l_dir)
+    with self.assertRaisesRegex(RuntimeError, "invalid requested output format 'unknown'"):
+      Coverxygen(self.get_project_path(), "-", [], [], "unknown", "/opt").process()
+
+  def test_process_dedup(self):
+    l_root = self.make_project_copy()
+    def get_lines(p_dedup, p_jobs=1):
+      l_data = json.loads(self.run_process("json-v2", ["function"], l_root, p_dedup=p_dedup, p_jobs=p_jobs))
+      return [x["line"] for x in l_data[os.path.abspath("/opt/src/MyNamespace.hh")]]
+    self.assertEqual([20, 99], get_lines("none"))
+    self.assertEqual([20], get_lines("first"))
+    self.assertEqual([99], get_lines("last"))
+    self.assertEqual([99], get_lines("last", 2))
+    with self.assertRaisesRegex(RuntimeError, "invalid requested deduplication policy 'other'"):
+      get_lines("other")
+
+  def test_process_baseline_diff(self):
+    l_dir      = tempfile.mkdtemp()
+    l_baseline = os.path.join(l_dir, "baseline.json")
+    with open(l_baseline, "w") as l_file:
+      l_file.write(self.run_process("json-v3", ["function", "class"]))
+    l_diff = json.loads(self.run_process("json-diff", ["function", "class"], p_baseline=l_baseline))
+    self.assertEqual({"undocumented": [], "documented": [], "appeared": [], "disappeared": []}, l_diff["changes"])
+    self.assertEqual(l_diff["baseline"], l_diff["current"])
+    self.assertEqual({"documented_symbol_count": 0, "symbol_count": 0, "coverage_rate": 0}, l_diff["delta"]["total"])
+
+    l_root = self.make_project_copy()
+    l_path = os.path.join(l_root, "classxtd_1_1Application.xml")
+    l_doc  = ET.parse(l_path)
+    for c_member in l_doc.iter("memberdef"):
+      if c_member.findtext("name") == "execute":
+        c_member.find("briefdescription").clear()
+        c_member.find("detaileddescription").clear()
+    l_doc.write(l_path)
+    l_diff = json.loads(self.run_process("json-diff", ["function", "class"], l_root, p_baseline=l_baseline))
+    l_file = os.path.abspath("/opt/src/MyNamespace.hh")
+    # symbols without location are reported at their compound file path, which moved with the copy
+    for c_kind, c_symbols in l_diff["changes"].items():
+      l_diff["changes"][c_kind] = [x for x in c_symbols if x["file"].startswith("/opt")]
+    self.assertEqual([], l_diff["changes"]["documented"])
+    self.assertEqual([], l_diff["changes"]["disappeared"])
+    self.assertEqual([("int xtd::Application::execute", False)], [(x["symbol"], x["documented"]) for x in l_diff["changes"]["undocumented"]])
+    self.assertEqual([(l_file, 99)], [(x["file"], x["line"]) for x in l_diff["changes"]["appeared"]])
+    self.assertEqual({"documented_symbol_count": 0, "symbol_count": 1}, {c_key: l_diff["delta"]["kinds"]["function"][c_key]
+                                                                        for c_key in ["documented_symbol_count", "symbol_count"]})
+
+    l_diff = json.loads(self.run_process("json-diff", ["class"], p_baseline=l_baseline))
+    self.assertEqual([], l_diff["changes"]["appeared"])
+    self.assertEqual(["function"], sorted(set(x["kind"] for x in l_diff["changes"]["disappeared"])))
+    self.assertEqual(-l_diff["baseline"]["kinds"]["function"]["symbol_count"], l_diff["delta"]["kinds"]["function"]["symbol_count"])
+    with self.assertRaisesRegex(RuntimeError, "output format 'json-diff' requires a baseline report"):
+      self.run_process("json-diff")
+    with self.assertRaisesRegex(RuntimeError, "baseline report is only used by json-diff output format"):
+      self.run_process("json-v3", p_baseline=l_baseline)
+    with open(l_baseline, "w") as l_file:
+      l_file.write("[1, 2]")
+    with self.assertRaisesRegex(RuntimeError, "invalid baseline report"):
+      self.run_process("json-diff", p_baseline=l_baseline)
+    shutil.rmtree(l_dir)
+
+  def test_process_changed_files(self):
+    l_dir   = tempfile.mkdtemp()
+    l_index = os.path.join(l_dir, "index.sqlite")
+    l_file  = os.path.abspath("/opt/src/Application.hh")
+    l_all   = json.loads(self.run_process("json-v2"))
+    for c_jobs in [1, 2]:
+      l_changed = json.loads(self.run_process("json-v2", p_changedFiles=["src/Application.hh", "/opt/other.cc"],
+                                              p_reverseIndex=l_index, p_jobs=c_jobs))
+      self.assertEqual({l_file: l_all[l_file]}, l_changed)
+    self.assertEqual({}, json.loads(self.run_process("json-v2", p_changedFiles=[], p_reverseIndex=l_index)))
+
+    l_root    = self.make_project_copy()
+    l_refids  = sorted(os.path.splitext(c_name)[0] for c_name in os.listdir(l_root) if c_name != "index.xml")
+    l_reverse = ReverseIndex(l_index, "/opt")
+    l_reverse.update(XmlDirectory(l_root), l_refids)
+    # copied files keep their modification time, only the new compound is read
+    self.assertEqual(1, l_reverse.m_updated)
+    l_reverse.update(XmlDirectory(l_root), l_refids)
+    self.assertEqual(1, l_reverse.m_updated)
+    self.assertEqual({"_my_namespace_8hh", "namespace_my_namespace"}, l_reverse.select([os.path.abspath("/opt/src/MyNamespace.hh")]))
+    self.assertEqual({"classxtd_1_1Application"}, l_reverse.select([l_file, "/opt/src/Application.cc"]))
+    l_reverse.update(XmlDirectory(l_root), [c_refid for c_refid in l_refids if c_refid != "_my_namespace_8hh"])
+    self.assertEqual(1, l_reverse.m_removed)
+    self.assertEqual({"namespace_my_namespace"}, l_reverse.select([os.path.abspath("/opt/src/MyNamespace.hh")]))
+    l_reverse.close()
+    l_reverse = ReverseIndex(l_index, "/other")
+    self.assertEqual(set(), l_reverse.select([os.path.abspath("/opt/src/MyNamespace.hh")]))
+    l_reverse.close()
+
+    # missing compound files are reported together instead of by the reverse index update
+    os.unlink(os.path.join(l_root, "_my_namespace_8hh.xml"))
+    os.unlink(os.path.join(l_root, "class_my_enum_class.xml"))
+    with self.assertRaisesRegex(RuntimeError, "could not find 2 indexed files in %s : _my_namespace_8hh.xml, class_my_enum_class.xml$" % l_root):
+      self.run_process("json-v2", p_root=l_root, p_changedFiles=["src/Application.hh"], p_reverseIndex=os.path.join(l_dir, "copy.sqlite"))
+
+    l_list = os.path.join(l_dir, "changed.txt")
+    with open(l_list, "w") as l_stream:
+      l_stream.write("src/a.hh\n\n  src/b.hh \n")
+    self.assertEqual(["src/a.hh", "src/b.hh"], Coverxygen.read_file_list(l_list))
+    l_obj = Coverxygen(l_root, None, [], [], None, "/opt")
+    self.assertEqual(os.path.normpath(l_root) + ".coverxygen.sqlite", l_obj.get_reverse_index_path())
+    with self.assertRaisesRegex(RuntimeError, "a reverse index path is required"):
+      Coverxygen("-", None, [], [], None, "/opt").get_reverse_index_path()
+    shutil.rmtree(l_dir)
+
+  def test_process_watch(self):
+    l_root   = self.make_project_copy()
+    l_output = os.path.join(os.path.dirname(l_root), "output")
+    l_kinds  = ["function", "class", "namespace", "variable", "typedef", "friend"]
+    def touch(p_path):
+      l_stat = os.stat(p_path)
+      os.utime(p_path, ns=(l_stat.st_atime_ns, l_stat.st_mtime_ns + 10 ** 9))
+    def check(p_session, p_format):
+      p_session.output()
+      with open(l_output) as l_file:
+        self.assertEqual(self.run_process(p_format, p_root=l_root), l_file.read())
+    l_sessions = {}
+    for c_format in ["json-v2", "summary", "lcov"]:
+      l_obj = Coverxygen(l_root, l_output, ["private", "protected", "public"], l_kinds, c_format, "/opt")
+      l_sessions[c_format] = WatchSession(l_obj)
+      self.assertEqual(4, l_sessions[c_format].refresh())
+      check(l_sessions[c_format], c_format)
+      self.assertEqual(0, l_sessions[c_format].refresh())
+
+    l_path = os.path.join(l_root, "classxtd_1_1Application.xml")
+    l_doc  = ET.parse(l_path)
+    for c_member in l_doc.iter("memberdef"):
+      if c_member.findtext("name") in ["execute", "process"]:
+        c_member.find("briefdescription").clear()
+        c_member.find("detaileddescription").clear()
+    l_doc.write(l_path)
+    touch(l_path)
+    for c_format, c_session in l_sessions.items():
+      self.assertEqual(1, c_session.refresh())
+      check(c_session, c_format)
+
+    l_indexPath = os.path.join(l_root, "index.xml")
+    l_index = ET.parse(l_indexPath)
+    l_index.getroot().remove(l_index.getroot().find("compound[@refid='_my_namespace_8hh']"))
+    l_index.write(l_indexPath)
+    touch(l_indexPath)
+    for c_format, c_session in l_sessions.items():
+      self.assertEqual(1, c_session.refresh())
+      check(c_session, c_format)
+
+    with open(l_path, "rb") as l_file:
+      l_data = l_file.read()
+    with open(l_path, "wb") as l_file:
+      l_file.write(l_data[:100])
+    l_session = l_sessions["summary"]
+    with self.assertRaisesRegex(RuntimeError, "classxtd_1_1Application.xml"):
+      l_session.refresh()
+    with open(l_path, "wb") as l_file:
+      l_file.write(l_data)
+    self.assertEqual(1, l_session.refresh())
+    check(l_session, "summary")
+
+    l_stream = StringIO()
+    with redirect_stderr(l_stream):
+      l_session.m_obj.watch(p_interval=0, p_cycles=2)
+    self.assertRegex(l_stream.getvalue(), r"^3 compound files updated in [0-9.]+s, coverage [0-9.]+% \(\d+/\d+\)\n$")
+    with self.assertRaisesRegex(RuntimeError, "watch mode requires an xml directory"):
+      Coverxygen(l_indexPath, l_output, [], [], "summary", "/opt").watch()
+
+  def test_process_multiple_outputs(self):
+    l_dir      = tempfile.mkdtemp()
+    l_baseline = os.path.join(l_dir, "baseline.json")
+    with open(l_baseline, "w") as l_file:
+      l_file.write(self.run_process("json-v3", ["class"]))
+    l_formats = ["json-v3", "lcov", "markdown-summary", "json-v1", "json-diff"]
+    l_outputs = [(c_format, os.path.join(l_dir, c_format)) for c_format in l_formats]
+    for c_jobs in [1, 2]:
+      l_obj = Coverxygen(self.get_project_path(), None, ["private", "protected", "public"],
+                         ["function", "class", "namespace", "variable", "typedef", "friend"], None, "/opt",
+                         p_options=Options(p_jobs=c_jobs, p_baseline=l_baseline, p_outputs=l_outputs))
+      l_obj.process()
+      for c_format, c_output in l_outputs:
+        l_kwds = {"p_baseline" : l_baseline} if c_format == "json-diff" else {}
+        with open(c_output) as l_file:
+          self.assertEqual(self.run_process(c_format, **l_kwds), l_file.read(), c_format)
+    l_obj = Coverxygen(self.get_project_path(), None, [], [], None, "/opt",
+                       p_options=Options(p_outputs=[("lcov", "-"), ("summary", "-")]))
+    with self.assertRaisesRegex(RuntimeError, "output - is requested by several formats"):
+      l_obj.process()
+    shutil.rmtree(l_dir)
+
+  def test_process_multiple_roots(self):
+    l_project = self.get_project_path()
+    l_scopes  = ["private", "protected", "public"]
+    l_kinds   = ["function", "class", "namespace", "variable", "typedef", "friend"]
+    def run(p_format, p_roots, **p_kwds):
+      l_dir    = tempfile.mkdtemp()
+      l_output = os.path.join(l_dir, "output")
+      try:
+        self.create(None, l_output, l_scopes, l_kinds, p_format, None, p_roots=p_roots, **p_kwds).process()
+        with open(l_output) as l_file:
+          return l_file.read()
+      finally:
+        shutil.rmtree(l_dir)
+    for c_jobs in [1, 2]:
+      self.assertEqual(self.run_process("json-v3"), run("json-v3", [(l_project, "/opt"), (l_project, "/opt")], p_jobs=c_jobs))
+      l_merged = json.loads(run("json-v2", [(l_project, "/opt"), (l_project, "/other")], p_jobs=c_jobs))
+      # symbols without location are reported at the compound file path, shared by both roots
+      self.assertEqual(json.loads(self.run_process("json-v2")), {c_file : c_symbols for c_file, c_symbols in l_merged.items()
+                                                                 if not c_file.startswith("/other")})
+      self.assertEqual(json.loads(run("json-v2", [(l_project, "/other")])), {c_file : c_symbols for c_file, c_symbols in l_merged.items()
+                                                                             if not c_file.startswith("/opt")})
+
+    # compound files of every root are chunked together and sent to a single pool
+    l_chunks = []
+    l_split  = Coverxygen.split_in_chunks
+    def split_in_chunks(p_files, p_chunkCount, p_sizes=None):
+      l_result = l_split(p_files, p_chunkCount, p_sizes)
+      l_chunks.extend(l_result)
+      return l_result
+    with mock.patch.object(Coverxygen, "split_in_chunks", side_effect=split_in_chunks), \
+         mock.patch("multiprocessing.Pool", wraps=multiprocessing.Pool) as l_pool:
+      self.assertEqual(run("json-v2", [(l_project, "/opt"), (l_project, "/other")]),
+                       run("json-v2", [(l_project, "/opt"), (l_project, "/other")], p_jobs=2))
+      self.assertEqual(1, l_pool.call_count)
+      self.assertEqual(2, l_pool.call_args[0][0])
+    for c_index in [0, 1]:
+      self.assertLess(1, len([c_chunk for c_chunk in l_chunks if any(c_item[0] == c_index for c_item in c_chunk)]))
+
+    l_single  = json.loads(self.run_process("json-summary"))
+    l_summary = json.loads(run("json-summary", [(l_project, "/opt"), (l_project, "/opt")], p_perRoot=True))
+    self.assertEqual([l_single, l_single], [l_summary["roots"][l_project]] * 2)
+    self.assertEqual(l_single["total"], l_summary["total"])
+    l_summary = json.loads(run("json-summary", [(l_project, "/opt"), (self.make_project_copy(), "/other")], p_perRoot=True))
+    self.assertEqual(2, len(l_summary["roots"]))
+    self.assertEqual(sum(c_root["total"]["symbol_count"] for c_root in l_summary["roots"].values()), l_summary["total"]["symbol_count"])
+    self.assertIn("\n%s :\n" % l_project, run("summary", [(l_project, "/opt"), (l_project, "/other")], p_perRoot=True))
+    self.assertNotIn(l_project, run("summary", [(l_project, "/opt"), (l_project, "/other")]))
+    with self.assertRaisesRegex(RuntimeError, "a reverse index path can not be shared by several xml roots"):
+      run("summary", [(l_project, "/opt"), (l_project, "/other")], p_changedFiles=[], p_reverseIndex="index.sqlite")
+
+    # worker processes can not read standard input, it is read by the parent process
+    l_dir = tempfile.mkdtemp()
+    with open(self.make_archives(l_dir)["tgz"], "rb") as l_file:
+      l_data = l_file.read()
+    l_results = []
+    for c_jobs in [1, 2]:
+      with mock.patch("sys.stdin", io.TextIOWrapper(io.BytesIO(l_data))):
+        l_results.append(run("json-v2", [("-", "/opt"), (l_project, "/other")], p_jobs=c_jobs))
+    self.assertEqual(l_results[0], l_results[1])
+    l_opt = lambda p_data: {c_file : c_symbols for c_file, c_symbols in json.loads(p_data).items() if c_file.startswith("/opt")}
+    self.assertEqual(l_opt(self.run_process("json-v2")), l_opt(l_results[1]))
+    shutil.rmtree(l_dir)
+
+  def test_process_shards(self):
+    l_root = self.make_project_copy()
+    l_dir  = tempfile.mkdtemp()
+    l_obj  = Coverxygen(l_root, None, [], [], "partial", "/opt", p_options=Options(p_shard=(1, 1)))
+    l_items = [(os.path.join(l_root, c_file), None) for c_file in sorted(os.listdir(l_root))]
+    l_shards = []
+    for c_index in range(1, 4):
+      l_obj.m_shard = (c_index, 3)
+      l_shards.append(l_obj.select_shard(l_items))
+    self.assertEqual(sorted(l_items), sorted(sum(l_shards, [])))
+    self.assertEqual(len(l_items), len(set(c_item[0] for c_shard in l_shards for c_item in c_shard)))
+
+    def normalize(p_format, p_data):
+      if p_format == "json-v2":
+        return {c_file : sorted(c_symbols, key=repr) for c_file, c_symbols in json.loads(p_data).items()}
+      return p_data
+
+    def merge(p_paths, p_format):
+      l_output = os.path.join(l_dir, "merged")
+      Coverxygen(None, l_output, [], [], p_format, None).merge(p_paths)
+      with open(l_output) as l_file:
+        return l_file.read()
+
+    for c_count in [1, 2, 3]:
+      l_paths = []
+      for c_index in range(1, c_count + 1):
+        l_paths.append(os.path.join(l_dir, "part%d.gz" % c_index))
+        Coverxygen(l_root, l_paths[-1], ["private", "protected", "public"],
+                   ["function", "class", "namespace", "variable", "typedef", "friend"],
+                   "partial", "/opt", p_options=Options(p_dedup="none", p_shard=(c_index, c_count))).process()
+      for c_format in ["summary", "json-v2"]:
+        l_expected = normalize(c_format, self.run_process(c_format, p_root=l_root, p_dedup="none"))
+        self.assertEqual(l_expected, normalize(c_format, merge(l_paths, c_format)), (c_count, c_format))
+        self.assertEqual(l_expected, normalize(c_format, merge(l_paths + l_paths[:1], c_format)))
+
+    with self.assertRaisesRegex(RuntimeError, "missing partial results of shards 2 out of 3"):
+      merge([l_paths[0], l_paths[2]], "summary")
+    with self.assertRaisesRegex(RuntimeError, "invalid partial result .*index.xml at line 1"):
+      merge([os.path.join(l_root, "index.xml")], "summary")
+    l_other = os.path.join(l_dir, "other.gz")
+    Coverxygen(l_root, l_other, ["private", "protected", "public"],
+               ["function", "class", "namespace", "variable", "typedef", "friend"],
+               "partial", "/usr", p_options=Options(p_dedup="none", p_shard=(2, 2))).process()
+    with self.assertRaisesRegex(RuntimeError, "partial results were produced with different settings"):
+      merge([os.path.join(l_dir, "part1.gz"), l_other], "summary")
+    l_header = {"format" : "coverxygen-partial", "version" : Coverxygen.PARTIAL_VERSION, "config" : "x"}
+    for c_shard in [None, [1], [3, 2], [0, 2], [True, 1], "1/1"]:
+      l_broken = dict(l_header)
+      if c_shard is not None:
+        l_broken["shard"] = c_shard
+      with open(os.path.join(l_dir, "broken"), "w") as l_file:
+        l_file.write(json.dumps(l_broken) + "\n")
+      with self.assertRaisesRegex(RuntimeError, "invalid shard in partial result .*broken"):
+        merge([os.path.join(l_dir, "broken")], "summary")
+    with open(os.path.join(l_dir, "broken"), "w") as l_file:
+      l_file.write(json.dumps({"format" : "coverxygen-partial", "version" : Coverxygen.PARTIAL_VERSION, "shard" : [1, 1]}) + "\n")
+    with self.assertRaisesRegex(RuntimeError, "invalid settings in partial result .*broken"):
+      merge([os.path.join(l_dir, "broken")], "summary")
+    l_obj = Coverxygen(l_root, None, [], [], None, "/opt", p_options=Options(p_outputs=[("partial", l_paths[0]), ("lcov", "-")]))
+    with self.assertRaisesRegex(RuntimeError, "partial format can not be combined with other formats"):
+      l_obj.process()
+    shutil.rmtree(l_dir)
+
+  def test_json_writer(self):
+    for c_orjson in set([coverxygen.jsonwriter.orjson, None]):
+      with mock.patch.object(coverxygen.jsonwriter, "orjson", c_orjson):
+        for c_format in ["json-v3", "json-v2", "json-v1", "json-summary"]:
+          l_output  = self.run_process(c_format)
+          l_compact = self.run_process(c_format, p_compact=True)
+          self.assertEqual(json.dumps(json.loads(l_output), indent=2), l_output)
+          self.assertEqual(json.loads(l_output), json.loads(l_compact))
+          self.assertNotIn("\n", l_compact)
+        l_value = {"a\nb" : [], "k" : {"x" : ["\u00e9\n", 1.5, None, True]}, "e" : {}}
+        for c_compact in [False, True]:
+          l_stream = StringIO()
+          l_writer = JsonWriter(l_stream, c_compact)
+          l_writer.open("{")
+          l_writer.open("[", "a\nb")
+          l_writer.close()
+          l_writer.write(l_value["k"], "k")
+          l_writer.open("{", "e")
+          l_writer.close()
+          l_writer.close()
+          self.assertEqual(l_value, json.loads(l_stream.getvalue()))
+          if c_orjson is None:
+            self.assertEqual(json.dumps(l_value, indent=None if c_compact else 2,
+                                        separators=(",", ":") if c_compact else None), l_stream.getvalue())
+
+  def test_xml_listing(self):
+    l_root = self.make_project_copy()
+    with mock.patch("os.scandir", wraps=os.scandir) as l_scandir:
+      self.assertEqual(self.run_process("summary", p_root=l_root),
+                       self.run_process("summary", p_roots=[(l_root, "/opt"), (l_root, "/opt")]))
+      # a single listing per run, shared by both roots
+      self.assertEqual(2, [c_call.args[0] for c_call in l_scandir.call_args_list].count(l_root))
+    l_source = XmlDirectory(l_root)
+    self.assertIn("index.xml", l_source.get_listing())
+    self.assertIs(l_source.get_listing(), l_source.get_listing())
+    self.assertEqual(os.path.join(l_root, "_my_namespace_8hh.xml"), l_source.get_file_path("_my_namespace_8hh"))
+    self.assertEqual(os.path.getsize(os.path.join(l_root, "index.xml")), l_source.get_listing()["index.xml"])
+    # shard planning reads the sizes recorded by the listing
+    with mock.patch("os.path.getsize", wraps=os.path.getsize) as l_getsize:
+      self.run_process("summary", p_root=l_root, p_shard=(1, 2))
+      self.assertEqual(0, l_getsize.call_count)
+
+    with open(os.path.join(l_root, "stale.xml"), "w") as l_file:
+      l_file.write("<doxygen/>")
+    l_stderr = StringIO()
+    with redirect_stderr(l_stderr):
+      self.run_process("summary", p_root=l_root, p_verbose=True)
+    self.assertIn("1 xml files of %s are not referenced by index.xml : stale.xml" % l_root, l_stderr.getvalue())
+
+    os.unlink(os.path.join(l_root, "_my_namespace_8hh.xml"))
+    os.unlink(os.path.join(l_root, "namespace_my_namespace.xml"))
+    with self.assertRaisesRegex(RuntimeError, "could not find 2 indexed files in %s : _my_namespace_8hh.xml, namespace_my_namespace.xml\n"
+                                "1 xml files of %s are not referenced by index.xml : stale.xml" % (l_root, l_root)):
+      self.run_process("summary", p_root=l_root)
+    self.assertEqual("a, b, ... (2 more)", Coverxygen.format_names(["d", "b", "a", "c"], 2))
+
+  def test_report(self):
+    l_obj = Coverxygen(self.get_project_path(), None, ["private", "protected", "public"],
+                       ["function", "class", "namespace", "variable", "typedef", "friend"], None, "/opt")
+    l_report = l_obj.report()
+    self.assertIsNone(l_report.m_aggregate)
+    self.assertEqual(json.loads(self.run_process("json-summary")), l_report.get_summary())
+    l_byFile = json.loads(self.run_process("json-v2"))
+    self.assertEqual(l_byFile, {c_file : [c_symbol.to_dict() for c_symbol in c_symbols]
+                                for c_file, c_symbols in l_report.get_symbols_by_file().items()})
+    l_byKind = l_report.get_symbols_by_kind()
+    self.assertIs(l_byKind, l_report.get_symbols_by_kind())
+    self.assertEqual(sorted(l_report, key=repr), sorted(sum(l_byKind.values(), []), key=repr))
+    for c_kind, c_symbols in l_byKind.items():
+      self.assertEqual(l_report.get_summary()["kinds"][c_kind]["symbol_count"], len(c_symbols))
+
+    l_report = l_obj.report(p_keepSymbols=False)
+    self.assertEqual(json.loads(self.run_process("json-summary")), l_report.get_summary())
+    with self.assertRaisesRegex(RuntimeError, "symbol records are not kept by this report"):
+      l_report.get_symbols_by_file()
+
+    with mock.patch.object(l_obj, "process_compound", wraps=l_obj.process_compound) as l_process, \
+         mock.patch.object(l_obj, "get_xmldoc_from_file", wraps=l_obj.get_xmldoc_from_file) as l_parse:
+      l_symbols = l_obj.iter_symbols()
+      self.assertEqual(0, l_parse.call_count)
+      self.assertEqual(0, l_process.call_count)
+      l_symbol = next(l_symbols)
+      l_symbols.close()
+      self.assertEqual("index.xml", os.path.basename(l_parse.call_args_list[0][0][0]))
+      self.assertEqual(1, l_process.call_count)
+    self.assertIsInstance(l_symbol, Symbol)
+
+  def test_can_yield_symbols(self):
+    l_obj = Coverxygen(None, None, ["public"], ["function"], None, "/opt")
+    self.assertTrue(l_obj.can_yield_symbols(("c1", "class", [("m1", "variable"), ("m2", "function")])))
+    self.assertFalse(l_obj.can_yield_symbols(("c2", "class", [("m1", "variable")])))
+    self.assertFalse(l_obj.can_yield_symbols(("p1", "page", [])))
+    self.assertTrue(l_obj.can_yield_symbols(("c3", "class", [("m1", "friend")])))
+    l_obj = Coverxygen(None, None, ["public"], ["page", "enumvalue"], None, "/opt")
+    self.assertTrue(l_obj.can_yield_symbols(("p1", "page", [])))
+    self.assertFalse(l_obj.can_yield_symbols(("c1", "class", [("m1", "enum"), ("m2", "enumvalue")])))
+
+  def test_process_skip_compounds(self):
+    l_root = self.make_project_copy()
+    os.unlink(os.path.join(l_root, "class_my_enum_class.xml"))
+    l_obj = Coverxygen(l_root, os.devnull, ["public", "protected", "private"], ["function"], "summary", "/opt")
+    l_obj.process()
+    self.assertEqual(1, l_obj.m_skipped)
+    l_obj = Coverxygen(l_root, os.devnull, ["public", "protected", "private"], ["enum"], "summary", "/opt")
+    with self.assertRaisesRegex(RuntimeError, "class_my_enum_class.xml"):
+      l_obj.process()
+
+  def test_is_out_of_scope(self):
+    l_path = self.get_data_path("class.xml")
+    l_obj  = Coverxygen(None, None, [], [], None, "/opt", "/opt/src")
+    self.assertFalse(l_obj.is_out_of_scope(l_path))
+    l_obj  = Coverxygen(None, None, [], [], None, "/opt", "/other")
+    self.assertTrue(l_obj.is_out_of_scope(l_path))
+    self.assertEqual(1, l_obj.m_outOfScope)
+    l_obj  = Coverxygen(None, None, [], [], None, "/opt", "/other", p_includes=[".*/Application.hh"])
+    self.assertFalse(l_obj.is_out_of_scope(l_path))
+    l_obj  = Coverxygen(None, None, [], [], None, "/opt", p_excludes=[".*/src/.*"])
+    self.assertTrue(l_obj.is_out_of_scope(l_path))
+    self.assertFalse(l_obj.is_out_of_scope("invalid_path"))
+    l_data = b"""<doxygen><compounddef id="c"><memberdef id="m"/><location file="src/a.hh"/></compounddef></doxygen>"""
+    self.assertFalse(l_obj.is_out_of_scope("file.xml", l_data))
+    l_data = b"""<doxygen><compounddef id="c"><location file="src/a.hh"/></compounddef></doxygen>"""
+    self.assertTrue(l_obj.is_out_of_scope("file.xml", l_data))
+    self.assertFalse(l_obj.is_out_of_scope("file.xml", b"<!-- -->" + l_data))
+    # references are decoded as the parser does, and as the reverse index does
+    l_data = b"""<doxygen><compounddef id="c"><location file="src&#47;a.hh"/></compounddef></doxygen>"""
+    self.assertTrue(l_obj.is_out_of_scope("file.xml", l_data))
+    l_data = b"""<doxygen><compounddef id="c"><location file="src&#x2f;a&amp;b.hh"/></compounddef></doxygen>"""
+    self.assertEqual("src/a&b.hh", ET.fromstring(l_data).find(".//location").get("file"))
+    self.assertEqual({"/opt/src/a&b.hh"}, ReverseIndex.get_sources(mock.Mock(m_rootDir="/opt"), l_data))
+    l_obj  = Coverxygen(None, None, [], [], None, "/opt", p_excludes=[".*/a&b.hh"])
+    self.assertTrue(l_obj.is_out_of_scope("file.xml", l_data))
+    l_data = b"""<doxygen><compounddef id="c"><location file="src&#99999999;a.hh"/></compounddef></doxygen>"""
+    self.assertFalse(l_obj.is_out_of_scope("file.xml", l_data))
+    self.assertEqual(set(), ReverseIndex.get_sources(mock.Mock(m_rootDir="/opt"), l_data))
+
+  def test_process_out_of_scope(self):
+    l_obj = Coverxygen(self.get_project_path(), os.devnull, ["public", "protected", "private"],
+                       ["function", "class"], "summary", "/opt", "/opt/src/Application.hh")
+    l_obj.process()
+    # MyEnumClass compounddef has no location and is therefore parsed
+    self.assertEqual(1, l_obj.m_outOfScope)
+    l_expected = self.run_process("json-v2", p_prefix="/opt/src/Application.hh")
+    self.assertIn("Application.hh", l_expected)
+    self.assertNotIn("MyNamespace", l_expected)
+    self.assertEqual(l_expected, self.run_process("json-v2", p_prefix="/opt/src/Application.hh", p_jobs=2))
+
+  def test_get_xml_backend(self):
+    self.assertEqual("etree", Coverxygen.get_xml_backend("etree"))
+    self.assertEqual("lxml" if coverxygen.LET is not None else "etree", Coverxygen.get_xml_backend("auto"))
+    with self.assertRaisesRegex(RuntimeError, "invalid requested xml backend 'other'"):
+      Coverxygen.get_xml_backend("other")
+
+  @unittest.skipIf(coverxygen.LET is None, "lxml is not installed")
+  def test_process_lxml(self):
+    l_kinds = ["enum", "enumvalue", "function", "class", "namespace", "variable", "typedef", "friend"]
+    for c_engine in ["tree", "stream"]:
+      l_expected = self.run_process("json-v3", l_kinds, p_engine=c_engine, p_xmlBackend="etree")
+      self.assertEqual(l_expected, self.run_process("json-v3", l_kinds, p_engine=c_engine, p_xmlBackend="lxml"))
+    with self.assertRaisesRegex(RuntimeError, "invalid.xml"):
+      Coverxygen.get_xmldoc_from_file(self.get_data_path("invalid.xml"), None, "lxml")
+
+  def test_process_profile(self):
+    l_kinds    = ["enum", "enumvalue", "function", "class", "namespace", "variable", "typedef", "friend"]
+    l_expected = self.run_process("json-v3", l_kinds)
+    l_dir      = tempfile.mkdtemp()
+    try:
+      for c_jobs in [1, 2]:
+        for c_engine in ["tree", "stream"]:
+          l_output = os.path.join(l_dir, "output")
+          l_obj    = Coverxygen(self.get_project_path(), l_output, ["private", "protected", "public"],
+                                l_kinds, "json-v3", "/opt",
+                                p_options=Options(p_jobs=c_jobs, p_engine=c_engine, p_profile=True, p_profileTop=2))
+          l_obj.process()
+          with open(l_output) as l_file:
+            self.assertEqual(l_expected, l_file.read())
+          l_report = l_obj.m_profiler.get_report()
+          self.assertEqual(json.loads(l_expected)["total"]["symbol_count"], l_report["symbols"])
+          self.assertEqual(3, l_report["parsed_files"])
+          self.assertEqual(2, len(l_report["slowest_files"]))
+          self.assertGreaterEqual(l_report["slowest_files"][0]["seconds"], l_report["slowest_files"][1]["seconds"])
+          self.assertEqual(sorted(coverxygen.PhaseProfiler.PHASES), sorted(l_report["phases"]))
+          self.assertTrue(all(c_value >= 0 for c_value in l_report["phases"].values()))
+          l_stream = StringIO()
+          l_obj.m_profiler.print_report(l_stream)
+          self.assertIn("slowest compound files", l_stream.getvalue())
+          l_obj.m_profiler.write_json(os.path.join(l_dir, "profile.json"))
+          with open(os.path.join(l_dir, "profile.json")) as l_file:
+            self.assertEqual(l_report["symbols"], json.load(l_file)["symbols"])
+    finally:
+      shutil.rmtree(l_dir)
+    self.assertIsNone(Coverxygen("", "", [], [], "json-v3", "/").m_profiler)
+
+  def make_archives(self, p_dir):
+    l_project = self.get_project_path()
+    l_names   = sorted(os.listdir(l_project))
+    l_paths   = {}
+    l_paths["tgz"] = os.path.join(p_dir, "xml.tar.gz")
+    with tarfile.open(l_paths["tgz"], "w:gz") as l_tar:
+      l_tar.add(l_project, "doc/xml")
+    l_paths["zip"] = os.path.join(p_dir, "xml.zip")
+    with zipfile.ZipFile(l_paths["zip"], "w") as l_zip:
+      for c_name in l_names:
+        l_zip.write(os.path.join(l_project, c_name), c_name)
+    l_paths["gz"] = os.path.join(p_dir, "xml.tar")
+    with tarfile.open(l_paths["gz"], "w") as l_tar:
+      for c_name in l_names:
+        with open(os.path.join(l_project, c_name), "rb") as l_file:
+          l_data = gzip.compress(l_file.read()) if c_name != "index.xml" else l_file.read()
+        l_info = tarfile.TarInfo("./xml/%s%s" % (c_name, ".gz" if c_name != "index.xml" else ""))
+        l_info.size = len(l_data)
+        l_tar.addfile(l_info, io.BytesIO(l_data))
+    if coverxygen.sources.zstandard is not None:
+      l_paths["zst"] = os.path.join(p_dir, "xml.tar.zst")
+      with open(l_paths["tgz"], "rb") as l_file:
+        l_data = gzip.decompress(l_file.read())
+      with open(l_paths["zst"], "wb") as l_file:
+        l_file.write(coverxygen.sources.zstandard.ZstdCompressor().compress(l_data))
+    return l_paths
+
+  def test_process_archive(self):
+    l_kinds    = ["enum", "enumvalue", "function", "class", "namespace", "variable", "typedef", "friend"]
+    l_project  = self.get_project_path()
+    l_dir      = tempfile.mkdtemp()
+    try:
+      for c_type, c_path in self.make_archives(l_dir).items():
+        for c_kwds in [{}, {"p_jobs" : 2}, {"p_cacheDir" : os.path.join(l_dir, "cache")}, {"p_prefix" : "/opt/src"}]:
+          l_expected = self.run_process("json-v3", l_kinds, **c_kwds)
+          l_result   = self.run_process("json-v3", l_kinds, c_path, **c_kwds)
+          # symbols without location fall back on the compound path inside the archive
+          self.assertEqual(l_expected, l_result.replace(c_path, l_project), "%s %s" % (c_type, c_kwds))
+      with open(os.path.join(l_dir, "xml.tar.gz"), "rb") as l_file:
+        l_members = dict(coverxygen.XmlArchive.read_tar_stream(l_file))
+      self.assertIn("doc/xml/index.xml", l_members)
+      # zip members are only read on demand
+      with zipfile.ZipFile(os.path.join(l_dir, "lazy.zip"), "w") as l_zip:
+        l_zip.writestr("xml/index.xml", l_members["doc/xml/index.xml"])
+        l_zip.writestr("xml/class.xml.gz", gzip.compress(b"<doxygen/>"))
+      l_archive = coverxygen.XmlArchive.load(os.path.join(l_dir, "lazy.zip"))
+      self.assertIsInstance(l_archive.m_members["class.xml"][0], zipfile.ZipInfo)
+      self.assertEqual(b"<doxygen/>", l_archive.read(os.path.join(l_archive.m_root, "class.xml")))
+      self.assertEqual(len(l_members["doc/xml/index.xml"]), l_archive.get_size(l_archive.get_index_path()))
+      l_archive.close()
+      self.assertIsNone(l_archive.m_archive)
+      l_archive = coverxygen.XmlArchive.load(os.path.join(l_dir, "xml.tar"))
+      self.assertEqual(sorted(os.listdir(l_project)), sorted(l_archive.m_members))
+      # uncompressed tar members are read on demand, compressed ones are buffered
+      self.assertIsInstance(l_archive.m_members["index.xml"][0], tarfile.TarInfo)
+      self.assertEqual(len(l_members["doc/xml/index.xml"]), l_archive.get_size(l_archive.get_index_path()))
+      l_copy = pickle.loads(pickle.dumps(l_archive))
+      self.assertEqual(l_members["doc/xml/index.xml"], l_copy.read(l_copy.get_index_path()))
+      l_copy.close()
+      l_archive.close()
+      # closing only releases the file, members are still readable
+      self.assertEqual(l_members["doc/xml/index.xml"], l_archive.read(l_archive.get_index_path()))
+      l_archive.close()
+      l_archive = coverxygen.XmlArchive.load(os.path.join(l_dir, "xml.tar.gz"))
+      self.assertIsNone(l_archive.m_archive)
+      self.assertEqual(l_members["doc/xml/index.xml"], l_archive.m_members["index.xml"][0])
+      with self.assertRaisesRegex(RuntimeError, "could not find indexed file missing.xml"):
+        l_archive.get_file_path("missing")
+      with zipfile.ZipFile(os.path.join(l_dir, "empty.zip"), "w") as l_zip:
+        l_zip.writestr("doc/class.xml", "<doxygen/>")
+      with self.assertRaisesRegex(RuntimeError, "could not find root index.xml file in archive"):
+        coverxygen.XmlArchive.load(os.path.join(l_dir, "empty.zip"))
+      with open(os.path.join(l_dir, "invalid.tar"), "wb") as l_file:
+        l_file.write(b"not an archive")
+      with self.assertRaisesRegex(RuntimeError, "unable to read xml archive"):
+        coverxygen.XmlArchive.load(os.path.join(l_dir, "invalid.tar"))
+    finally:
+      shutil.rmtree(l_dir)
+
+  def test_corpus_generator(self):
+    l_kinds = ["enum", "enumvalue", "function", "class", "namespace", "variable", "typedef"]
+    l_dir   = tempfile.mkdtemp()
+    try:
+      for c_ratio in [0.0, 1.0]:
+        l_gen = CorpusGenerator(p_compounds=4, p_members=6, p_enums=1, p_enumValues=2, p_depth=2, p_docRatio=c_ratio)
+        l_gen.generate(l_dir)
+        l_summary = json.loads(self.run_process("json-summary", l_kinds, l_dir))
+        self.assertEqual(l_gen.get_symbol_count(), l_summary["total"]["symbol_count"])
+        self.assertEqual(4 * (1 + 6 + 1 + 2) + 6 * (1 + 1), l_summary["total"]["symbol_count"])
+        self.assertEqual(c_ratio, l_summary["total"]["coverage_rate"])
+      l_first = CorpusGenerator(p_compounds=3, p_docRatio=0.5, p_seed=3).generate(os.path.join(l_dir, "a"))
+      l_other = CorpusGenerator(p_compounds=3, p_docRatio=0.5, p_seed=3).generate(os.path.join(l_dir, "b"))
+      self.assertEqual(self.run_process("json-v3", l_kinds, l_first), self.run_process("json-v3", l_kinds, l_other))
+    finally:
+      shutil.rmtree(l_dir)
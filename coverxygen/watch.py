@@ -0,0 +1,85 @@
+# -*- mode: python; coding: utf-8 -*-
+#------------------------------------------------------------------------------
+
+from coverxygen import Coverxygen, SymbolAggregate
+
+#------------------------------------------------------------------------------
+
+class WatchSession(object):
+  """
+    State kept by watch mode between polls : the symbols extracted from each
+    compound file along with the file stamp and skipped member ids they were
+    extracted with. Only compound files whose stamp changed are processed
+    again, per kind counters are updated by taking back the previous symbols
+    of the file, so that summary formats never go over unchanged files. Other
+    formats rebuild their output from the kept symbols, without parsing.
+  """
+  def __init__(self, p_obj):
+    self.m_obj        = p_obj
+    self.m_indexStamp = None
+    self.m_items      = []
+    self.m_states     = {}
+    self.m_symbols    = {}
+    self.m_counts     = SymbolAggregate(p_keepSymbols=False, p_keepLines=False)
+
+  def set_symbols(self, p_filePath, p_symbols):
+    for c_symbol in self.m_symbols.pop(p_filePath, []):
+      self.m_counts.remove(c_symbol)
+    if p_symbols is not None:
+      for c_symbol in p_symbols:
+        self.m_counts.add(c_symbol)
+      self.m_symbols[p_filePath] = p_symbols
+
+  def refresh(self):
+    """
+      Returns the number of compound files processed again or dropped, errors
+      are raised once every other changed file has been processed.
+    """
+    l_obj       = self.m_obj
+    l_source    = l_obj.get_xml_source()
+    l_indexPath = l_source.get_index_path()
+    l_stamp     = l_source.get_stamp(l_indexPath)
+    l_updated   = 0
+    if l_stamp != self.m_indexStamp:
+      # a new index.xml may come with new compound files
+      l_source.reset_listing()
+      l_xmlDoc     = l_obj.get_xmldoc_from_file(l_indexPath, l_source.open(l_indexPath), l_obj.m_backend)
+      self.m_items = l_obj.plan_items(l_xmlDoc)
+      self.m_indexStamp = l_stamp
+      l_paths = set(c_filePath for c_filePath, _ in self.m_items)
+      for c_filePath in [c_path for c_path in self.m_states if not c_path in l_paths]:
+        self.set_symbols(c_filePath, None)
+        del self.m_states[c_filePath]
+        l_updated += 1
+    l_errors = []
+    for c_filePath, c_skipIds in self.m_items:
+      l_state = (l_source.get_stamp(c_filePath), c_skipIds)
+      if self.m_states.get(c_filePath) == l_state:
+        continue
+      try:
+        l_symbols = list(l_obj.select_symbols(l_obj.process_compound(c_filePath, c_skipIds)))
+      except RuntimeError as l_error:
+        self.m_states.pop(c_filePath, None)
+        l_errors.append(str(l_error))
+        continue
+      self.set_symbols(c_filePath, l_symbols)
+      self.m_states[c_filePath] = l_state
+      l_updated += 1
+    if l_errors:
+      Coverxygen.error("%s", "\n".join(l_errors))
+    return l_updated
+
+  def output(self):
+    l_obj = self.m_obj
+    if all(c_format in Coverxygen.SUMMARY_FORMATS for c_format in l_obj.get_formats()):
+      l_obj.output_aggregate(self.m_counts)
+      return
+    l_aggregate = l_obj.create_aggregate()
+    for c_filePath, _ in self.m_items:
+      for c_symbol in self.m_symbols.get(c_filePath, []):
+        l_aggregate.add(c_symbol)
+    l_obj.output_aggregate(l_aggregate)
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End:
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- mode:python -*-
+# -*- coding:utf-8 -*-
+#------------------------------------------------------------------#
+
+__author__    = "Xavier MARCELET <xavier@marcelet.com>"
+
+#------------------------------------------------------------------#
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+#------------------------------------------------------------------#
+
+def __sys_path():
+  sys.path.insert(0, ".")
+
+__sys_path()
+
+#------------------------------------------------------------------#
+
+# pylint: disable=wrong-import-position
+import coverxygen
+from coverxygen import Coverxygen
+from coverxygen.test.corpus import CorpusGenerator
+
+#------------------------------------------------------------------#
+
+SCOPES = ["public", "protected", "private"]
+KINDS  = ["enum", "enumvalue", "friend", "typedef", "variable", "function", "signal",
+          "slot", "class", "struct", "union", "define", "file", "namespace", "page"]
+
+def run_format(p_xmlDir, p_format, p_repeat, p_trace):
+  """
+    Runs in a dedicated process so that peak RSS only accounts for a single format
+  """
+  l_output  = os.path.join(tempfile.mkdtemp(), "output")
+  l_seconds = []
+  for _ in range(p_repeat):
+    l_obj   = Coverxygen(p_xmlDir, l_output, SCOPES, KINDS, p_format, "/")
+    l_start = time.perf_counter()
+    l_obj.process()
+    l_seconds.append(time.perf_counter() - l_start)
+  l_peak = None
+  if p_trace:
+    tracemalloc.start()
+    Coverxygen(p_xmlDir, l_output, SCOPES, KINDS, p_format, "/").process()
+    l_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+  shutil.rmtree(os.path.dirname(l_output))
+  return {
+    "seconds"       : min(l_seconds),
+    "peak_rss_kb"   : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "peak_traced"   : l_peak
+  }
+
+def run_isolated(p_func, *p_args):
+  with multiprocessing.Pool(1, maxtasksperchild=1) as l_pool:
+    return l_pool.apply(p_func, p_args)
+
+def get_commit():
+  try:
+    return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def compare(p_results, p_baseline, p_threshold):
+  l_regressions = []
+  for c_format, c_values in sorted(p_results["results"].items()):
+    l_ref = p_baseline.get("results", {}).get(c_format)
+    if not l_ref:
+      continue
+    for c_key in ["seconds", "peak_rss_kb", "peak_traced"]:
+      if not l_ref.get(c_key) or c_values.get(c_key) is None:
+        continue
+      l_ratio = c_values[c_key] / l_ref[c_key] - 1.0
+      l_status = "REGRESSION" if l_ratio > p_threshold else "ok"
+      sys.stderr.write("%-14s %-12s %12.3f -> %12.3f (%+6.1f%%) %s\n" % (
+        c_format, c_key, l_ref[c_key], c_values[c_key], l_ratio * 100, l_status))
+      if l_ratio > p_threshold:
+        l_regressions.append((c_format, c_key))
+  return l_regressions
+
+def main():
+  l_parser = argparse.ArgumentParser(description="Benchmark coverxygen on a synthetic doxygen XML corpus")
+  l_parser.add_argument("--compounds",   type=int,   default=200)
+  l_parser.add_argument("--members",     type=int,   default=200)
+  l_parser.add_argument("--enums",       type=int,   default=2)
+  l_parser.add_argument("--enum-values", type=int,   default=5, dest="enumValues")
+  l_parser.add_argument("--depth",       type=int,   default=2)
+  l_parser.add_argument("--doc-ratio",   type=float, default=0.5, dest="docRatio")
+  l_parser.add_argument("--seed",        type=int,   default=0)
+  l_parser.add_argument("--repeat",      type=int,   default=3, help="keep best time of N runs")
+  l_formats = [c_format for c_format in Coverxygen.FORMATS if not c_format in Coverxygen.DIFF_FORMATS]
+  l_parser.add_argument("--formats",     nargs="+",  default=l_formats, choices=l_formats)
+  l_parser.add_argument("--no-trace",    action="store_false", dest="trace",
+                        help="skip the tracemalloc run measuring python peak memory")
+  l_parser.add_argument("--corpus-dir",  default=None, dest="corpusDir",
+                        help="generate corpus in this directory and keep it")
+  l_parser.add_argument("--output",      default=None,
+                        help="write json results to this file (default stdout)")
+  l_parser.add_argument("--baseline",    default=None,
+                        help="json results of a previous run to compare with")
+  l_parser.add_argument("--threshold",   type=float, default=0.10,
+                        help="maximum relative slowdown or memory increase against baseline (default 0.10)")
+  l_args = l_parser.parse_args()
+
+  l_gen = CorpusGenerator(l_args.compounds, l_args.members, l_args.enums, l_args.enumValues,
+                          l_args.depth, l_args.docRatio, l_args.seed)
+  l_dir = l_args.corpusDir or tempfile.mkdtemp()
+  l_gen.generate(l_dir)
+
+  l_results = {
+    "version" : coverxygen.__version__,
+    "commit"  : get_commit(),
+    "python"  : sys.version.split()[0],
+    "corpus"  : l_gen.get_params(),
+    "symbols" : l_gen.get_symbol_count(),
+    "results" : {}
+  }
+  try:
+    for c_format in l_args.formats:
+      sys.stderr.write("benchmarking %s ...\n" % c_format)
+      l_values = run_isolated(run_format, l_dir, c_format, l_args.repeat, l_args.trace)
+      l_values["symbols_per_second"] = l_results["symbols"] / l_values["seconds"]
+      l_results["results"][c_format] = l_values
+  finally:
+    if not l_args.corpusDir:
+      shutil.rmtree(l_dir)
+
+  l_content = json.dumps(l_results, indent=2, sort_keys=True)
+  if l_args.output:
+    with open(l_args.output, "w", encoding="utf-8") as l_file:
+      l_file.write(l_content + "\n")
+  else:
+    sys.stdout.write(l_content + "\n")
+
+  if l_args.baseline:
+    with open(l_args.baseline, encoding="utf-8") as l_file:
+      l_baseline = json.load(l_file)
+    if l_baseline.get("corpus") != l_results["corpus"]:
+      sys.stderr.write("warning: baseline was measured on a different corpus\n")
+    l_regressions = compare(l_results, l_baseline, l_args.threshold)
+    if l_regressions:
+      sys.stderr.write("%d regression(s) above %.0f%% threshold\n" % (len(l_regressions), l_args.threshold * 100))
+      sys.exit(1)
+
+if __name__ == "__main__":
+  main()
+
+# Local Variables:
+# ispell-local-dictionary: "en"
+# End: